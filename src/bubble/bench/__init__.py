@@ -0,0 +1 @@
+"""Benchmarks for the actor mesh and the RDF plumbing around it."""
@@ -0,0 +1,170 @@
+"""The actor system itself: spawning, messaging, calls and supervision.
+
+Each scenario runs a tiny workload on a fresh vat with nothing but the
+mesh in the way, so the numbers are the floor that every real actor
+pays: how fast actors can be born, how fast two of them can bounce a
+message, how a coordinator fares when scattering work over many
+workers and gathering the answers, how long a `call` round trip takes,
+and what it costs to have a crashed child reported to its supervisor.
+
+Run with ``python -m bubble.bench.actors``.
+"""
+
+import trio
+
+from rdflib import Graph, URIRef
+
+from swash.prfx import NT
+from swash.util import bubble
+from bubble.mesh.otp import ServerActor
+from bubble.mesh.base import vat, send, this, spawn, receive
+from bubble.mesh.call import call
+from bubble.bench.base import Results, summarize, bench_repo, print_results
+from bubble.bench.pool import BENCH
+
+
+class Echo(ServerActor):
+    async def handle(self, nursery: trio.Nursery, graph: Graph) -> Graph:
+        return bubble(BENCH.Echo, BENCH)
+
+
+def ping(reply_to: URIRef) -> Graph:
+    return bubble(BENCH.Ping, BENCH, {NT.replyTo: reply_to})
+
+
+async def spawn_storm(actors: int) -> Results:
+    """Spawn many actors that finish at once, and wait for them all."""
+
+    async def nothing():
+        pass
+
+    start = trio.current_time()
+    async with trio.open_nursery() as nursery:
+        for _ in range(actors):
+            await spawn(nursery, nothing)
+        spawned = trio.current_time() - start
+    finished = trio.current_time() - start
+
+    return {
+        "spawns_per_s": actors / spawned,
+        "lifecycles_per_s": actors / finished,
+    }
+
+
+async def ping_pong(rounds: int) -> Results:
+    """Bounce one message back and forth between two actors."""
+
+    async def ponger():
+        while True:
+            msg = await receive()
+            reply_to = msg.value(msg.identifier, NT.replyTo)
+            await send(reply_to, ping(this()))
+
+    async with trio.open_nursery() as nursery:
+        partner = await spawn(nursery, ponger)
+        start = trio.current_time()
+        for _ in range(rounds):
+            await send(partner, ping(this()))
+            await receive()
+        elapsed = trio.current_time() - start
+        nursery.cancel_scope.cancel()
+
+    return {
+        "msgs_per_s": 2 * rounds / elapsed,
+        "round_trip_us": elapsed / rounds * 1e6,
+    }
+
+
+async def fan_out_in(workers: int, rounds: int) -> Results:
+    """Scatter a message to every worker and gather all the answers."""
+
+    async def worker():
+        while True:
+            msg = await receive()
+            reply_to = msg.value(msg.identifier, NT.replyTo)
+            await send(reply_to, bubble(BENCH.Done, BENCH))
+
+    latencies = []
+    async with trio.open_nursery() as nursery:
+        crowd = [await spawn(nursery, worker) for _ in range(workers)]
+        for _ in range(rounds):
+            start = trio.current_time()
+
+            async def scatter():
+                for actor in crowd:
+                    await send(actor, ping(this()))
+
+            # Scatter from a helper task, since the replies start
+            # arriving long before the last request has gone out.
+            async with trio.open_nursery() as helpers:
+                helpers.start_soon(scatter)
+                for _ in crowd:
+                    await receive()
+            latencies.append(trio.current_time() - start)
+        nursery.cancel_scope.cancel()
+
+    return {
+        "msgs_per_s": 2 * workers * rounds / sum(latencies),
+        **summarize("round", latencies),
+    }
+
+
+async def call_latency(calls: int) -> Results:
+    """Time `call` round trips to a server actor."""
+    latencies = []
+    async with trio.open_nursery() as nursery:
+        echo = await spawn(nursery, Echo())
+        for _ in range(calls):
+            start = trio.current_time()
+            await call(echo, bubble(BENCH.Ping, BENCH))
+            latencies.append(trio.current_time() - start)
+        nursery.cancel_scope.cancel()
+
+    return {
+        "calls_per_s": calls / sum(latencies),
+        **summarize("call", latencies),
+    }
+
+
+async def supervision(crashes: int) -> Results:
+    """Time from spawning a doomed child to hearing of its death."""
+
+    async def doomed():
+        raise RuntimeError("as foretold")
+
+    latencies = []
+    vat.get().curr.get().trap = True
+    try:
+        async with trio.open_nursery() as nursery:
+            for _ in range(crashes):
+                start = trio.current_time()
+                await spawn(nursery, doomed)
+                exit = await receive()
+                assert (exit.identifier, NT.message, None) in exit
+                latencies.append(trio.current_time() - start)
+    finally:
+        vat.get().curr.get().trap = False
+
+    return {
+        "crashes_per_s": crashes / sum(latencies),
+        **summarize("exit_signal", latencies),
+    }
+
+
+async def run(scale: int = 1) -> dict[str, Results]:
+    async with bench_repo():
+        return {
+            "spawn_storm": await spawn_storm(500 * scale),
+            "ping_pong": await ping_pong(2000 * scale),
+            "fan_out_in": await fan_out_in(100, 20 * scale),
+            "call": await call_latency(500 * scale),
+            "supervision": await supervision(200 * scale),
+        }
+
+
+def main() -> None:
+    print_results("actor system", trio.run(run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Shared scaffolding for the benchmarks.
+
+Benchmarks run the real actor system, just without a web server or a
+repository on disk. They silence the per-message logging, which would
+otherwise dominate every measurement, and report plain numbers that can
+be printed as a table or compared against an earlier run.
+"""
+
+import logging
+import tempfile
+import statistics
+
+from typing import Iterator, Sequence, AsyncIterator
+from contextlib import contextmanager, asynccontextmanager
+
+import trio
+import structlog
+
+from rich.table import Table
+from rich.console import Console
+
+from swash import here
+from bubble.repo.git import Git
+from bubble.mesh.base import Vat, vat
+from bubble.repo.repo import Repository, context
+
+Results = dict[str, float]
+
+
+def quiet_logging() -> None:
+    """Silence the actor system while benchmarking.
+
+    Benchmarks tear their actors down by cancellation, which the vat
+    reports as crashes, so even errors are muted.
+    """
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.CRITICAL
+        ),
+        cache_logger_on_first_use=False,
+    )
+
+
+@contextmanager
+def bench_vat(site: str = "https://bench.example/") -> Iterator[Vat]:
+    """Bind a fresh vat with quiet logging for the duration of a benchmark."""
+    quiet_logging()
+    system = Vat(site, structlog.get_logger())
+    with vat.bind(system):
+        yield system
+
+
+@asynccontextmanager
+async def bench_repo(
+    site: str = "https://bench.example/",
+) -> AsyncIterator[Repository]:
+    """Bind a fresh vat and a throwaway repository for a benchmark.
+
+    For benchmarks of code that makes graphs or persists them, which
+    needs a repository around even when nothing is ever committed.
+    """
+    with (
+        tempfile.TemporaryDirectory(prefix="bubble-bench-") as tmp,
+        bench_vat(site),
+    ):
+        repo = await Repository.create(
+            Git(trio.Path(tmp)), base_url_template=site
+        )
+        with context.repo.bind(repo), here.dataset.bind(repo.dataset):
+            yield repo
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """The q-th percentile (0-100) of some samples, or 0 if there are none."""
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[
+        min(max(int(q) - 1, 0), 98)
+    ]
+
+
+def summarize(prefix: str, samples: Sequence[float]) -> Results:
+    """Median, tail and worst case of some latency samples, in milliseconds."""
+    return {
+        f"{prefix}_p50_ms": percentile(samples, 50) * 1000,
+        f"{prefix}_p99_ms": percentile(samples, 99) * 1000,
+        f"{prefix}_max_ms": max(samples, default=0.0) * 1000,
+    }
+
+
+class LoopProbe:
+    """Measure how late the event loop wakes up a sleeping task.
+
+    A healthy loop wakes the probe within a fraction of a millisecond of
+    its deadline. Anything that hogs the trio thread shows up directly
+    as lag, which is what every other actor and request also suffers.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.lags: list[float] = []
+
+    async def run(self) -> None:
+        while True:
+            start = trio.current_time()
+            await trio.sleep(self.interval)
+            self.lags.append(trio.current_time() - start - self.interval)
+
+
+def print_results(title: str, results: dict[str, Results]) -> None:
+    """Print one row per scenario with a column per metric.
+
+    Suites whose scenarios measure different things would make for a
+    wide and mostly empty table, so those get a row per metric instead.
+    """
+    table = Table(title=title)
+    metrics = sorted({k for row in results.values() for k in row})
+    if len(metrics) > 6:
+        table.add_column("scenario", style="bold")
+        table.add_column("metric")
+        table.add_column("value", justify="right")
+        for scenario, row in results.items():
+            for metric, value in sorted(row.items()):
+                table.add_row(scenario, metric, f"{value:.3f}")
+        Console().print(table)
+        return
+    table.add_column("scenario", style="bold")
+    for metric in metrics:
+        table.add_column(metric, justify="right")
+    for scenario, row in results.items():
+        table.add_row(
+            scenario,
+            *(f"{row[m]:.3f}" if m in row else "-" for m in metrics),
+        )
+    Console().print(table)
@@ -0,0 +1,81 @@
+"""Graph statistics: counting on every page against counting on write.
+
+Fills a dataset with many graphs of transcript words and renders the
+`/graphs` overview, once counting every graph from its triples as the
+page used to, and once from a `Census` kept up as the graphs were
+written. The census is not free, so this also adds words one triple at
+a time to a store with and without one listening.
+
+Run with ``python -m bubble.bench.census``.
+"""
+
+import time
+
+from typing import Callable
+
+from rdflib import Dataset
+
+from swash.html import document
+from swash.store import NoisyMemory
+from swash.census import Tally, Census
+from bubble.bench.base import Results, print_results
+from bubble.bench.pool import BENCH
+from bubble.bench.scope import big_bubble
+from bubble.http.render import render_graphs_overview
+from bubble.bench.ingest import word_triples, word_resources
+
+
+def rate(count: int, work: Callable[[], object], rounds: int = 3) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        work()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def scanned(dataset: Dataset) -> None:
+    stats = {
+        graph.identifier: Tally(graph.triples((None, None, None))).stats()
+        for graph in dataset.graphs()
+    }
+    with document():
+        render_graphs_overview(stats)
+
+
+def counted(census: Census) -> None:
+    with document():
+        render_graphs_overview(census.stats())
+
+
+def writes(words: int, census: bool) -> Results:
+    triples = word_triples(word_resources(words))
+
+    def fill():
+        dataset = Dataset(store=NoisyMemory(), default_union=True)
+        if census:
+            Census(dataset)
+        graph = dataset.graph(BENCH.words)
+        for triple in triples:
+            graph.add(triple)
+
+    return {"triples_per_s": rate(len(triples), fill)}
+
+
+def run(graphs: int = 200, words: int = 25) -> dict[str, Results]:
+    dataset = big_bubble(graphs, words)
+    census = Census(dataset)
+    return {
+        "scan": {"pages_per_s": rate(1, lambda: scanned(dataset))},
+        "census": {"pages_per_s": rate(1, lambda: counted(census))},
+        "writes_bare": writes(2000, census=False),
+        "writes_counted": writes(2000, census=True),
+    }
+
+
+def main() -> None:
+    print_results("graph statistics", run())
+
+
+if __name__ == "__main__":
+    main()
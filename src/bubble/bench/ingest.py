@@ -0,0 +1,136 @@
+"""Ingestion: how fast triples get into a repository graph.
+
+Every triple added one at a time to the repository's dataset is heard
+by its dispatcher, which tells the repository that the graph is dirty,
+again and again. The batched path adds a whole batch through `addN`
+and marks the graph dirty once. Each scenario runs the old way and the
+batched way side by side:
+
+``triples``
+    Plain triples, as `persist` copies them from an actor's graph.
+``resources``
+    Word resources made with `new`, as actors describe what they saw.
+``parse``
+    A TriG document read into a graph, as `load_graph` does at startup.
+
+Run with ``python -m bubble.bench.ingest``.
+"""
+
+import time
+
+from typing import Callable
+
+import trio
+
+from rdflib import RDF, TIME, Graph, URIRef, Literal
+
+from swash import here
+from swash.mint import fresh_uri
+from swash.prfx import TALK
+from swash.util import new, muted, add_triples
+from bubble.bench.base import Results, bench_repo, print_results
+from bubble.bench.pool import BENCH
+
+
+def word_properties(i: int) -> dict:
+    return {
+        TALK.hasBareWord: Literal(f"word{i}"),
+        TALK.hasText: Literal(f"Word{i},"),
+        TALK.hasConfidence: Literal(0.9 + i / 100000),
+        TIME.numericPosition: Literal(i * 0.25),
+        TIME.numericDuration: Literal(0.2),
+    }
+
+
+def word_resources(words: int) -> list[tuple[URIRef, dict]]:
+    return [(BENCH[f"word{i}"], word_properties(i)) for i in range(words)]
+
+
+def word_triples(resources: list[tuple[URIRef, dict]]) -> list:
+    triples = []
+    for word, properties in resources:
+        triples.append((word, RDF.type, TALK.WordTranscript))
+        for predicate, object in properties.items():
+            triples.append((word, predicate, object))
+    return triples
+
+
+def one_by_one(graph: Graph, triples: list) -> None:
+    for triple in triples:
+        graph.add(triple)
+
+
+def resources_one_by_one(graph: Graph, resources: list) -> None:
+    for word, properties in resources:
+        graph.add((word, RDF.type, TALK.WordTranscript))
+        for predicate, object in properties.items():
+            graph.add((word, predicate, object))
+
+
+def resources_batched(graph: Graph, resources: list) -> None:
+    with here.graph.bind(graph):
+        for word, properties in resources:
+            new(TALK.WordTranscript, properties, word)
+
+
+def parse_heard(graph: Graph, document: str) -> None:
+    graph.parse(data=document, format="trig")
+
+
+def parse_muted(graph: Graph, document: str) -> None:
+    with muted(graph.store):
+        graph.parse(data=document, format="trig")
+
+
+def measure(
+    fill: Callable[[Graph], None], triples: int, rounds: int
+) -> Results:
+    """Fill fresh repository graphs, keeping the best time.
+
+    Each graph goes again once it is timed, so that no round finds the
+    same triples already held in the graphs of the rounds before it.
+    """
+    dataset = here.dataset.get()
+    best = float("inf")
+    for _ in range(rounds):
+        graph = dataset.graph(fresh_uri(BENCH))
+        start = time.perf_counter()
+        fill(graph)
+        best = min(best, time.perf_counter() - start)
+        assert len(graph) == triples
+        dataset.remove_graph(graph)
+    return {"triples_per_s": triples / best}
+
+
+async def run(words: int = 4000, rounds: int = 5) -> dict[str, Results]:
+    resources = word_resources(words)
+    triples = word_triples(resources)
+    document = Graph()
+    add_triples(document, triples)
+    # Turtle is TriG with only a default graph, which goes wherever
+    # the parse puts it.
+    trig = document.serialize(format="turtle")
+
+    scenarios = {
+        "triples/one_by_one": lambda g: one_by_one(g, triples),
+        "triples/batched": lambda g: add_triples(g, triples),
+        "resources/one_by_one": lambda g: resources_one_by_one(
+            g, resources
+        ),
+        "resources/batched": lambda g: resources_batched(g, resources),
+        "parse/heard": lambda g: parse_heard(g, trig),
+        "parse/muted": lambda g: parse_muted(g, trig),
+    }
+    async with bench_repo():
+        return {
+            name: measure(fill, len(triples), rounds)
+            for name, fill in scenarios.items()
+        }
+
+
+def main() -> None:
+    print_results("ingestion into a repository graph", trio.run(run))
+
+
+if __name__ == "__main__":
+    main()
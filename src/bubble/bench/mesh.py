@@ -0,0 +1,134 @@
+"""Cross-vat messaging over the in-process NATS broker.
+
+Two vats join a `LocalBroker`, one hosting a counter and the other
+calling it, so every call takes the full mesh path: directory lookup,
+request/reply through NATS and RDF encoding on both ends. A second
+scenario streams one-way messages between the vats with and without
+batching. No network is involved, so the numbers show the cost of the
+mesh machinery itself.
+
+Run with ``python -m bubble.bench.mesh``.
+"""
+
+from typing import Optional
+
+import trio
+import structlog
+
+from rdflib import Graph, Namespace
+
+from swash.util import bubble
+from bubble.mesh.otp import ServerActor
+from bubble.mesh.base import Vat, Batching, vat, send, spawn, receive
+from bubble.mesh.call import call
+from bubble.bench.base import (
+    Results,
+    summarize,
+    print_results,
+    quiet_logging,
+)
+from bubble.mesh.broker import LocalBroker
+
+BENCH = Namespace("https://node.town/2025/bench#")
+
+
+class Echo(ServerActor):
+    async def handle(self, nursery: trio.Nursery, graph: Graph) -> Graph:
+        return bubble(BENCH.Echo, BENCH)
+
+
+class Streamer:
+    def __init__(
+        self, target, count: int, batching: Optional[Batching] = None
+    ):
+        self.target = target
+        self.count = count
+        self.batching = batching
+
+    async def __call__(self):
+        for i in range(self.count):
+            await send(self.target, bubble(BENCH.Note, BENCH))
+
+
+async def join(nursery: trio.Nursery) -> tuple[LocalBroker, list[Vat]]:
+    broker = LocalBroker(nursery)
+    vats = [
+        Vat("https://bench.example/", structlog.get_logger())
+        for _ in range(2)
+    ]
+    for system in vats:
+        client = broker.client()
+        await client.connect()
+        await system.join_nats(nursery, client)
+    return broker, vats
+
+
+async def measure_calls(calls: int) -> Results:
+    async with trio.open_nursery() as nursery:
+        _, (caller, host) = await join(nursery)
+        with vat.bind(host):
+            echo = await spawn(nursery, Echo())
+
+        latencies = []
+        with vat.bind(caller):
+            for _ in range(calls):
+                start = trio.current_time()
+                await call(echo, bubble(BENCH.Ping, BENCH))
+                latencies.append(trio.current_time() - start)
+        nursery.cancel_scope.cancel()
+
+    return {
+        "calls_per_s": calls / sum(latencies),
+        **summarize("call", latencies),
+    }
+
+
+async def measure_stream(
+    messages: int, batching: Optional[Batching]
+) -> Results:
+    received = 0
+    done = trio.Event()
+
+    async def sink():
+        nonlocal received
+        while True:
+            await receive()
+            received += 1
+            if received == messages:
+                done.set()
+
+    async with trio.open_nursery() as nursery:
+        broker, (sender, host) = await join(nursery)
+        with vat.bind(host):
+            target = await spawn(nursery, sink)
+
+        start = trio.current_time()
+        with vat.bind(sender):
+            await spawn(nursery, Streamer(target, messages, batching))
+        await done.wait()
+        elapsed = trio.current_time() - start
+        nursery.cancel_scope.cancel()
+
+    return {
+        "msgs_per_s": messages / elapsed,
+        "nats_publishes": float(
+            broker.published[f"bubble.vat.{host.vat_id}"]
+        ),
+    }
+
+
+async def run(calls: int = 500, messages: int = 2000) -> dict[str, Results]:
+    quiet_logging()
+    return {
+        "call": await measure_calls(calls),
+        "stream": await measure_stream(messages, None),
+        "stream_batched": await measure_stream(messages, Batching()),
+    }
+
+
+def main() -> None:
+    print_results("cross-vat messaging", trio.run(run))
+
+
+if __name__ == "__main__":
+    main()
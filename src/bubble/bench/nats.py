@@ -0,0 +1,92 @@
+"""NATS throughput: the native trio client against the bridged one.
+
+Publishes a stream of messages to a subscriber on the same connection
+and times how long it takes for all of them to come back, then times a
+series of request/reply round trips. Both clients run in the same
+process against the same server, so the difference is the client.
+
+Needs a running ``nats-server``; run with
+``python -m bubble.bench.nats [nats://localhost:4222]``.
+"""
+
+import sys
+
+import trio
+import trio_asyncio
+
+from bubble.mesh.nats import NatsClient, NatsMessage, TrioNatsClient
+from bubble.bench.base import (
+    Results,
+    summarize,
+    print_results,
+    quiet_logging,
+)
+
+
+async def measure(client, messages: int, size: int, calls: int) -> Results:
+    payload = b"x" * size
+    received = 0
+    done = trio.Event()
+
+    async def count(msg: NatsMessage):
+        nonlocal received
+        received += 1
+        if received == messages:
+            done.set()
+
+    async def echo(msg: NatsMessage):
+        await client.publish(msg.reply, msg.data)
+
+    await client.subscribe("bench.stream", count)
+    await client.subscribe("bench.echo", echo)
+
+    start = trio.current_time()
+    for _ in range(messages):
+        await client.publish("bench.stream", payload)
+    await done.wait()
+    streaming = trio.current_time() - start
+
+    latencies = []
+    for _ in range(calls):
+        start = trio.current_time()
+        await client.request("bench.echo", payload, timeout=5)
+        latencies.append(trio.current_time() - start)
+
+    return {
+        "msgs_per_s": messages / streaming,
+        "mb_per_s": messages * size / streaming / 1e6,
+        **summarize("request", latencies),
+    }
+
+
+async def run(
+    url: str = "nats://localhost:4222",
+    messages: int = 20000,
+    size: int = 128,
+    calls: int = 500,
+) -> dict[str, Results]:
+    quiet_logging()
+    results = {}
+
+    async with trio.open_nursery() as nursery:
+        native = NatsClient(nursery, url)
+        await native.connect()
+        results["native"] = await measure(native, messages, size, calls)
+        await native.close()
+        nursery.cancel_scope.cancel()
+
+    bridged = TrioNatsClient(url)
+    await bridged.connect()
+    results["bridged"] = await measure(bridged, messages, size, calls)
+    await bridged.close()
+
+    return results
+
+
+def main() -> None:
+    url = sys.argv[1] if len(sys.argv) > 1 else "nats://localhost:4222"
+    print_results("NATS clients", trio_asyncio.run(run, url))
+
+
+if __name__ == "__main__":
+    main()
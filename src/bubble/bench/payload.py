@@ -0,0 +1,153 @@
+"""JSON payloads: Deepgram messages in and out of RDF.
+
+Builds a Deepgram transcription message with a few thousand words,
+stores it as RDF with `rdf_from_json` and reads it back with
+`json_from_rdf`, and does the same the way both used to work: making
+every object and property with `new`, one batch of triples each, and
+asking SPARQL for the properties of every object on the way back.
+
+Run with ``python -m bubble.bench.payload``.
+"""
+
+import time
+
+from typing import Callable
+
+from rdflib import Graph, Literal, IdentifiedNode
+from rdflib.collection import Collection
+
+from swash import here
+from swash.json import Value, json_from_rdf, rdf_from_json
+from swash.mint import fresh_uri
+from swash.prfx import SWA, JSON
+from swash.util import O, new, is_a, select_rows
+from bubble.bench.base import Results, print_results
+
+OBJECT_QUERY = """
+    SELECT ?key ?value WHERE {
+        ?node json:has ?prop .
+        ?prop json:key ?key .
+        ?prop json:val ?value .
+    }
+"""
+
+
+def deepgram_message(words: int) -> dict:
+    return {
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": words * 0.25,
+        "start": 0.0,
+        "is_final": True,
+        "speech_final": True,
+        "channel": {
+            "alternatives": [
+                {
+                    "transcript": " ".join(
+                        f"word{i}" for i in range(words)
+                    ),
+                    "confidence": 0.98,
+                    "words": [
+                        {
+                            "word": f"word{i}",
+                            "start": i * 0.25,
+                            "end": i * 0.25 + 0.2,
+                            "confidence": 0.9 + i / 100000,
+                            "speaker": i % 2,
+                            "punctuated_word": f"Word{i},",
+                        }
+                        for i in range(words)
+                    ],
+                }
+            ]
+        },
+        "metadata": {
+            "request_id": "bench",
+            "model_info": {"name": "nova-2", "version": "1", "arch": "x"},
+            "model_uuid": "bench",
+        },
+    }
+
+
+def encode_one_by_one(value: Value) -> O:
+    if value is None:
+        return JSON.null
+    if isinstance(value, dict):
+        properties = [
+            new(
+                JSON.Property,
+                {JSON.key: key, JSON.val: encode_one_by_one(val)},
+            )
+            for key, val in value.items()
+        ]
+        return new(JSON.Object, {JSON.has: properties})
+    if isinstance(value, list):
+        items = [encode_one_by_one(item) for item in value]
+        collection = Collection(here.graph.get(), fresh_uri(SWA), items)
+        return new(JSON.Array, {}, subject=collection.uri)  # type: ignore
+    return Literal(value)
+
+
+def decode_by_query(node: O) -> Value:
+    if node == JSON.null:
+        return None
+    if isinstance(node, Literal):
+        return node.toPython()
+    assert isinstance(node, IdentifiedNode)
+    graph = here.graph.get()
+    if is_a(node, JSON.Array):
+        return [decode_by_query(item) for item in graph.items(node)]
+    return {
+        row.key.toPython(): decode_by_query(row.value)
+        for row in select_rows(OBJECT_QUERY, {"node": node})
+    }
+
+
+def seconds(work: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    work()
+    return time.perf_counter() - start
+
+
+def measure(
+    message: dict,
+    encode: Callable[[Value], O],
+    decode: Callable[[O], Value],
+) -> Results:
+    with here.graph.bind(Graph(base="https://example.com/")) as graph:
+        root = None
+
+        def store():
+            nonlocal root
+            root = encode(message)
+
+        encoding = seconds(store)
+        decoded = None
+
+        def load():
+            nonlocal decoded
+            decoded = decode(root)  # type: ignore
+
+        decoding = seconds(load)
+        assert decoded == message
+        return {
+            "triples": len(graph),
+            "encode_ms": encoding * 1000,
+            "decode_ms": decoding * 1000,
+        }
+
+
+def run(words: int = 2000) -> dict[str, Results]:
+    message = deepgram_message(words)
+    return {
+        "old": measure(message, encode_one_by_one, decode_by_query),
+        "new": measure(message, rdf_from_json, json_from_rdf),
+    }
+
+
+def main() -> None:
+    print_results("JSON payloads", run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Event-loop latency with and without worker-pool offloading.
+
+A CPU-bound actor answers a stream of requests while a probe task
+measures how late the loop wakes it. Handled inline on the trio thread,
+every request shows up as a lag spike the size of the handler; handled
+in a thread or process worker, the loop stays responsive.
+
+Run with ``python -m bubble.bench.pool``.
+"""
+
+import trio
+
+from rdflib import RDF, Graph, Literal, Namespace
+
+from swash.util import bubble
+from bubble.mesh.otp import ServerActor
+from bubble.mesh.base import spawn
+from bubble.mesh.call import call
+from bubble.mesh.pool import spawn_worker
+from bubble.bench.base import (
+    Results,
+    LoopProbe,
+    bench_vat,
+    summarize,
+    print_results,
+)
+
+BENCH = Namespace("https://node.town/2025/bench#")
+
+
+def crunch(graph: Graph) -> Graph:
+    """Round-trip a synthetic transcript through Turtle.
+
+    Stands in for the RDF parsing and serialization that real actors do
+    on the hot path.
+    """
+    size = int(graph.value(graph.identifier, BENCH.size))
+    scratch = Graph()
+    for i in range(size):
+        word = BENCH[f"word{i}"]
+        scratch.add((word, RDF.type, BENCH.Word))
+        scratch.add((word, RDF.value, Literal(f"word number {i}")))
+    parsed = Graph().parse(
+        data=scratch.serialize(format="turtle"), format="turtle"
+    )
+    response = Graph(identifier=graph.identifier)
+    response.add((graph.identifier, BENCH.triples, Literal(len(parsed))))
+    return response
+
+
+class InlineCruncher(ServerActor):
+    async def handle(self, nursery: trio.Nursery, graph: Graph) -> Graph:
+        return crunch(graph)
+
+
+async def measure(mode: str, requests: int, size: int) -> Results:
+    probe = LoopProbe()
+    async with trio.open_nursery() as nursery:
+        if mode == "inline":
+            actor = await spawn(nursery, InlineCruncher())
+        else:
+            actor = await spawn_worker(
+                nursery, crunch, processes=mode == "process"
+            )
+
+        # Warm up, which also starts the process pool.
+        await call(
+            actor, bubble(BENCH.Crunch, BENCH, {BENCH.size: Literal(1)})
+        )
+
+        nursery.start_soon(probe.run)
+        start = trio.current_time()
+        for _ in range(requests):
+            await call(
+                actor,
+                bubble(BENCH.Crunch, BENCH, {BENCH.size: Literal(size)}),
+            )
+        elapsed = trio.current_time() - start
+        nursery.cancel_scope.cancel()
+
+    return {
+        "requests_per_s": requests / elapsed,
+        **summarize("loop_lag", probe.lags),
+    }
+
+
+async def run(requests: int = 20, size: int = 2000) -> dict[str, Results]:
+    with bench_vat():
+        return {
+            mode: await measure(mode, requests, size)
+            for mode in ("inline", "thread", "process")
+        }
+
+
+def main() -> None:
+    print_results("event loop latency under CPU load", trio.run(run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""SPARQL: what parsing costs next to answering.
+
+Runs the same queries over and over, as the town does, once handing
+rdflib the query text each time and once through `select_rows`, which
+keeps each query prepared after its first use:
+
+``credential``
+    The service credential lookup from `bubble.cred`, in a graph that
+    holds little more than the credential itself.
+``words``
+    A join over a graph of two thousand transcript words, which the
+    indexes answer quickly enough that parsing still dominates.
+
+Run with ``python -m bubble.bench.query``.
+"""
+
+import time
+
+from typing import Callable
+
+from rdflib import RDF, Graph, Literal
+
+from swash import here
+from swash.prfx import NT, TALK
+from swash.util import PREFIXES, select_rows
+from bubble.cred import CREDENTIAL_QUERY
+from bubble.bench.base import Results, print_results
+from bubble.bench.pool import BENCH
+from bubble.bench.ingest import word_triples, word_resources
+
+WORDS_QUERY = f"""
+    SELECT ?word ?text WHERE {{
+        ?word a <{TALK.WordTranscript}> ;
+            <{TALK.hasText}> ?text ;
+            <{TALK.hasBareWord}> "word7" .
+    }}
+"""
+
+
+def credential_graph() -> Graph:
+    graph = Graph()
+    token = BENCH.token
+    graph.add((BENCH.account, RDF.type, NT.ServiceAccount))
+    graph.add((BENCH.account, NT.forService, BENCH.service))
+    graph.add((BENCH.account, NT.hasPart, token))
+    graph.add((token, RDF.type, NT.BearerToken))
+    graph.add((token, NT.hasValue, Literal("secret")))
+    return graph
+
+
+def words_graph(words: int) -> Graph:
+    graph = Graph()
+    for triple in word_triples(word_resources(words)):
+        graph.add(triple)
+    return graph
+
+
+def rate(calls: int, call: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return calls / (time.perf_counter() - start)
+
+
+def measure(
+    graph: Graph, query: str, bindings: dict, calls: int
+) -> Results:
+    def raw():
+        return list(
+            graph.query(query, initBindings=bindings, initNs=PREFIXES)
+        )
+
+    with here.graph.bind(graph):
+        return {
+            "raw_per_s": rate(calls, raw),
+            "prepared_per_s": rate(
+                calls, lambda: select_rows(query, bindings)
+            ),
+        }
+
+
+def run(calls: int = 300, words: int = 2000) -> dict[str, Results]:
+    return {
+        "credential": measure(
+            credential_graph(),
+            CREDENTIAL_QUERY,
+            {"service": BENCH.service},
+            calls,
+        ),
+        "words": measure(words_graph(words), WORDS_QUERY, {}, calls // 10),
+    }
+
+
+def main() -> None:
+    print_results("SPARQL queries", run())
+
+
+if __name__ == "__main__":
+    main()
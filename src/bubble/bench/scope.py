@@ -0,0 +1,100 @@
+"""Scoped reads: rendering one graph's page in a big bubble.
+
+Fills a dataset with many graphs of transcript words and a vocabulary
+graph that labels their predicates, then renders one graph's page as
+`/graph` does, once reading labels and risks from the whole union and
+once with `here.graphs` bound to the page's graph and the vocabulary.
+Both run on the live store and on a snapshot, which is what pages
+render from.
+
+Run with ``python -m bubble.bench.scope``.
+"""
+
+import time
+
+from typing import Callable
+
+from rdflib import RDFS, Dataset, Literal
+
+from swash import here
+from swash.html import document
+from swash.rdfa import get_label
+from swash.util import add_triples
+from swash.store import NoisyMemory
+from swash.snapshot import Snapshots
+from bubble.bench.base import Results, print_results
+from bubble.bench.pool import BENCH
+from bubble.http.render import render_graph_view
+from bubble.bench.ingest import word_triples, word_resources
+
+VOCABULARY = BENCH.vocabulary
+
+
+def big_bubble(graphs: int, words: int) -> Dataset:
+    dataset = Dataset(store=NoisyMemory(), default_union=True)
+    resources = word_resources(words)
+    predicates = {p for _, properties in resources for p in properties}
+    add_triples(
+        dataset.graph(VOCABULARY),
+        [
+            (p, RDFS.label, Literal(p.fragment or str(p)))
+            for p in predicates
+        ],
+    )
+    for i in range(graphs):
+        renamed = [
+            (BENCH[f"g{i}/{word.fragment}"], properties)
+            for word, properties in resources
+        ]
+        add_triples(dataset.graph(BENCH[f"g{i}"]), word_triples(renamed))
+    return dataset
+
+
+def rate(count: int, work: Callable[[], object], rounds: int = 3) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        work()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def measure(dataset: Dataset, scope: frozenset) -> Results:
+    page = dataset.graph(BENCH.g0)
+    predicates = list(set(page.predicates()))
+
+    def render():
+        with document(), here.site.bind(BENCH):
+            with here.dataset.bind(dataset), here.graphs.bind(scope):
+                render_graph_view(page)
+
+    def labels():
+        with here.graphs.bind(scope):
+            for predicate in predicates:
+                get_label(dataset, predicate)
+
+    return {
+        "pages_per_s": rate(1, render, rounds=2),
+        "labels_per_s": rate(len(predicates), labels),
+    }
+
+
+def run(graphs: int = 200, words: int = 25) -> dict[str, Results]:
+    dataset = big_bubble(graphs, words)
+    snapshot = Snapshots(dataset).take()
+    everything: frozenset = frozenset()
+    page = frozenset([BENCH.g0, VOCABULARY])
+    return {
+        "live_union": measure(dataset, everything),
+        "live_scoped": measure(dataset, page),
+        "snapshot_union": measure(snapshot, everything),
+        "snapshot_scoped": measure(snapshot, page),
+    }
+
+
+def main() -> None:
+    print_results("scoped reads", run())
+
+
+if __name__ == "__main__":
+    main()
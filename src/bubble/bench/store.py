@@ -0,0 +1,130 @@
+"""Triple stores: rdflib's `Memory` against our own.
+
+Fills a dataset with transcript words spread over a handful of graphs,
+then measures what the store costs per triple, in memory and on disk,
+and how fast it adds triples, looks up one subject, finds subjects by
+predicate and object, scans a whole graph and answers a SPARQL join.
+
+Run with ``python -m bubble.bench.store``.
+"""
+
+import os
+import time
+import tempfile
+import tracemalloc
+
+from typing import Callable
+from contextlib import contextmanager
+from collections.abc import Iterator
+
+from rdflib import RDF, Dataset
+from rdflib.store import Store
+
+from swash.prfx import TALK
+from bubble.repo.repo import STORES
+from bubble.bench.base import Results, print_results
+from bubble.bench.pool import BENCH
+from bubble.bench.ingest import word_triples, word_resources
+
+QUERY = f"""
+    SELECT ?word ?text WHERE {{
+        ?word a <{TALK.WordTranscript}> ;
+            <{TALK.hasText}> ?text ;
+            <{TALK.hasBareWord}> "word7" .
+    }}
+"""
+
+
+def fill(store: Store, triples: list, graphs: int) -> Dataset:
+    dataset = Dataset(store=store, default_union=True)
+    named = [dataset.graph(BENCH[f"graph{i}"]) for i in range(graphs)]
+    for i, triple in enumerate(triples):
+        named[i % graphs].add(triple)
+    return dataset
+
+
+def disk_bytes(workdir: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(workdir)
+        for name in names
+    )
+
+
+@contextmanager
+def filled(
+    make: Callable[[str], Store], triples: list, graphs: int
+) -> Iterator[tuple[Dataset, str]]:
+    """A dataset filled in a fresh working directory, closed after."""
+    with tempfile.TemporaryDirectory() as workdir:
+        dataset = fill(make(workdir), triples, graphs)
+        dataset.commit()
+        try:
+            yield dataset, workdir
+        finally:
+            dataset.close()
+
+
+def rate(count: int, work: Callable[[], object], rounds: int = 3) -> float:
+    """Operations per second for the best of a few rounds."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        work()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def measure(
+    make: Callable[[str], Store], words: int, graphs: int, probes: int
+) -> Results:
+    resources = word_resources(words)
+    triples = word_triples(resources)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    with filled(make, triples, graphs) as (dataset, workdir):
+        grown = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        grown += disk_bytes(workdir)
+
+    start = time.perf_counter()
+    with filled(make, triples, graphs) as (dataset, _):
+        adding = time.perf_counter() - start
+
+        subjects = [word for word, _ in resources[:probes]]
+        first = dataset.graph(BENCH["graph0"])
+
+        def lookups():
+            for subject in subjects:
+                list(dataset.predicate_objects(subject))
+
+        def finds():
+            for _ in range(probes):
+                list(dataset.subjects(RDF.type, TALK.WordTranscript))
+
+        return {
+            "triple_bytes": grown / len(triples),
+            "add_per_s": len(triples) / adding,
+            "lookup_per_s": rate(probes, lookups),
+            "find_per_s": rate(probes, finds, rounds=1),
+            "scan_per_s": rate(len(first), lambda: list(first)),
+            "query_per_s": rate(1, lambda: list(dataset.query(QUERY))),
+        }
+
+
+def run(
+    words: int = 5000, graphs: int = 10, probes: int = 50
+) -> dict[str, Results]:
+    return {
+        name: measure(make, words, graphs, probes)
+        for name, make in STORES.items()
+    }
+
+
+def main() -> None:
+    print_results("triple stores", run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""The benchmark suite, and how today's numbers compare to a baseline.
+
+Every benchmark module has a `run` function returning one row of
+metrics per scenario. The suite runs a selection of them and keeps the
+report as JSON; a report checked into the tree serves as the baseline
+that later runs are held against, so that a change which halves the
+message rate shows up as more than a vague feeling of sluggishness.
+
+Metric names say which way is up: rates end in ``_per_s`` and should
+not fall, times end in ``_ms`` or ``_us`` and sizes in ``bytes`` and
+should not grow. Worst-case times are too noisy to judge and are only
+shown.
+"""
+
+import json
+import inspect
+import platform
+import importlib
+
+from pathlib import Path
+from dataclasses import dataclass
+
+from rich.table import Table
+from rich.console import Console
+
+from bubble.bench.base import Results
+
+Report = dict[str, dict[str, Results]]
+
+SUITES = {
+    "actors": "bubble.bench.actors",
+    "mesh": "bubble.bench.mesh",
+    "pool": "bubble.bench.pool",
+    "wire": "bubble.bench.wire",
+    "ingest": "bubble.bench.ingest",
+    "store": "bubble.bench.store",
+    "scope": "bubble.bench.scope",
+    "query": "bubble.bench.query",
+    "payload": "bubble.bench.payload",
+    "census": "bubble.bench.census",
+    "nats": "bubble.bench.nats",
+}
+
+#: The suites that need nothing outside this process; nats wants a
+#: running server and only runs when asked for by name.
+DEFAULT_SUITES = [
+    "actors",
+    "mesh",
+    "pool",
+    "wire",
+    "ingest",
+    "store",
+    "scope",
+    "query",
+    "payload",
+    "census",
+]
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+
+async def run_suites(names: list[str]) -> Report:
+    """Run the named suites one after the other."""
+    report = {}
+    for name in names:
+        module = importlib.import_module(SUITES[name])
+        results = module.run()
+        if inspect.isawaitable(results):
+            results = await results
+        report[name] = results
+    return report
+
+
+def save_report(path: Path, report: Report) -> None:
+    path.write_text(
+        json.dumps(
+            {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": report,
+            },
+            indent=2,
+            sort_keys=True,
+        )
+        + "\n"
+    )
+
+
+def load_report(path: Path) -> Report:
+    return json.loads(path.read_text())["results"]
+
+
+def direction(metric: str) -> int:
+    """1 if bigger is better, -1 if smaller is better, 0 if unjudged."""
+    if "_max_" in metric:
+        return 0
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith(("_ms", "_us", "bytes")):
+        return -1
+    return 0
+
+
+@dataclass
+class Change:
+    """One metric of one scenario, then and now."""
+
+    scenario: str
+    metric: str
+    before: float
+    after: float
+
+    @property
+    def ratio(self) -> float:
+        return self.after / self.before if self.before else 1.0
+
+    def regressed(self, tolerance: float) -> bool:
+        """Whether the metric got worse by more than the tolerance."""
+        if direction(self.metric) > 0:
+            return self.ratio < 1 - tolerance
+        if direction(self.metric) < 0:
+            return self.ratio > 1 + tolerance
+        return False
+
+
+def compare(baseline: Report, report: Report) -> list[Change]:
+    """Pair up the metrics that appear in both reports."""
+    changes = []
+    for suite, scenarios in report.items():
+        for scenario, row in scenarios.items():
+            before = baseline.get(suite, {}).get(scenario, {})
+            for metric, value in row.items():
+                if metric in before:
+                    changes.append(
+                        Change(
+                            f"{suite}/{scenario}",
+                            metric,
+                            before[metric],
+                            value,
+                        )
+                    )
+    return changes
+
+
+def print_comparison(changes: list[Change], tolerance: float) -> None:
+    table = Table(title=f"against the baseline (tolerance {tolerance:.0%})")
+    table.add_column("scenario", style="bold")
+    table.add_column("metric")
+    for column in ("baseline", "now", "change"):
+        table.add_column(column, justify="right")
+    for change in changes:
+        style = "red" if change.regressed(tolerance) else None
+        table.add_row(
+            change.scenario,
+            change.metric,
+            f"{change.before:.3f}",
+            f"{change.after:.3f}",
+            f"{change.ratio - 1:+.0%}",
+            style=style,
+        )
+    Console().print(table)
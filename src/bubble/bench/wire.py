@@ -0,0 +1,135 @@
+"""Message codecs: the binary wire format against the RDF text formats.
+
+Encodes and decodes two kinds of messages that actually cross vat and
+peer boundaries in bulk: a final Deepgram transcript with per-word
+segments, and an audio chunk carrying a few kilobytes of base64. For
+each format we report the encoded size and the time per round.
+
+Run with ``python -m bubble.bench.wire``.
+"""
+
+import os
+import timeit
+
+from base64 import b64encode
+from typing import Callable
+from datetime import UTC, datetime
+
+from rdflib import RDF, XSD, PROV, TIME, BNode, Graph, Dataset, Literal
+from rdflib.collection import Collection
+
+from swash.mint import fresh_uri
+from swash.prfx import NT, TALK
+from bubble.mesh.wire import zstandard, encode_graph, decode_dataset
+from bubble.bench.base import Results, print_results
+from bubble.bench.pool import BENCH
+
+
+def transcript_message(words: int = 40) -> Graph:
+    """A final transcript shaped like the ones the Deepgram actor makes."""
+    g = Graph(identifier=fresh_uri(BENCH))
+    transcript = fresh_uri(BENCH)
+    stream = fresh_uri(BENCH)
+    segments = []
+    for i in range(words):
+        segment = fresh_uri(BENCH)
+        segments.append(segment)
+        g.add((segment, RDF.type, TALK.WordTranscript))
+        g.add((segment, TALK.hasBareWord, Literal(f"word{i}")))
+        g.add((segment, TALK.hasText, Literal(f"Word{i},")))
+        g.add((segment, TALK.hasConfidence, Literal(0.9 + i / 1000)))
+        g.add((segment, TIME.numericPosition, Literal(i * 0.25)))
+        g.add((segment, TIME.numericDuration, Literal(0.2)))
+        g.add((segment, TIME.hasTRS, stream))
+    words_list = BNode()
+    Collection(g, words_list, segments)
+    g.add((transcript, RDF.type, TALK.Transcript))
+    g.add(
+        (
+            transcript,
+            PROV.generatedAtTime,
+            Literal(datetime.now(UTC), datatype=XSD.dateTime),
+        )
+    )
+    g.add((transcript, TALK.hasText, Literal("word " * words)))
+    g.add((transcript, TALK.hasSubdivision, words_list))
+    return g
+
+
+def chunk_message(size: int = 4096) -> Graph:
+    """An audio chunk as the upload endpoint sends it to an actor."""
+    g = Graph(identifier=fresh_uri(BENCH))
+    g.add((g.identifier, RDF.type, NT.Chunk))
+    g.add(
+        (
+            g.identifier,
+            NT.bytes,
+            Literal(b64encode(os.urandom(size)), datatype=XSD.base64Binary),
+        )
+    )
+    return g
+
+
+def text_codec(fmt: str):
+    def encode(graph: Graph) -> bytes:
+        if fmt in ("trig", "nquads"):
+            dataset = Dataset()
+            named = dataset.graph(graph.identifier)
+            dataset.addN((s, p, o, named) for s, p, o in graph)
+            return dataset.serialize(format=fmt).encode()
+        return graph.serialize(format=fmt).encode()
+
+    def decode(data: bytes) -> Graph:
+        if fmt in ("trig", "nquads"):
+            return Dataset().parse(data=data.decode(), format=fmt)
+        return Graph().parse(data=data.decode(), format=fmt)
+
+    return encode, decode
+
+
+def codecs() -> dict[str, tuple[Callable, Callable]]:
+    found = {
+        "binary": (
+            lambda g: encode_graph(g, compress=False),
+            decode_dataset,
+        ),
+    }
+    if zstandard is not None:
+        found["binary+zstd"] = (
+            lambda g: encode_graph(g, compress=True),
+            decode_dataset,
+        )
+    for fmt in ("trig", "turtle", "nquads"):
+        found[fmt] = text_codec(fmt)
+    return found
+
+
+def measure(graph: Graph, encode, decode, rounds: int) -> Results:
+    data = encode(graph)
+    encoding = timeit.timeit(lambda: encode(graph), number=rounds)
+    decoding = timeit.timeit(lambda: decode(data), number=rounds)
+    return {
+        "bytes": len(data),
+        "encode_us": encoding / rounds * 1e6,
+        "decode_us": decoding / rounds * 1e6,
+    }
+
+
+def run(rounds: int = 200) -> dict[str, Results]:
+    messages = {
+        "transcript": transcript_message(),
+        "chunk": chunk_message(),
+    }
+    return {
+        f"{kind}/{name}": measure(graph, encode, decode, rounds)
+        for kind, graph in messages.items()
+        for name, (encode, decode) in codecs().items()
+    }
+
+
+def main() -> None:
+    print_results("message codecs", run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,25 @@
 """CLI commands for bubble."""
 
-from bubble.cli import info, init, join, tool, serve, shell
+from bubble.cli import (
+    info,
+    init,
+    join,
+    tool,
+    bench,
+    serve,
+    shard,
+    shell,
+)
 from bubble.cli.app import app
 
-__all__ = ["app", "shell", "serve", "info", "join", "tool", "init"]
+__all__ = [
+    "app",
+    "shell",
+    "serve",
+    "info",
+    "join",
+    "tool",
+    "init",
+    "shard",
+    "bench",
+]
@@ -0,0 +1,63 @@
+"""Run the benchmark suite and hold it against the baseline."""
+
+from typing import List, Optional
+from pathlib import Path
+
+import typer
+import trio_asyncio
+
+from typer import Option
+
+from bubble.cli.app import app
+from bubble.bench.base import print_results
+from bubble.bench.suite import (
+    SUITES,
+    BASELINE,
+    DEFAULT_SUITES,
+    compare,
+    run_suites,
+    load_report,
+    save_report,
+    print_comparison,
+)
+
+
+@app.command()
+def bench(
+    suites: Optional[List[str]] = typer.Argument(
+        None, help=f"Suites to run, from {', '.join(SUITES)}"
+    ),
+    baseline: Path = Option(
+        BASELINE, "--baseline", help="Report to compare against"
+    ),
+    save: Optional[Path] = Option(
+        None, "--save", help="Write this run's report here"
+    ),
+    tolerance: float = Option(
+        0.25, "--tolerance", help="Allowed slowdown before complaining"
+    ),
+    strict: bool = Option(
+        False, "--strict", help="Fail if any metric regressed"
+    ),
+) -> None:
+    """Benchmark the actor system and compare against a baseline."""
+    names = suites or DEFAULT_SUITES
+    for name in names:
+        if name not in SUITES:
+            raise typer.BadParameter(f"Unknown suite: {name}")
+
+    report = trio_asyncio.run(run_suites, names)
+    for name, results in report.items():
+        print_results(name, results)
+
+    regressions = 0
+    if baseline.exists():
+        changes = compare(load_report(baseline), report)
+        print_comparison(changes, tolerance)
+        regressions = sum(c.regressed(tolerance) for c in changes)
+
+    if save is not None:
+        save_report(save, report)
+
+    if strict and regressions:
+        raise typer.Exit(1)
@@ -20,12 +20,15 @@ def join(
     anonymous: bool = Option(
         False, "--anonymous", help="Join anonymously without an identity"
     ),
+    binary: bool = Option(
+        False, "--binary", help="Use the binary wire format instead of TriG"
+    ),
 ) -> None:
     """Join a remote town as a simple peer that prints incoming messages."""
-    trio.run(_bubble_join, town, anonymous)
+    trio.run(_bubble_join, town, anonymous, binary)
 
 
-async def _bubble_join(town: str, anonymous: bool) -> None:
+async def _bubble_join(town: str, anonymous: bool, binary: bool) -> None:
     logger = structlog.get_logger()
 
     async def handle_dataset_receiving(ws: WebSocket, actor_uri: URIRef):
@@ -40,12 +43,13 @@ async def _bubble_join(town: str, anonymous: bool) -> None:
 
     try:
         if anonymous:
-            async with anonymous_connection(town) as (ws, me):
+            async with anonymous_connection(town, binary) as (ws, me):
                 await handle_dataset_receiving(ws, me)
 
         else:
             sec, pub = generate_key_pair()
-            async with signed_connection(town, sec, pub) as (ws, me):
+            connection = signed_connection(town, sec, pub, binary)
+            async with connection as (ws, me):
                 await handle_dataset_receiving(ws, me)
 
     except Exception as e:
@@ -27,7 +27,7 @@ from bubble.repo.git import Git
 from bubble.http.cert import generate_self_signed_cert
 from bubble.http.town import Site
 from bubble.mesh.base import this, spawn
-from bubble.repo.repo import Repository
+from bubble.repo.repo import STORES, Repository, open_dataset
 from bubble.tool.chat2024 import ChatCreator
 from bubble.tool.sheet import SheetEditor
 
@@ -108,6 +108,9 @@ def serve(
     nats_url: Optional[str] = Option(
         None, "--nats-url", help="NATS server URL"
     ),
+    store: Optional[str] = Option(
+        None, "--store", help="Triple store: memory, compact or sqlite"
+    ),
 ) -> None:
     """Serve the bubble web interface."""
     # Try to load config.ttl first
@@ -135,6 +138,12 @@ def serve(
         self_signed = config_self_signed
     if nats_url is None:
         nats_url = config_nats_url or os.environ.get("NATS_URL")
+    if store is None:
+        store = os.environ.get("BUBBLE_STORE", "memory")
+    if store not in STORES:
+        raise typer.BadParameter(
+            f"Unknown store {store!r}, try one of {', '.join(STORES)}"
+        )
 
     if not any([cert_file, key_file, self_signed]):
         logger.info(
@@ -152,6 +161,7 @@ def serve(
         key_file=key_file,
         self_signed=self_signed,
         nats_url=nats_url,
+        store=store,
     )
 
     trio_asyncio.run(
@@ -164,6 +174,7 @@ def serve(
         key_file,
         self_signed,
         nats_url,
+        store,
     )
 
 
@@ -176,6 +187,7 @@ async def _serve(
     key_file: str | None = None,
     self_signed: bool = False,
     nats_url: Optional[str] = None,
+    store: str = "memory",
 ) -> None:
     async def start_bash_shell():
         await trio.run_process(
@@ -196,7 +208,8 @@ async def _serve(
     config.log.error_logger = logger.bind(name="hypercorn.error")
 
     git = Git(trio.Path(repo_path))
-    repo = await Repository.create(git, base_url)
+    dataset = open_dataset(store, repo_path)
+    repo = await Repository.create(git, base_url, dataset)
     base_url = repo.get_base_url()
     hostname = urlparse(base_url).hostname
     assert hostname
@@ -220,13 +233,14 @@ async def _serve(
 
     town = Site(base_url, bind, repo)
 
-    if nats_url:
-        logger.info("Setting up NATS clustering", nats_url=nats_url)
-        await town.setup_nats(nats_url)
-
     async with trio.open_nursery() as nursery:
+        if nats_url:
+            logger.info("Setting up NATS clustering", nats_url=nats_url)
+            await town.setup_nats(nursery, nats_url)
+
         here.site.set(Namespace(base_url))
         await repo.load_all()
+        nursery.start_soon(repo.autosave)
 
         with town.install_context():
             with repo.using_new_buffer():
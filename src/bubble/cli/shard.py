@@ -0,0 +1,49 @@
+"""Run a group of vat processes that share one host."""
+
+import os
+import tempfile
+
+from typing import Optional
+
+import trio
+import typer
+
+from typer import Option
+
+from bubble.cli.app import BaseUrl, app
+from bubble.mesh.shard import run_shard, load_entry, run_shards
+
+
+@app.command()
+def shard(
+    entry: str = typer.Argument(
+        ..., help="Entry point as package.module:function"
+    ),
+    site: str = BaseUrl,
+    shards: int = Option(
+        os.cpu_count() or 1, "--shards", help="Number of vat processes"
+    ),
+    socket_dir: Optional[str] = Option(
+        None, "--socket-dir", help="Directory for the vat sockets"
+    ),
+    index: Optional[int] = Option(
+        None, "--index", help="Run only this shard (used by workers)"
+    ),
+) -> None:
+    """Run an entry point in several vats, one process per shard.
+
+    Every shard runs the same async entry point with its own vat bound,
+    and actors are spread across shards by hashing their URIs.
+    """
+    if index is not None:
+        assert socket_dir is not None, "Workers are given a socket dir"
+        trio.run(
+            run_shard, load_entry(entry), site, index, shards, socket_dir
+        )
+    elif socket_dir is not None:
+        trio.run(run_shards, entry, site, shards, socket_dir)
+    else:
+        # The sockets last only as long as the shards listening on
+        # them, so their directory goes when the shards do.
+        with tempfile.TemporaryDirectory(prefix="bubble-vats-") as tmp:
+            trio.run(run_shards, entry, site, shards, tmp)
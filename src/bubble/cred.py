@@ -23,17 +23,19 @@ class InsecureCredentialError(CredentialError):
     pass
 
 
+CREDENTIAL_QUERY = """
+    SELECT ?value
+    WHERE {
+        ?account a nt:ServiceAccount ;
+            nt:forService ?service ;
+            nt:hasPart [ a nt:BearerToken ;
+                        nt:hasValue ?value ] .
+    }
+"""
+
+
 async def get_service_credential(service: URIRef) -> SecretStr:
-    query = """
-        SELECT ?value
-        WHERE {
-            ?account a nt:ServiceAccount ;
-                nt:forService ?service ;
-                nt:hasPart [ a nt:BearerToken ;
-                            nt:hasValue ?value ] .
-        }
-    """
-    value = select_one_row(query, {"service": service})[0]
+    value = select_one_row(CREDENTIAL_QUERY, {"service": service})[0]
     if isinstance(value, Literal):
         if not isinstance(value.value, SecretStr):
             raise InsecureCredentialError(
@@ -0,0 +1,282 @@
+"""The town's actors as numbers, for people and for Prometheus.
+
+The vat keeps an `ActorMetrics` for every actor it hosts. This module
+reads them out two ways: as an RDF graph of `nt:ActorMetrics` nodes
+that the town serves like any other resource, and as the plain text
+exposition format that a Prometheus scraper expects at ``/metrics``,
+where the repository's write lock contention and the SPARQL query
+cache are reported as well.
+"""
+
+from rdflib import XSD, Graph, URIRef, Literal
+
+from swash import here
+from swash.prfx import NT
+from swash.util import new, blank, prepare
+from bubble.mesh.base import Vat, ActorContext
+from bubble.repo.repo import Repository
+from bubble.mesh.metrics import Histogram
+
+
+def mailbox_depth(context: ActorContext) -> int:
+    stats = context.recv.statistics()
+    return stats.current_buffer_used + stats.tasks_waiting_send
+
+
+def describe_histogram(histogram: Histogram):
+    return blank(
+        NT.Histogram,
+        {
+            NT.observations: Literal(histogram.count),
+            NT.sum: Literal(histogram.total, datatype=XSD.double),
+            NT.mean: Literal(histogram.mean, datatype=XSD.double),
+            NT.bucket: [
+                describe_bucket(bound, count)
+                for bound, count in histogram.cumulative()
+            ],
+        },
+    )
+
+
+def describe_bucket(bound: float, count: int):
+    properties = {NT.observations: Literal(count)}
+    # The overflow bucket goes without a bound, as JSON has no infinity.
+    if bound != float("inf"):
+        properties[NT.upperBound] = Literal(bound, datatype=XSD.double)
+    return blank(NT.HistogramBucket, properties)
+
+
+def describe_handler(handler: str, histogram: Histogram):
+    return blank(
+        NT.HandlerTiming,
+        {
+            NT.handler: Literal(handler),
+            NT.handlingTime: describe_histogram(histogram),
+        },
+    )
+
+
+def describe_metrics(system: Vat, id: URIRef) -> Graph:
+    """Build a standalone graph describing every actor's metrics."""
+    graph = Graph(identifier=id, base=str(system.site))
+    graph.bind("nt", NT)
+    with here.graph.bind(graph):
+        actors = []
+        for context in system.deck.values():
+            metrics = context.metrics
+            actors.append(
+                blank(
+                    NT.ActorMetrics,
+                    {
+                        NT.actor: context.addr,
+                        NT.name: Literal(context.name),
+                        NT.dormant: Literal(False),
+                        NT.mailboxDepth: Literal(mailbox_depth(context)),
+                        NT.peakMailboxDepth: Literal(metrics.peak_depth),
+                        NT.messagesReceived: Literal(metrics.received),
+                        NT.duplicatesDropped: Literal(metrics.duplicates),
+                        NT.messageAge: describe_histogram(metrics.age),
+                        NT.handlingTime: describe_histogram(
+                            metrics.handling
+                        ),
+                        NT.handlerTime: [
+                            describe_handler(handler, histogram)
+                            for handler, histogram in sorted(
+                                metrics.handlers.items()
+                            )
+                        ],
+                    },
+                )
+            )
+        # A sleeping actor keeps no metrics, only its name.
+        for dormant in system.dormant.values():
+            actors.append(
+                blank(
+                    NT.ActorMetrics,
+                    {
+                        NT.actor: dormant.addr,
+                        NT.name: Literal(dormant.recipe.name),
+                        NT.dormant: Literal(True),
+                    },
+                )
+            )
+        crashes = [
+            blank(
+                NT.CrashTally,
+                {NT.name: Literal(name), NT.crashCount: Literal(count)},
+            )
+            for name, count in sorted(system.crashes.items())
+        ]
+        new(
+            NT.ActorCensus,
+            {
+                NT.actorSystem: system.curr.get().addr,
+                NT.metrics: actors,
+                NT.crashes: crashes,
+            },
+            subject=id,
+        )
+    return graph
+
+
+def escape_label(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
+
+
+def labels(**pairs: str) -> str:
+    inner = ",".join(f'{k}="{escape_label(v)}"' for k, v in pairs.items())
+    return "{" + inner + "}"
+
+
+def format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def prometheus_histogram(
+    lines: list[str], name: str, actor: dict[str, str], histogram: Histogram
+) -> None:
+    for bound, count in histogram.cumulative():
+        bucket = labels(**actor, le=format_bound(bound))
+        lines.append(f"{name}_bucket{bucket} {count}")
+    lines.append(f"{name}_sum{labels(**actor)} {histogram.total!r}")
+    lines.append(f"{name}_count{labels(**actor)} {histogram.count}")
+
+
+def prometheus_metrics(system: Vat) -> str:
+    """Render the vat's metrics in the Prometheus text format."""
+    contexts = list(system.deck.values())
+    lines = [
+        "# HELP bubble_actor_mailbox_depth Messages waiting to be read.",
+        "# TYPE bubble_actor_mailbox_depth gauge",
+    ]
+    keys = [
+        dict(actor=str(context.addr), name=context.name)
+        for context in contexts
+    ]
+    for key, context in zip(keys, contexts):
+        depth = mailbox_depth(context)
+        lines.append(f"bubble_actor_mailbox_depth{labels(**key)} {depth}")
+
+    lines += [
+        "# HELP bubble_actor_messages_total Messages read by the actor.",
+        "# TYPE bubble_actor_messages_total counter",
+    ]
+    for key, context in zip(keys, contexts):
+        received = context.metrics.received
+        lines.append(
+            f"bubble_actor_messages_total{labels(**key)} {received}"
+        )
+
+    lines += [
+        "# HELP bubble_actor_duplicates_total Messages dropped as repeats.",
+        "# TYPE bubble_actor_duplicates_total counter",
+    ]
+    for key, context in zip(keys, contexts):
+        duplicates = context.metrics.duplicates
+        lines.append(
+            f"bubble_actor_duplicates_total{labels(**key)} {duplicates}"
+        )
+
+    for name, help, attribute in [
+        (
+            "bubble_actor_message_age_seconds",
+            "Time messages spent in the mailbox.",
+            "age",
+        ),
+        (
+            "bubble_actor_handler_seconds",
+            "Time spent handling each message.",
+            "handling",
+        ),
+    ]:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+        for key, context in zip(keys, contexts):
+            histogram = getattr(context.metrics, attribute)
+            prometheus_histogram(lines, name, key, histogram)
+
+    name = "bubble_actor_dispatch_seconds"
+    lines += [
+        f"# HELP {name} Time spent in each handler of a dispatching actor.",
+        f"# TYPE {name} histogram",
+    ]
+    for key, context in zip(keys, contexts):
+        for handler, histogram in sorted(context.metrics.handlers.items()):
+            prometheus_histogram(
+                lines, name, dict(key, handler=handler), histogram
+            )
+
+    lines += [
+        "# HELP bubble_actor_crashes_total Actors that died of an error.",
+        "# TYPE bubble_actor_crashes_total counter",
+    ]
+    for name, count in sorted(system.crashes.items()):
+        lines.append(
+            f"bubble_actor_crashes_total{labels(name=name)} {count}"
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def prometheus_lock_metrics(repo: Repository) -> str:
+    """Render the repository's write lock contention."""
+    locks = {
+        "graph": repo.graph_lock_stats,
+        "catalog": repo.catalog_lock_stats,
+    }
+    lines = []
+    for name, help, attribute in [
+        (
+            "bubble_repo_lock_acquisitions_total",
+            "Times a repository write lock was taken.",
+            "acquired",
+        ),
+        (
+            "bubble_repo_lock_contended_total",
+            "Times a writer found the lock already taken.",
+            "contended",
+        ),
+        (
+            "bubble_repo_lock_wait_seconds_total",
+            "Time writers spent waiting for the lock.",
+            "waited",
+        ),
+    ]:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+        for lock, stats in locks.items():
+            value = getattr(stats, attribute)
+            lines.append(f"{name}{labels(lock=lock)} {value!r}")
+    return "\n".join(lines) + "\n"
+
+
+def prometheus_query_metrics() -> str:
+    """Render how often `select_rows` found its query already prepared."""
+    info = prepare.cache_info()
+    lines = []
+    for name, kind, help, value in [
+        (
+            "bubble_sparql_cache_hits_total",
+            "counter",
+            "Queries that were already prepared.",
+            info.hits,
+        ),
+        (
+            "bubble_sparql_cache_misses_total",
+            "counter",
+            "Queries that had to be parsed first.",
+            info.misses,
+        ),
+        (
+            "bubble_sparql_cache_size",
+            "gauge",
+            "Prepared queries kept for next time.",
+            info.currsize,
+        ),
+    ]:
+        lines += [
+            f"# HELP {name} {help}",
+            f"# TYPE {name} {kind}",
+            f"{name} {value}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -1,9 +1,8 @@
-from collections import defaultdict
-
+import arrow
 import structlog
 
-from rdflib import RDF, Graph, Dataset
-from rdflib.graph import QuotedGraph
+from rdflib import RDF, Graph
+from rdflib.term import Node
 
 from swash import here
 from swash.html import tag, text
@@ -14,6 +13,7 @@ from swash.rdfa import (
     visited_resources,
 )
 from swash.util import S
+from swash.census import GraphStats
 from bubble.http.node import get_node_classes
 from bubble.http.sort import get_traversal_order
 
@@ -51,8 +51,8 @@ def render_graph_view(graph: Graph) -> None:
                 render_node(graph, node)
 
 
-def render_graphs_overview(dataset: Dataset) -> None:
-    """Render an overview of all graphs in the dataset."""
+def render_graphs_overview(stats: dict[Node, GraphStats]) -> None:
+    """Render an overview of all graphs from their census statistics."""
     with tag("div", classes="p-4 flex flex-col gap-6"):
         with tag(
             "h2",
@@ -61,22 +61,15 @@ def render_graphs_overview(dataset: Dataset) -> None:
             text("Available Graphs")
 
         with tag("div", classes="grid gap-4"):
-            # Get all non-formula graphs and sort by triple count (largest first)
-            graphs = [
-                g
-                for g in dataset.graphs()
-                if not isinstance(g, QuotedGraph)
-            ]
-
-            for graph in sorted(graphs, key=len, reverse=True):
-                render_graph_summary(graph)
+            # Sort by triple count (largest first)
+            for identifier, graph_stats in sorted(
+                stats.items(), key=lambda x: x[1].triples, reverse=True
+            ):
+                render_graph_summary(identifier, graph_stats)
 
 
-def render_graph_summary(graph: Graph) -> None:
+def render_graph_summary(identifier: Node, stats: GraphStats) -> None:
     """Render a summary card for a single graph."""
-    subject_count = len(set(graph.subjects()))
-    triple_count = len(graph)
-
     with tag(
         "div",
         classes="border rounded-lg p-4 bg-white dark:bg-gray-800 shadow-sm hover:shadow-md transition-shadow",
@@ -86,20 +79,23 @@ def render_graph_summary(graph: Graph) -> None:
             # Graph ID as link
             with tag(
                 "a",
-                href=f"/graph?graph={str(graph.identifier)}",
+                href=f"/graph?graph={str(identifier)}",
                 classes="text-lg font-medium text-blue-600 dark:text-blue-400 hover:underline",
             ):
-                text(str(graph.identifier))
+                text(str(identifier))
 
             # Stats
             with tag(
                 "div", classes="text-sm text-gray-500 dark:text-gray-400"
             ):
-                text(f"{subject_count} subjects, {triple_count} triples")
+                text(f"{stats.subjects} subjects, {stats.triples} triples")
+                if stats.modified is not None:
+                    text(
+                        f", changed {arrow.get(stats.modified).humanize()}"
+                    )
 
         # Preview of typed resources
-        typed_subjects = {s for s in graph.subjects(RDF.type, None)}
-        if typed_subjects:
+        if stats.types:
             with tag("div", classes="mt-2"):
                 with tag(
                     "h4",
@@ -107,14 +103,9 @@ def render_graph_summary(graph: Graph) -> None:
                 ):
                     text("Resource Types")
 
-                type_counts = defaultdict(int)
-                for s in typed_subjects:
-                    for t in graph.objects(s, RDF.type):
-                        type_counts[t] += 1
-
                 with tag("div", classes="flex flex-wrap gap-2"):
                     for rdf_type, count in sorted(
-                        type_counts.items(),
+                        stats.types.items(),
                         key=lambda x: (-x[1], str(x[0])),
                     ):
                         with tag(
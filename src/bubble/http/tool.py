@@ -29,26 +29,29 @@ from typing import (
     Awaitable,
     AsyncGenerator,
 )
+from functools import cached_property
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 
+import trio
 import structlog
 
 from trio import Nursery
-from rdflib import PROV, Graph, URIRef, Literal
+from rdflib import RDF, PROV, RDFS, Graph, URIRef, Literal
 
 from swash.prfx import NT
-from swash.util import add, new, is_a
+from swash.util import add, new
 from bubble.mesh.otp import (
     ServerActor,
 )
 from bubble.mesh.base import (
+    vat,
     this,
     spawn,
     persist,
     txgraph,
 )
-from bubble.repo.repo import context, timestamp
+from bubble.repo.repo import Repository, context, timestamp
 
 logger = structlog.get_logger()
 
@@ -103,6 +106,18 @@ async def new_persistent_graph() -> AsyncGenerator[URIRef, None]:
         yield graph.identifier
 
 
+def vocab_classes(repo: Repository) -> Graph:
+    """The subclass links of the repository's builtin vocab graphs."""
+    vocab = Graph()
+    for identifier in repo.builtin_graphs():
+        graph = repo.dataset.graph(identifier)
+        vocab.addN(
+            (s, p, o, vocab)
+            for s, p, o in graph.triples((None, RDFS.subClassOf, None))
+        )
+    return vocab
+
+
 def create_button(
     label: str,
     icon: Optional[str],
@@ -236,6 +251,10 @@ class DispatchingActor(ServerActor):
         Dict[URIRef, Callable[[Self, DispatchContext], Awaitable[Graph]]]
     ] = {}
 
+    #: Also route messages whose type is a subclass of a handled type,
+    #: following rdfs:subClassOf in the repository's vocab graphs.
+    dispatch_subclasses: ClassVar[bool] = False
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
 
@@ -259,6 +278,39 @@ class DispatchingActor(ServerActor):
     async def setup(self, actor_uri: URIRef):
         pass
 
+    @cached_property
+    def dispatch_index(self) -> Dict[URIRef, URIRef]:
+        """Map each dispatchable message type to the handled type.
+
+        Built once per actor, so dispatch is a dictionary lookup per
+        rdf:type of the message rather than a scan over every handler.
+        """
+        index = {msg_type: msg_type for msg_type in self._message_handlers}
+        if self.dispatch_subclasses:
+            vocab = vocab_classes(context.repo.get())
+            for msg_type in self._message_handlers:
+                for subclass in vocab.transitive_subjects(
+                    RDFS.subClassOf, msg_type
+                ):
+                    if isinstance(subclass, URIRef):
+                        index.setdefault(subclass, msg_type)
+        return index
+
+    def dispatch(self, request_id: URIRef, graph: Graph) -> URIRef:
+        """Find the handled message type for a request."""
+        index = self.dispatch_index
+        matches = {
+            index[t]
+            for t in graph.objects(request_id, RDF.type)
+            if t in index
+        }
+        if not matches:
+            raise ValueError(f"Unexpected message type: {request_id}")
+        if len(matches) == 1:
+            return matches.pop()
+        # Several handlers apply; the one registered first wins.
+        return next(t for t in self._message_handlers if t in matches)
+
     async def handle(self, nursery: Nursery, graph: Graph) -> Graph:
         request_id = graph.identifier
         if not isinstance(request_id, URIRef):
@@ -272,11 +324,22 @@ class DispatchingActor(ServerActor):
             request_id=request_id,
         )
 
-        for msg_type, handler_method in self._message_handlers.items():
-            if is_a(request_id, msg_type, graph):
-                return await handler_method(self, ctx)
+        handler_method = self._message_handlers[
+            self.dispatch(request_id, graph)
+        ]
 
-        raise ValueError(f"Unexpected message type: {request_id}")
+        started = trio.current_time()
+        try:
+            return await handler_method(self, ctx)
+        finally:
+            elapsed = trio.current_time() - started
+            metrics = vat.get().curr.get().metrics
+            metrics.handled(handler_method.__name__, elapsed)
+            logger.debug(
+                "handled message",
+                handler=handler_method.__name__,
+                seconds=elapsed,
+            )
 
     def current_graph(self) -> Graph:
         """Convenience to return the current context graph."""
@@ -40,7 +40,12 @@ from fastapi import (
     HTTPException,
     WebSocketDisconnect,
 )
-from fastapi.responses import JSONResponse, StreamingResponse
+from rdflib.term import Node
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.datastructures import UploadFile
@@ -56,11 +61,8 @@ from swash.rdfa import (
     render_affordance_resource,
 )
 from swash.util import P, new
-from bubble.audio.whisper import (
-    create_whisper_actor,
-    whisper_transcribe_actor,
-)
 from bubble.keys import build_did_document, parse_public_key_hex
+from swash.census import GraphStats
 from bubble.mesh.otp import record_message
 from bubble.http.eval import eval_code, eval_form
 from bubble.http.icon import favicon
@@ -77,10 +79,29 @@ from bubble.mesh.base import (
 )
 from bubble.mesh.call import call
 from bubble.repo.repo import Repository, context
+from bubble.http.trace import (
+    render_trace,
+    describe_trace,
+    render_trace_list,
+)
+from bubble.mesh.trace import TRACE_HEADER
 from bubble.http.render import render_graph_view, render_graphs_overview
+from bubble.http.metrics import (
+    describe_metrics,
+    prometheus_metrics,
+    prometheus_lock_metrics,
+    prometheus_query_metrics,
+)
+from bubble.audio.whisper import (
+    create_whisper_actor,
+    whisper_transcribe_actor,
+)
 
 logger = structlog.get_logger(__name__)
 
+#: Requests that can set actors in motion, and so are traced.
+TRACED_METHODS = {"POST", "PUT"}
+
 
 class LinkedDataResponse(HypermediaResponse):
     """A response that speaks the language of linked data.
@@ -239,6 +260,7 @@ class Site:
             allow_methods=["*"],
             allow_headers=["*"],
         )
+        self.app.middleware("http")(self.trace_request)
         self.app.middleware("http")(self.bind_document)
         self.app.middleware("http")(self.bind_actor_system)
         self.app.middleware("http")(self.bind_bubble)
@@ -248,6 +270,26 @@ class Site:
         with document():
             return await call_next(request)
 
+    async def trace_request(self, request: Request, call_next):
+        """Start a trace for requests that talk to actors.
+
+        A request carrying a traceparent header continues that trace
+        instead, and the response names the span it was served in.
+        """
+        traceparent = request.headers.get(TRACE_HEADER)
+        if request.method not in TRACED_METHODS and traceparent is None:
+            return await call_next(request)
+        with self.vat.tracer.span(
+            f"{request.method} {request.url.path}",
+            self.vat.this(),
+            traceparent=traceparent,
+            root=True,
+        ) as span:
+            assert span is not None
+            response = await call_next(request)
+        response.headers[TRACE_HEADER] = span.traceparent
+        return response
+
     async def bind_actor_system(self, request, call_next):
         with vat.bind(self.vat):
             return await call_next(request)
@@ -274,6 +316,10 @@ class Site:
 
         self.app.get("/")(self.root)
         self.app.get("/health")(self.health_check)
+        self.app.get("/metrics")(self.metrics)
+        self.app.get("/actors")(self.actor_metrics)
+        self.app.get("/traces")(self.trace_list)
+        self.app.get("/traces/{trace_id}")(self.trace_view)
         self.app.get("/favicon.ico")(self.favicon)
         self.app.get("/.well-known/did.json")(self.get_did_document)
         self.app.get("/.well-known/did.html")(self.get_did_document_html)
@@ -337,6 +383,36 @@ class Site:
             generate_health_status(id)
             return JSONLinkedDataResponse()
 
+    async def metrics(self):
+        return PlainTextResponse(
+            prometheus_metrics(self.vat)
+            + prometheus_lock_metrics(self.repo)
+            + prometheus_query_metrics(),
+            media_type="text/plain; version=0.0.4",
+        )
+
+    async def actor_metrics(self):
+        # Built fresh on every request and never stored, since the
+        # numbers are stale by the time anyone could read them back.
+        graph = describe_metrics(self.vat, self.site["actors"])
+        return JSONLinkedDataResponse(graph)
+
+    async def trace_list(self):
+        with base_shell("Traces"):
+            render_trace_list(self.vat.tracer.traces(), self.site)
+        return HypermediaResponse()
+
+    async def trace_view(self, trace_id: str, request: Request):
+        spans = self.vat.tracer.trace(trace_id)
+        if not spans:
+            raise HTTPException(status_code=404, detail="Trace not found")
+        graph = describe_trace(spans, self.site[f"traces/{trace_id}"])
+        if "application/ld+json" in request.headers.get("accept", ""):
+            return JSONLinkedDataResponse(graph)
+        with base_shell("Trace"):
+            render_trace(graph)
+        return HypermediaResponse()
+
     async def get_did_document(self):
         did_uri = URIRef(
             str(self.site).replace("https://", "did:web:").rstrip("/")
@@ -464,12 +540,12 @@ class Site:
             await websocket.close()
 
     async def resource_get(self, id: str):
-        with base_shell("Resource"):
-            with autoexpanding(depth=2):
-                render_affordance_resource(
-                    URIRef(id),
-                    get_subject_data(here.dataset.get(), URIRef(id)),
-                )
+        subject = URIRef(id)
+        await self.repo.read(
+            render_resource_page,
+            subject,
+            graphs=self.repo.graphs_around(subject),
+        )
         return HypermediaResponse()
 
     async def actor_get(self, id: str):
@@ -701,9 +777,9 @@ class Site:
         """Handle word lookup form submission."""
         return await word_lookup(word, pos)
 
-    async def setup_nats(self, nats_url: str):
+    async def setup_nats(self, nursery: trio.Nursery, nats_url: str):
         """Set up NATS clustering."""
-        await self.vat.setup_nats(nats_url)
+        await self.vat.setup_nats(nursery, nats_url)
 
 
 @contextmanager
@@ -728,33 +804,51 @@ def town_app(
     return app.get_fastapi_app()
 
 
+def render_resource_page(subject: URIRef) -> None:
+    with base_shell("Resource"):
+        with autoexpanding(depth=2):
+            render_affordance_resource(
+                subject, get_subject_data(here.dataset.get(), subject)
+            )
+
+
+async def graphs_view(request: Request):
+    """Handler for viewing all graphs in the bubble.
+
+    The repository's census keeps count of every graph as it is
+    written, so unlike the pages that walk the dataset this reads no
+    triples, and needs neither a snapshot nor a worker thread.
+    """
+    render_graphs_page(context.repo.get().census.stats())
+    return HypermediaResponse()
+
+
 @html.div("min-h-screen bg-gray-50 dark:bg-gray-900")
-def graphs_view(request: Request):
-    """Handler for viewing all graphs in the bubble."""
-    repo = context.repo.get()
+def render_graphs_page(stats: dict[Node, GraphStats]) -> None:
     with base_shell("Graphs"):
-        render_graphs_overview(repo.dataset)
-        return HypermediaResponse()
+        render_graphs_overview(stats)
 
 
-def graph_view(request: Request):
+async def graph_view(request: Request):
     """Handler for viewing complete graphs."""
     graph_id = request.query_params.get("graph")
     if not graph_id:
         raise HTTPException(status_code=400, detail="No graph ID provided")
 
-    graph = None
+    # The page needs its own graph, and the vocabularies for labels.
     repo = context.repo.get()
-
-    # Try to find the graph in the bubble's dataset
-    for g in repo.dataset.graphs():
-        if str(g.identifier) == graph_id:
-            graph = g
-            break
-
-    if not graph:
+    scope = frozenset([URIRef(graph_id), *repo.builtin_graphs()])
+    found = await repo.read(render_graph_page, graph_id, graphs=scope)
+    if not found:
         raise HTTPException(status_code=404, detail="Graph not found")
+    return HypermediaResponse()
 
-    with base_shell("Graph"):
-        render_graph_view(graph)
-        return HypermediaResponse()
+
+def render_graph_page(graph_id: str) -> bool:
+    # Try to find the graph in the bubble's dataset
+    for graph in here.dataset.get().graphs():
+        if str(graph.identifier) == graph_id:
+            with base_shell("Graph"):
+                render_graph_view(graph)
+            return True
+    return False
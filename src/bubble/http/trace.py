@@ -0,0 +1,165 @@
+"""Pages for looking at traces, to see where a slow request lingered.
+
+A trace is read out of the vat's `Tracer` into a small RDF graph of
+`nt:Span` nodes, which the town serves as JSON-LD or renders as a
+waterfall: one row per span, indented under the span that caused it,
+with a bar showing when it ran relative to the whole trace.
+"""
+
+from datetime import UTC, datetime
+from collections import defaultdict
+
+from rdflib import RDF, XSD, BNode, Graph, URIRef, Literal, Namespace
+
+from swash import here
+from swash.html import tag, text
+from swash.prfx import NT
+from swash.rdfa import render_value
+from swash.util import new, blank
+from bubble.mesh.trace import Span
+
+
+def describe_trace(spans: list[Span], id: URIRef) -> Graph:
+    """Build a standalone graph of one trace's spans."""
+    graph = Graph(identifier=id, base=str(id))
+    graph.bind("nt", NT)
+    if not spans:
+        return graph
+    begun = min(span.start for span in spans)
+    with here.graph.bind(graph):
+        nodes = []
+        for span in spans:
+            properties = {
+                NT.name: Literal(span.name),
+                NT.spanId: Literal(span.span_id),
+                NT.startedAt: Literal(
+                    datetime.fromtimestamp(span.start, UTC),
+                    datatype=XSD.dateTime,
+                ),
+                NT.offset: Literal(span.start - begun, datatype=XSD.double),
+                NT.duration: Literal(span.duration, datatype=XSD.double),
+            }
+            if span.parent_id is not None:
+                properties[NT.parentSpan] = Literal(span.parent_id)
+            if span.actor is not None:
+                properties[NT.actor] = span.actor
+            if span.peer is not None:
+                properties[NT.peer] = span.peer
+            nodes.append(blank(NT.Span, properties))
+        new(
+            NT.Trace,
+            {NT.traceId: Literal(spans[0].trace_id), NT.span: nodes},
+            subject=id,
+        )
+    return graph
+
+
+def waterfall(graph: Graph) -> list[tuple[int, BNode]]:
+    """The spans in causal order, each with its depth in the tree."""
+    spans = list(graph.subjects(RDF.type, NT.Span))
+    ids = {str(graph.value(span, NT.spanId)): span for span in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in spans:
+        parent = graph.value(span, NT.parentSpan)
+        if parent is not None and str(parent) in ids:
+            children[ids[str(parent)]].append(span)
+        else:
+            roots.append(span)
+
+    def offset(span):
+        return graph.value(span, NT.offset).toPython()
+
+    rows = []
+
+    def visit(span, depth):
+        rows.append((depth, span))
+        for child in sorted(children[span], key=offset):
+            visit(child, depth + 1)
+
+    for root in sorted(roots, key=offset):
+        visit(root, 0)
+    return rows
+
+
+def render_trace(graph: Graph) -> None:
+    """Render a trace graph as a waterfall of its spans."""
+    rows = waterfall(graph)
+    total = max(
+        (
+            graph.value(span, NT.offset).toPython()
+            + graph.value(span, NT.duration).toPython()
+            for _, span in rows
+        ),
+        default=0.0,
+    )
+
+    with tag.div(classes="p-4 flex flex-col gap-4"):
+        with tag.h1(classes="text-2xl font-bold"):
+            text(f"Trace {graph.value(graph.identifier, NT.traceId)}")
+        with tag.p(classes="opacity-70"):
+            text(f"{len(rows)} spans over {total * 1000:.2f} ms")
+        with tag.table(classes="w-full text-sm"):
+            for depth, span in rows:
+                render_span_row(graph, span, depth, total)
+
+
+def render_span_row(graph: Graph, span: BNode, depth: int, total: float):
+    offset = graph.value(span, NT.offset).toPython()
+    duration = graph.value(span, NT.duration).toPython()
+    left = offset / total * 100 if total else 0.0
+    width = max(duration / total * 100 if total else 0.0, 0.5)
+
+    with tag.tr(classes="border-b border-gray-300/30"):
+        with tag.td(
+            classes="font-mono whitespace-nowrap pr-4",
+            style=f"padding-left: {depth * 1.5}em",
+        ):
+            text(str(graph.value(span, NT.name)))
+        for predicate in (NT.actor, NT.peer):
+            with tag.td(classes="pr-4"):
+                value = graph.value(span, predicate)
+                if value is not None:
+                    render_value(value, predicate)
+        with tag.td(classes="font-mono text-right whitespace-nowrap pr-4"):
+            text(f"{duration * 1000:.2f} ms")
+        with tag.td(classes="w-1/2"):
+            with tag.div(classes="relative h-3"):
+                with tag.div(
+                    classes="absolute h-3 rounded bg-blue-500",
+                    style=f"left: {left:.2f}%; width: {width:.2f}%",
+                ):
+                    pass
+
+
+def render_trace_list(traces: list[list[Span]], site: Namespace) -> None:
+    """Render links to recent traces, newest first."""
+    with tag.div(classes="p-4 flex flex-col gap-4"):
+        with tag.h1(classes="text-2xl font-bold"):
+            text("Recent traces")
+        with tag.table(classes="text-sm"):
+            for spans in traces:
+                first = spans[0]
+                duration = (
+                    max(span.start + span.duration for span in spans)
+                    - first.start
+                )
+                with tag.tr():
+                    with tag.td(classes="font-mono pr-4"):
+                        with tag.a(
+                            href=str(site[f"traces/{first.trace_id}"]),
+                            classes="text-blue-600 dark:text-slate-400",
+                        ):
+                            text(first.trace_id[:12])
+                    with tag.td(classes="font-mono pr-4"):
+                        text(first.name)
+                    with tag.td(classes="pr-4"):
+                        text(
+                            datetime.fromtimestamp(
+                                first.start, UTC
+                            ).isoformat(timespec="seconds")
+                        )
+                    with tag.td(classes="font-mono text-right pr-4"):
+                        text(f"{len(spans)} spans")
+                    with tag.td(classes="font-mono text-right"):
+                        text(f"{duration * 1000:.2f} ms")
@@ -1,5 +1,5 @@
 """Mesh networking package for Bubble."""
 
-from . import otp, base, call
+from . import otp, base, call, pool, shard
 
-__all__ = ["base", "call", "otp"]
+__all__ = ["base", "call", "otp", "pool", "shard"]
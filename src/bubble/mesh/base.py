@@ -9,10 +9,14 @@ Sadly, it took the industry several decades of pain with shared-state concurrenc
 before realizing he was right all along.
 """
 
+import secrets
+
 from typing import (
+    Any,
     Set,
     Dict,
     Callable,
+    Iterable,
     Optional,
     Protocol,
     Awaitable,
@@ -20,14 +24,25 @@ from typing import (
     MutableMapping,
 )
 from datetime import UTC, datetime
+from itertools import chain
 from contextlib import contextmanager, asynccontextmanager
-from collections import defaultdict
-from dataclasses import dataclass
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import field, dataclass
 
 import trio
 import structlog
 
-from rdflib import XSD, PROV, RDFS, Graph, URIRef, Literal, Namespace
+from rdflib import (
+    XSD,
+    PROV,
+    RDFS,
+    Graph,
+    URIRef,
+    Dataset,
+    Literal,
+    Namespace,
+)
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
 from typing_extensions import runtime_checkable
 from cryptography.hazmat.primitives.asymmetric import ed25519
 
@@ -41,11 +56,92 @@ from bubble.keys import (
     create_identity_graph,
     generate_identity_uri,
 )
+from bubble.mesh.wire import is_binary, encode_quads, decode_dataset
 from bubble.repo.repo import context
+from bubble.mesh.trace import Tracer, stamp_triples
+from bubble.mesh.metrics import ActorMetrics
 
 logger = structlog.get_logger()
 
 
+@dataclass(frozen=True)
+class Batching:
+    """How an actor's messages to other vats may be held and coalesced.
+
+    Messages bound for the same vat are collected for up to `delay`
+    seconds and sent as one frame, or sooner once `max_messages` or
+    `max_bytes` pile up. Actor classes opt in with a `batching` class
+    attribute; everyone else's messages go out one by one, at once.
+    """
+
+    delay: float = 0.002
+    max_messages: int = 64
+    max_bytes: int = 256 * 1024
+
+
+@dataclass(frozen=True)
+class Dedupe:
+    """How long an actor remembers the idempotency keys it has seen.
+
+    A message whose key was seen within the last `ttl` seconds, among
+    the last `max_keys` keys, is dropped before it reaches the mailbox.
+    Actor classes may set a `dedupe` class attribute to widen or narrow
+    the window; everyone else gets the default.
+    """
+
+    max_keys: int = 1024
+    ttl: float = 600.0
+
+
+class Transport(Protocol):
+    """A way to reach actors that live in other vats.
+
+    The vat hands a transport the serialized message for any actor not
+    in its own deck, and feeds whatever the transport receives back into
+    local mailboxes. NATS is one such transport; sibling vats on the
+    same host talking over Unix sockets are another.
+
+    The vat also tells its transport when actors start and stop, so
+    that transports which keep a directory of actor locations can
+    announce them to the rest of the cluster.
+    """
+
+    connected: bool
+
+    async def send_actor_message(
+        self,
+        actor_uri: str,
+        message: bytes,
+        batching: Optional[Batching] = None,
+    ) -> None: ...
+
+    async def subscribe_to_actor_messages(
+        self, cb: Callable[[str, bytes], Awaitable[None]]
+    ) -> None: ...
+
+    async def actor_started(self, actor_uri: str) -> None: ...
+
+    async def actor_stopped(self, actor_uri: str) -> None: ...
+
+
+@runtime_checkable
+class RequestTransport(Transport, Protocol):
+    """A transport that can carry a request and its reply in one trip.
+
+    The request names a reply address that lives nowhere; when the
+    remote actor sends its reply there, the transport on the far side
+    routes it straight back to the waiting caller.
+    """
+
+    async def request_actor_message(
+        self,
+        actor_uri: str,
+        message: bytes,
+        reply_to: str,
+        timeout: float,
+    ) -> bytes: ...
+
+
 @runtime_checkable
 class SetupableActor(Protocol):
     """An actor that requires initialization before its performance begins.
@@ -57,6 +153,18 @@ class SetupableActor(Protocol):
     async def setup(self, actor_uri: URIRef): ...
 
 
+@runtime_checkable
+class RestorableActor(Protocol):
+    """An actor that can be made again from what it left in its graph.
+
+    Only these may be passivated, since a sleeping actor keeps nothing
+    of itself in memory but how to make it again.
+    """
+
+    @classmethod
+    def rehydrate(cls, actor: URIRef) -> Any: ...
+
+
 def fresh_uri(site: Optional[Namespace] = None) -> URIRef:
     """Generate a fresh URI for a new entity in our digital theater.
 
@@ -88,6 +196,55 @@ class ActorContext:
     recv: trio.MemoryReceiveChannel  # Our ear to the world
     name: str = "anonymous"  # For those who prefer not to be just a URI
     trap: bool = False  # To trap or not to trap, that is the exception
+    batching: Optional[Batching] = None  # How we post to other vats
+    crib: Optional[trio.Nursery] = None  # Where our task runs
+    code: Optional[Callable[..., Awaitable[None]]] = None  # What we run
+    args: tuple = ()  # And what we run it with
+    metrics: ActorMetrics = field(default_factory=ActorMetrics)
+    dedupe: Dedupe = Dedupe()  # How long we remember idempotency keys
+    #: When each recently delivered idempotency key arrived, oldest first.
+    seen: OrderedDict[str, float] = field(default_factory=OrderedDict)
+
+    def first_sighting(self, key: str) -> bool:
+        """Remember an idempotency key, saying if it is new to us."""
+        now = trio.current_time()
+        while self.seen and next(iter(self.seen.values())) < (
+            now - self.dedupe.ttl
+        ):
+            self.seen.popitem(last=False)
+        if key in self.seen:
+            return False
+        while len(self.seen) >= self.dedupe.max_keys:
+            self.seen.popitem(last=False)
+        self.seen[key] = now
+        return True
+
+
+@dataclass
+class Recipe:
+    """How an actor was spawned, so that it can be started again."""
+
+    kind: type[RestorableActor]  # Whose `rehydrate` makes the actor
+    args: tuple  # What it was called with
+    name: str
+    boss: URIRef
+    crib: Optional[trio.Nursery]  # Where it last ran
+
+
+@dataclass
+class Dormant:
+    """An idle actor that has given up its task, its mailbox and itself.
+
+    What is left is its address, how to make it again, and the graph
+    it lived in, which holds whatever `hibernate` saved of it. The next
+    message makes it again from that graph at the same address, as if
+    it had never left.
+    """
+
+    addr: URIRef
+    proc: URIRef  # The process that went to sleep
+    recipe: Recipe
+    graph: URIRef
 
 
 def root_context(site: Namespace, name: str = "root") -> ActorContext:
@@ -110,8 +267,9 @@ def new_context(parent: URIRef, name: str = "unnamed") -> ActorContext:
     universe seems to favor powers of 2, who are we to argue?
     """
     chan_send, chan_recv = trio.open_memory_channel(8)
+    addr = vat.get().mint_actor_uri()
     return ActorContext(
-        parent, fresh_uri(), fresh_uri(), chan_send, chan_recv, name=name
+        parent, addr, fresh_uri(), chan_send, chan_recv, name=name
     )
 
 
@@ -131,15 +289,61 @@ def with_transient_graph(
         yield g.identifier
 
 
+def encode_keyed(message: Graph, extra: Iterable = ()) -> bytes:
+    """Encode a message for another vat under an idempotency key.
+
+    A transport that retries may get the same bytes across twice; the
+    key lets the receiving vat deliver them once. Messages that already
+    have a key keep it. Otherwise a fresh one goes into the encoding
+    only, so that sending the same graph again counts as a new message.
+    The `extra` triples, like a trace stamp, go into the encoding only
+    too; the graph itself is left alone.
+    """
+    extra = list(extra)
+    if (message.identifier, NT.idempotencyKey, None) not in message:
+        extra.append(
+            (
+                message.identifier,
+                NT.idempotencyKey,
+                Literal(secrets.token_hex(16)),
+            )
+        )
+    return encode_quads(
+        (s, p, o, message.identifier) for s, p, o in chain(message, extra)
+    )
+
+
+def parse_message(data: bytes) -> Graph:
+    """Parse a message in the binary wire format or TriG.
+
+    Handlers identify requests by the graph's identifier, so parsing
+    into an anonymous graph would lose the one thing they look at.
+    """
+    if is_binary(data):
+        dataset = decode_dataset(data)
+    else:
+        dataset = Dataset()
+        dataset.parse(data=data.decode(), format="trig")
+    for graph in dataset.graphs():
+        if graph.identifier != DATASET_DEFAULT_GRAPH_ID:
+            return graph
+    return dataset.default_context
+
+
 class Vat:
     site: Namespace
     curr: Parameter[ActorContext]
     deck: MutableMapping[URIRef, ActorContext]
+    dormant: Dict[URIRef, Dormant]
+    crashes: Counter[str]
+    tracer: Tracer
     yell: structlog.stdlib.BoundLogger
     private_key: ed25519.Ed25519PrivateKey
     public_key: ed25519.Ed25519PublicKey
     identity_uri: URIRef
     base_url: str
+    transport: Optional[Transport]
+    placement: Optional[Callable[[str], bool]]
 
     def __init__(
         self,
@@ -149,7 +353,8 @@ class Vat:
         self.site = Namespace(site)
         self.base_url = str(self.site[""])
         self.yell = yell.bind(site=site)
-        self.nats = None
+        self.transport = None
+        self.placement = None
 
         # Generate Ed25519 keypair
         self.private_key, self.public_key = generate_keypair()
@@ -159,50 +364,266 @@ class Vat:
         root = root_context(self.site)
         self.curr = Parameter("current_actor", root)
         self.deck = {root.addr: root}
+        self.dormant = {}
+        self.crashes = Counter()
+        self.tracer = Tracer()
 
-    async def setup_nats(self, nats_url: str):
+    async def setup_nats(self, nursery: trio.Nursery, nats_url: str):
         """Set up NATS for mesh networking."""
-        from bubble.mesh.nats import TrioNatsClient
+        from bubble.mesh.nats import NatsClient
 
-        self.nats = TrioNatsClient(nats_url)
-        await self.nats.connect()
+        nats = NatsClient(nursery, nats_url)
+        await nats.connect()
+        await self.join_nats(nursery, nats)
 
-        async def handle_remote_actor_message(
-            actor_uri: str, message: bytes
-        ):
-            """Handle messages received from other nodes in the cluster."""
-            actor = URIRef(actor_uri)
-            if actor not in self.deck:
-                # Message is not for an actor on this node
-                return
+    async def join_nats(self, nursery: trio.Nursery, client: Any):
+        """Join a cluster through a connected NATS client.
 
-            # Parse the message into a graph
-            g = Graph()
-            g.parse(data=message.decode(), format="trig")
+        Anything with the interface of `bubble.mesh.nats.NatsClient`
+        will do, such as a client of the in-process broker.
+        """
+        from bubble.mesh.nats import NatsTransport
 
-            # Send to local actor
-            await self.deck[actor].send.send(g)
+        await self.attach_transport(
+            NatsTransport(nursery, client, self.vat_id, self.hosts)
+        )
+
+    async def setup_shards(
+        self,
+        nursery: trio.Nursery,
+        shard: int,
+        shards: int,
+        socket_dir: str,
+    ):
+        """Join a group of sibling vats sharing this host.
+
+        Actors spawned from now on get addresses that hash to this
+        shard, and messages for addresses owned by a sibling go to it
+        over a Unix socket.
+        """
+        from bubble.mesh.shard import ShardLink
+
+        link = ShardLink(nursery, shard, shards, socket_dir)
+        self.placement = link.owns
+        await self.attach_transport(link)
+
+    async def attach_transport(self, transport: Transport):
+        """Route messages for non-local actors through a transport."""
+        self.transport = transport
+        await transport.subscribe_to_actor_messages(self.deliver_remote)
+
+    @property
+    def vat_id(self) -> str:
+        """A short id for this vat, unique within a cluster."""
+        return self.get_public_key_hex()[:16]
+
+    def hosts(self, actor_uri: str) -> bool:
+        actor = URIRef(actor_uri)
+        return actor in self.deck or actor in self.dormant
+
+    async def deliver_remote(self, actor_uri: str, message: bytes):
+        """Handle messages received from other nodes in the cluster."""
+        actor = URIRef(actor_uri)
+        if not self.hosts(actor):
+            # Message is not for an actor on this node
+            return
+
+        # Send to local actor
+        await self.deliver_local(actor, parse_message(message))
+
+    async def deliver_local(self, actor: URIRef, message: Graph):
+        """Put a message in a local mailbox, waking its actor if asleep."""
+        if actor in self.dormant:
+            self.wake(actor)
+        context = self.deck[actor]
+        key = message.value(message.identifier, NT.idempotencyKey)
+        if key is not None and not context.first_sighting(str(key)):
+            context.metrics.duplicates += 1
+            self.yell.info(
+                "dropped duplicate message", actor=actor, key=key
+            )
+            return
+        # Only actors that read their mail through `receive` can tell
+        # how long it waited; other mailboxes are drained elsewhere.
+        if context.code is not None:
+            stats = context.recv.statistics()
+            context.metrics.posted(
+                message,
+                stats.current_buffer_used + stats.tasks_waiting_send,
+            )
+        try:
+            await context.send.send(message)
+        except BaseException:
+            context.metrics.withdrawn(message)
+            if key is not None:
+                # It never got in, so a retry is no duplicate.
+                context.seen.pop(str(key), None)
+            raise
+
+    def passivate(self) -> bool:
+        """Put the current actor to sleep until its next message.
+
+        Its task should return right after; the mailbox is closed and
+        the actor leaves the deck, but it keeps its address, and the
+        next message sent to it starts a fresh process running the same
+        code. Refuses, returning False, if mail is already waiting.
+        """
+        context = self.curr.get()
+        stats = context.recv.statistics()
+        if stats.current_buffer_used or stats.tasks_waiting_send:
+            return False
+        # It must be possible to make the actor again, from a graph
+        # that will still be there.
+        code = context.code
+        graph = here.graph.get().identifier
+        if not isinstance(code, RestorableActor):
+            return False
+        if not isinstance(graph, URIRef):
+            return False
 
-        await self.nats.subscribe_to_actor_messages(
-            handle_remote_actor_message
+        del self.deck[context.addr]
+        context.send.close()
+        self.dormant[context.addr] = Dormant(
+            addr=context.addr,
+            proc=context.proc,
+            recipe=Recipe(
+                type(code),
+                context.args,
+                context.name,
+                context.boss,
+                context.crib,
+            ),
+            graph=graph,
         )
+        self.yell.info("passivated actor", actor=context.addr)
+        return True
+
+    def wake(self, actor: URIRef) -> None:
+        """Make a passivated actor again and start it in a new process.
+
+        The actor comes back in the graph it slept in, which is also
+        where its new process is recorded, as `spawn` records the first
+        one in the graph it spawns into. It wakes in the nursery it last
+        ran in, or if that one has closed, its boss's, and so on up.
+        """
+        dormant = self.dormant[actor]
+        recipe = dormant.recipe
+        send, recv = trio.open_memory_channel[Graph](8)
+
+        with context.bind_graph(dormant.graph):
+            code = recipe.kind.rehydrate(actor)
+            process = ActorContext(
+                boss=recipe.boss,
+                addr=actor,
+                proc=fresh_uri(self.site),
+                send=send,
+                recv=recv,
+                name=recipe.name,
+                batching=getattr(code, "batching", None),
+                dedupe=getattr(code, "dedupe", Dedupe()),
+                code=code,
+                args=recipe.args,
+            )
+
+            new(
+                NT.ActorProcess,
+                {
+                    PROV.startedAtTime: Literal(
+                        datetime.now(UTC), datatype=XSD.dateTime
+                    ),
+                    PROV.wasInformedBy: dormant.proc,
+                },
+                process.proc,
+            )
+            add(actor, {PROV.wasAssociatedWith: process.proc})
+
+            for crib in self.cribs(recipe.crib, recipe.boss):
+                try:
+                    crib.start_soon(
+                        self.run_actor, process, code, recipe.args
+                    )
+                except RuntimeError:
+                    continue  # That nursery has closed for good.
+                process.crib = crib
+                del self.dormant[actor]
+                self.deck[actor] = process
+                self.yell.info("woke actor", actor=actor)
+                return
+
+        raise ValueError(f"No nursery left to wake actor {actor}")
+
+    def cribs(
+        self, crib: Optional[trio.Nursery], boss: URIRef
+    ) -> Generator[trio.Nursery, None, None]:
+        """The nurseries an actor might run in, nearest first."""
+        seen = set()
+        while True:
+            if crib is not None:
+                yield crib
+            if boss in seen:
+                return
+            seen.add(boss)
+            if (awake := self.deck.get(boss)) is not None:
+                crib, boss = awake.crib, awake.boss
+            elif (asleep := self.dormant.get(boss)) is not None:
+                crib, boss = asleep.recipe.crib, asleep.recipe.boss
+            else:
+                return
+
+    async def request(
+        self, actor: URIRef, message: Graph, timeout: float
+    ) -> Graph:
+        """Send a request to a remote actor and wait for its reply.
+
+        Raises `trio.TooSlowError` if no reply comes within `timeout`.
+        """
+        if not isinstance(self.transport, RequestTransport):
+            raise ValueError(f"No request route to actor {actor}")
+        reply_to = self.mint_actor_uri()
+        message.add((message.identifier, NT.replyTo, reply_to))
+        with self.tracer.span("send", self.this(), actor) as span:
+            stamp = [] if span is None else stamp_triples(message, span)
+            reply = await self.transport.request_actor_message(
+                str(actor),
+                encode_keyed(message, stamp),
+                str(reply_to),
+                timeout,
+            )
+        return parse_message(reply)
+
+    def mint_actor_uri(self) -> URIRef:
+        """Mint the address of a new actor hosted by this vat.
+
+        When the vat is one shard among siblings, we keep minting until
+        the address hashes to this shard, so that any sibling can route
+        to the actor from its address alone.
+        """
+        uri = fresh_uri(self.site)
+        while self.placement and not self.placement(str(uri)):
+            uri = fresh_uri(self.site)
+        return uri
 
     async def send(self, actor: URIRef, message: Optional[Graph] = None):
         if message is None:
             message = here.graph.get()
 
-        if actor in self.deck:
-            # Local actor
-            await self.deck[actor].send.send(message)
-        elif self.nats and self.nats.connected:
-            # Try broadcasting via NATS if actor not found locally
-            message_data = message.serialize(format="trig").encode()
-            await self.nats.broadcast_actor_message(
-                str(actor), message_data
-            )
-            self.yell.info("broadcasted message via NATS", actor=actor)
-        else:
-            raise ValueError(f"No route found for actor {actor}")
+        with self.tracer.span("send", self.this(), actor) as span:
+            if self.hosts(actor):
+                # Local actor
+                self.tracer.stamp(message, span)
+                await self.deliver_local(actor, message)
+            elif self.transport and self.transport.connected:
+                # Hand the message to the transport if not found locally
+                stamp = [] if span is None else stamp_triples(message, span)
+                message_data = encode_keyed(message, stamp)
+                await self.transport.send_actor_message(
+                    str(actor), message_data, self.curr.get().batching
+                )
+                self.yell.info(
+                    "forwarded message to transport", actor=actor
+                )
+            else:
+                raise ValueError(f"No route found for actor {actor}")
 
     def get_base_url(self) -> str:
         return self.base_url
@@ -249,6 +670,9 @@ class Vat:
 
         parent_ctx = self.curr.get()
         context = new_context(parent_ctx.addr, name=name)
+        context.batching = getattr(code, "batching", None)
+        context.dedupe = getattr(code, "dedupe", context.dedupe)
+        context.crib, context.code, context.args = crib, code, args
         parent = parent_ctx.addr
         parent_proc = parent_ctx.proc
         actor = context.addr
@@ -304,64 +728,91 @@ class Vat:
             logger.info("setting up actor", actor=actor, code=code)
             await code.setup(actor)
 
-        async def task():
-            with self.curr.bind(context):
-                ending = NT.Success
-                try:
-                    await code(*args)
-                    self.yell.info(
-                        "actor finished",
-                        actor=context.addr,
-                        actor_name=name,
-                    )
+        if self.transport and self.transport.connected:
+            await self.transport.actor_started(str(actor))
 
-                except BaseException as e:
-                    logger.error(
-                        "actor crashed",
-                        actor=context.addr,
-                        actor_name=name,
-                        error=e,
-                        parent=context.boss,
-                    )
+        crib.start_soon(self.run_actor, context, code, args)
+        return context.addr
 
-                    ending = NT.Failure
-
-                    if parent_ctx and parent_ctx.trap:
-                        self.yell.info(
-                            "sending exit signal",
-                            to=parent_ctx.addr,
-                        )
-                        await self.send_exit_signal(
-                            parent_ctx.addr, context.addr, e
-                        )
-                    else:
-                        self.yell.info("raising exception")
-                        raise
-                finally:
+    async def run_actor(
+        self,
+        context: ActorContext,
+        code: Callable[..., Awaitable[None]],
+        args: tuple,
+    ):
+        """Run one incarnation of an actor until it ends or falls asleep."""
+        actor, name = context.addr, context.name
+        with self.curr.bind(context):
+            ending = NT.Success
+            try:
+                await code(*args)
+                self.yell.info(
+                    "actor finished",
+                    actor=actor,
+                    actor_name=name,
+                )
+
+            except BaseException as e:
+                logger.error(
+                    "actor crashed",
+                    actor=actor,
+                    actor_name=name,
+                    error=e,
+                    parent=context.boss,
+                )
+
+                ending = NT.Failure
+                self.crashes[name] += 1
+
+                parent_ctx = self.deck.get(context.boss)
+                if parent_ctx and parent_ctx.trap:
                     self.yell.info(
-                        "deleting actor", actor=(context.addr, name)
+                        "sending exit signal",
+                        to=parent_ctx.addr,
                     )
-                    ending = blank(ending)
-                    now = Literal(datetime.now(UTC), datatype=XSD.dateTime)
-                    add(ending, {PROV.atTime: now})
-                    add(actor_proc, {PROV.wasEndedBy: ending})
-
-                    # Since our actors have no permanent identity, we mark it as
-                    # invalidated by the ending of the process.
-                    #
-                    # When we implement permanent identities, an actor will be
-                    # realized in multiple processes, so exiting a process will
-                    # not invalidate the actor itself.
+                    await self.send_exit_signal(parent_ctx.addr, actor, e)
+                else:
+                    self.yell.info("raising exception")
+                    raise
+            finally:
+                # A passivated actor has already left the deck, and may
+                # even be back with a fresh context by now.
+                dormant = self.deck.get(actor) is not context
+                if dormant:
+                    ending = NT.Passivation
+
+                self.yell.info("deleting actor", actor=(actor, name))
+                ending = blank(ending)
+                now = Literal(datetime.now(UTC), datatype=XSD.dateTime)
+                add(ending, {PROV.atTime: now})
+                add(context.proc, {PROV.wasEndedBy: ending})
+
+                if not dormant:
+                    # A passivated actor lives on in its next process;
+                    # any other ending invalidates the actor itself.
                     #
-                    # Also when a supervisor restarts an actor, maybe we should
-                    # not invalidate the actor...
-
+                    # Also when a supervisor restarts an actor, maybe we
+                    # should not invalidate the actor...
                     add(actor, {PROV.wasInvalidatedBy: ending})
-                    del self.deck[context.addr]
-                    self.print_actor_tree()
-
-        crib.start_soon(task)
-        return context.addr
+                    del self.deck[actor]
+                self.print_actor_tree()
+
+                # Sleepers stay in the cluster's directory, since the
+                # next message will wake them right here.
+                transport = None if dormant else self.transport
+                if transport and transport.connected:
+                    # Tell the cluster even if we are being cancelled,
+                    # but do not hang on a transport that is gone.
+                    with trio.CancelScope(shield=True) as scope:
+                        scope.deadline = trio.current_time() + 1
+                        try:
+                            await transport.actor_stopped(str(actor))
+                        except Exception as e:
+                            logger.warning(
+                                "failed to announce actor exit",
+                                actor=actor,
+                                error=e,
+                            )
 
     async def send_exit_signal(
         self, parent: URIRef, child: URIRef, error: BaseException
@@ -470,39 +921,49 @@ async def send(actor: URIRef, message: Optional[Graph] = None):
     await system.send(actor, message)
 
 
-async def receive() -> Graph:
-    system = vat.get()
-    return await system.curr.get().recv.receive()
+def idempotent(message: Graph, key: Optional[str] = None) -> Graph:
+    """Key a message so that each actor takes it in at most once.
+
+    Without a key, one is made up; pass your own to make messages that
+    are built anew, say by a retried request, count as the same one.
+    """
+    message.set(
+        (
+            message.identifier,
+            NT.idempotencyKey,
+            Literal(key or secrets.token_hex(16)),
+        )
+    )
+    return message
 
 
-save_lock = trio.Lock()
+async def receive() -> Graph:
+    system = vat.get()
+    context = system.curr.get()
+    message = await context.recv.receive()
+    context.metrics.received_message(message)
+    system.tracer.delivered(message, context.addr)
+    return message
 
 
 async def persist(graph: Graph):
-    logger.info("persisting graph", graph=graph)
+    """Save a graph to the repository, touching only what changed.
+
+    Graphs made with `create_graph` already live in the repository's
+    dataset, so all that is left is writing out their file. A graph
+    from elsewhere has the triples it gained since its last persist
+    copied over first.
+    """
     repo = context.repo.get()
-    before_count = len(repo.dataset)
 
     graph_id = graph.identifier
     assert isinstance(graph_id, URIRef)
 
-    repo_graph = repo.graph(graph_id)
-    for s, p, o in graph:
-        repo_graph.add((s, p, o))
-
-    after_count = len(repo.dataset)
+    added = repo.absorb(graph)
 
-    async with save_lock:
-        await repo.save_all()
+    await repo.flush(graph_id)
 
-    logger.info(
-        "persisted graph",
-        before=before_count,
-        after=after_count,
-        added=after_count - before_count,
-        repo=repo,
-        graph=graph,
-    )
+    logger.info("persisted graph", added=added, graph=graph_id)
 
 
 def create_graph(
@@ -0,0 +1,190 @@
+"""A NATS stand-in that lives inside one process.
+
+Multi-vat behaviour is hard to exercise when every vat needs its own
+connection to a real NATS server. The broker here keeps subscriptions
+in memory and hands out clients with the same interface as
+`bubble.mesh.nats.NatsClient`, so several vats in one trio run can be
+joined into a cluster for tests and benchmarks.
+
+It implements the parts of NATS semantics the mesh relies on: subject
+wildcards (``*`` for one token, ``>`` for the rest), queue groups that
+deliver each message to one member, request/reply through private
+inboxes, and the no-responders status for requests that nobody hears.
+Messages are delivered in order per subscription, each subscription in
+its own task, as with a real connection.
+"""
+
+import random
+import secrets
+
+from typing import Dict, List, Optional
+from itertools import count
+from collections import Counter
+from dataclasses import dataclass
+
+import trio
+import structlog
+
+from bubble.mesh.nats import (
+    Callback,
+    NatsMessage,
+    NatsTimeout,
+    NoResponders,
+)
+
+logger = structlog.get_logger(__name__)
+
+
+def subject_matches(pattern: str, subject: str) -> bool:
+    """Whether a subscription subject covers a published subject."""
+    want, have = pattern.split("."), subject.split(".")
+    for i, token in enumerate(want):
+        if token == ">":
+            return len(have) > i
+        if i >= len(have) or token not in ("*", have[i]):
+            return False
+    return len(want) == len(have)
+
+
+@dataclass
+class LocalSubscription:
+    client: "LocalNatsClient"
+    sid: int
+    subject: str
+    queue: str
+    channel: trio.MemorySendChannel
+
+
+class LocalBroker:
+    """Routes messages between in-process clients like a NATS server."""
+
+    def __init__(self, nursery: trio.Nursery, pending_limit: int = 65536):
+        self.nursery = nursery
+        self.pending_limit = pending_limit
+        self.subscriptions: List[LocalSubscription] = []
+        self.published: Counter[str] = Counter()
+
+    def client(self) -> "LocalNatsClient":
+        return LocalNatsClient(self)
+
+    def route(self, message: NatsMessage) -> int:
+        """Deliver a message to its subscribers; returns how many."""
+        self.published[message.subject] += 1
+        plain = []
+        groups: Dict[str, List[LocalSubscription]] = {}
+        for sub in self.subscriptions:
+            if subject_matches(sub.subject, message.subject):
+                if sub.queue:
+                    groups.setdefault(sub.queue, []).append(sub)
+                else:
+                    plain.append(sub)
+        targets = plain + [
+            random.choice(group) for group in groups.values()
+        ]
+        for sub in targets:
+            try:
+                sub.channel.send_nowait(message)
+            except trio.WouldBlock:
+                logger.warning("NATS slow consumer", subject=sub.subject)
+        return len(targets)
+
+    def publish(self, message: NatsMessage) -> None:
+        if not self.route(message) and message.reply:
+            self.route(
+                NatsMessage(message.reply, b"", "", {"Status": "503"})
+            )
+
+    def drop(self, client: "LocalNatsClient") -> None:
+        """Forget a client's subscriptions, as if it had disconnected."""
+        for sub in [s for s in self.subscriptions if s.client is client]:
+            self.subscriptions.remove(sub)
+            sub.channel.close()
+
+
+class LocalNatsClient:
+    """A client of a `LocalBroker`, interchangeable with `NatsClient`."""
+
+    def __init__(self, broker: LocalBroker):
+        self.broker = broker
+        self.connected = False
+        self.sids = count(1)
+        self.inbox_prefix = f"_INBOX.{secrets.token_hex(11)}"
+        self.tokens = count(1)
+
+    async def connect(self) -> None:
+        self.connected = True
+
+    async def publish(
+        self,
+        subject: str,
+        payload: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        reply: str = "",
+    ) -> None:
+        if not self.connected:
+            raise ConnectionError("Not connected to the local broker")
+        self.broker.publish(NatsMessage(subject, payload, reply, headers))
+        # Yield like a network write would, so publishers take turns.
+        await trio.lowlevel.checkpoint()
+
+    async def subscribe(
+        self, subject: str, cb: Callback, queue: str = ""
+    ) -> int:
+        send, receive = trio.open_memory_channel[NatsMessage](
+            self.broker.pending_limit
+        )
+        sub = LocalSubscription(self, next(self.sids), subject, queue, send)
+        self.broker.subscriptions.append(sub)
+        self.broker.nursery.start_soon(self.deliver, receive, cb)
+        return sub.sid
+
+    async def deliver(
+        self, receive: trio.MemoryReceiveChannel, cb: Callback
+    ) -> None:
+        async with receive:
+            async for message in receive:
+                try:
+                    await cb(message)
+                except Exception as e:
+                    logger.error(
+                        "NATS callback failed",
+                        subject=message.subject,
+                        error=e,
+                    )
+
+    async def unsubscribe(self, sid: int) -> None:
+        for sub in self.broker.subscriptions:
+            if sub.client is self and sub.sid == sid:
+                self.broker.subscriptions.remove(sub)
+                sub.channel.close()
+                return
+
+    async def request(
+        self,
+        subject: str,
+        payload: bytes,
+        timeout: float = 5.0,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> NatsMessage:
+        inbox = f"{self.inbox_prefix}.{next(self.tokens)}"
+        send, receive = trio.open_memory_channel[NatsMessage](1)
+        sub = LocalSubscription(self, next(self.sids), inbox, "", send)
+        self.broker.subscriptions.append(sub)
+        try:
+            await self.publish(subject, payload, headers, reply=inbox)
+            with trio.move_on_after(timeout):
+                reply = await receive.receive()
+                if (reply.headers or {}).get("Status") == "503":
+                    raise NoResponders(subject)
+                return reply
+            raise NatsTimeout(subject)
+        finally:
+            if sub in self.broker.subscriptions:
+                self.broker.subscriptions.remove(sub)
+
+    async def flush(self, timeout: float = 5.0) -> None:
+        await trio.lowlevel.checkpoint()
+
+    async def close(self) -> None:
+        self.connected = False
+        self.broker.drop(self)
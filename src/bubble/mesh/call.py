@@ -10,6 +10,8 @@ remember what Tony Hoare said about null references - it was his
 building synchronous RPC on top of asynchronous messaging.
 """
 
+import math
+
 from typing import Optional
 
 import trio
@@ -19,12 +21,25 @@ from rdflib import Graph, URIRef
 
 from swash import here
 from swash.prfx import NT
-from bubble.mesh.base import ActorContext, vat, send, this, fresh_uri
+from bubble.mesh.base import (
+    ActorContext,
+    RequestTransport,
+    vat,
+    send,
+    this,
+)
 
 logger = structlog.get_logger()
 
+# How long to wait for a remote actor when the caller sets no timeout.
+REMOTE_TIMEOUT = 30.0
+
 
-async def call(actor: URIRef, payload: Optional[Graph] = None) -> Graph:
+async def call(
+    actor: URIRef,
+    payload: Optional[Graph] = None,
+    timeout: Optional[float] = None,
+) -> Graph:
     """Perform a synchronous call to an actor, awaiting its response.
 
     This is our concession to human weakness - sometimes we just want
@@ -32,10 +47,17 @@ async def call(actor: URIRef, payload: Optional[Graph] = None) -> Graph:
     demanding an immediate response, it works but somewhat defeats
     the purpose of letters.
 
+    When the actor lives in another vat and the transport supports it,
+    the request and its reply make a single round trip instead of two
+    separately routed messages.
+
     Args:
         actor: The URIRef of the actor to call. Choose wisely.
         payload: The message graph. If None, we'll use whatever is in
                 the current context, like a blank postcard.
+        timeout: Seconds to wait before raising `trio.TooSlowError`.
+                Without one, we wait as long as the local actor takes,
+                or `REMOTE_TIMEOUT` for a remote one.
 
     Returns:
         The response graph, hopefully containing what you wanted.
@@ -43,25 +65,42 @@ async def call(actor: URIRef, payload: Optional[Graph] = None) -> Graph:
     if payload is None:
         payload = here.graph.get()
 
-    sendchan, recvchan = trio.open_memory_channel[Graph](1)
-
-    tmp = fresh_uri()
-    vat.get().deck[tmp] = ActorContext(
-        boss=this(),
-        proc=this(),
-        addr=tmp,
-        send=sendchan,
-        recv=recvchan,
-    )
-
-    payload.add((payload.identifier, NT.replyTo, tmp))
-
-    logger.info(
-        "sending request",
-        actor=actor,
-        graph=payload,
-    )
-
-    await send(actor, payload)
-
-    return await recvchan.receive()
+    system = vat.get()
+    with system.tracer.span("call", this(), actor):
+        if not system.hosts(actor) and isinstance(
+            system.transport, RequestTransport
+        ):
+            logger.info(
+                "sending remote request", actor=actor, graph=payload
+            )
+            return await system.request(
+                actor,
+                payload,
+                REMOTE_TIMEOUT if timeout is None else timeout,
+            )
+
+        sendchan, recvchan = trio.open_memory_channel[Graph](1)
+
+        tmp = system.mint_actor_uri()
+        system.deck[tmp] = ActorContext(
+            boss=this(),
+            proc=this(),
+            addr=tmp,
+            send=sendchan,
+            recv=recvchan,
+        )
+
+        payload.add((payload.identifier, NT.replyTo, tmp))
+
+        logger.info(
+            "sending request",
+            actor=actor,
+            graph=payload,
+        )
+
+        try:
+            with trio.fail_after(math.inf if timeout is None else timeout):
+                await send(actor, payload)
+                return await recvchan.receive()
+        finally:
+            del system.deck[tmp]
@@ -0,0 +1,62 @@
+"""Where actors live, as far as one vat knows.
+
+Routing a message to a remote actor used to mean shouting it at every
+vat in the cluster and letting each one parse it to find out whether
+the actor was theirs. The directory lets a vat send it to the one vat
+that hosts the actor instead. Vats announce actors as they spawn and
+exit, and every vat caches what it hears. Locations that nobody
+announced are looked up on demand and cached the same way.
+
+Entries expire after a while so that a missed exit announcement cannot
+pin an address to the wrong vat forever.
+"""
+
+import time
+
+from typing import Dict, Callable, Optional
+
+
+class ActorDirectory:
+    """A cache of actor URI to hosting vat id, with expiry."""
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.clock = clock
+        self.locations: Dict[str, tuple[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, actor_uri: str) -> Optional[str]:
+        """The vat hosting an actor, if known and not expired."""
+        entry = self.locations.get(actor_uri)
+        if entry is not None:
+            vat_id, expires = entry
+            if expires > self.clock():
+                self.hits += 1
+                return vat_id
+            del self.locations[actor_uri]
+        self.misses += 1
+        return None
+
+    def learn(self, actor_uri: str, vat_id: str) -> None:
+        self.locations[actor_uri] = (vat_id, self.clock() + self.ttl)
+
+    def forget(self, actor_uri: str, vat_id: Optional[str] = None) -> None:
+        """Drop an entry, only if it still points at `vat_id` when given."""
+        entry = self.locations.get(actor_uri)
+        if entry is not None and (vat_id is None or entry[0] == vat_id):
+            del self.locations[actor_uri]
+
+    def forget_vat(self, vat_id: str) -> None:
+        """Drop every entry pointing at a vat, say one that went away."""
+        for actor_uri in [
+            uri for uri, (v, _) in self.locations.items() if v == vat_id
+        ]:
+            del self.locations[actor_uri]
+
+    def __len__(self) -> int:
+        return len(self.locations)
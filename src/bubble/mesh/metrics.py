@@ -0,0 +1,90 @@
+"""Per-actor counters, so that a slow town can point at its slow actor.
+
+Every actor context carries an `ActorMetrics` that the vat updates as
+mail goes in and out: how deep the mailbox gets, how long messages wait
+in it, and how long a server actor spends handling each one, in total
+and per handler for actors that dispatch on message type. Nothing
+here talks to the outside world; the HTTP side turns these numbers into
+an RDF graph and into Prometheus text.
+"""
+
+from bisect import bisect_left
+from dataclasses import field, dataclass
+
+import trio
+
+#: Upper bounds in seconds, from "instant" to "someone should look".
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+#: A mailbox with more unread stamps than this is being drained by
+#: someone other than `receive`, so its stamps are given up on.
+MAX_PENDING = 1024
+
+
+@dataclass
+class Histogram:
+    """Counts of observations per bucket, with their sum."""
+
+    bounds: tuple[float, ...] = BUCKETS
+    counts: list[int] = field(
+        default_factory=lambda: [0] * (len(BUCKETS) + 1)
+    )
+    total: float = 0.0
+    count: int = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Pairs of upper bound and count at or below it, ending at inf."""
+        pairs, running = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+@dataclass
+class ActorMetrics:
+    """What the vat has seen of one actor's mailbox and handlers."""
+
+    received: int = 0
+    duplicates: int = 0
+    peak_depth: int = 0
+    age: Histogram = field(default_factory=Histogram)
+    handling: Histogram = field(default_factory=Histogram)
+    #: Time in each handler of a dispatching actor, by method name.
+    handlers: dict[str, Histogram] = field(default_factory=dict)
+    #: When each unread message was posted, by message object.
+    pending: dict[int, float] = field(default_factory=dict)
+
+    def posted(self, message: object, depth: int) -> None:
+        """Note a message about to go into a mailbox of some depth."""
+        if len(self.pending) >= MAX_PENDING:
+            self.pending.clear()
+        self.pending[id(message)] = trio.current_time()
+        self.peak_depth = max(self.peak_depth, depth + 1)
+
+    def withdrawn(self, message: object) -> None:
+        """Forget a message that never made it into the mailbox."""
+        self.pending.pop(id(message), None)
+
+    def handled(self, handler: str, seconds: float) -> None:
+        """Note time spent in one named handler."""
+        histogram = self.handlers.get(handler)
+        if histogram is None:
+            histogram = self.handlers[handler] = Histogram()
+        histogram.observe(seconds)
+
+    def received_message(self, message: object) -> None:
+        """Note a message taken out of the mailbox."""
+        self.received += 1
+        posted = self.pending.pop(id(message), None)
+        if posted is not None:
+            self.age.observe(trio.current_time() - posted)
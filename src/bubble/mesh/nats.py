@@ -1,21 +1,461 @@
-"""NATS-based VAT-to-VAT communication for mesh networking."""
+"""NATS-based VAT-to-VAT communication for mesh networking.
 
+Each vat listens on its own subject, ``bubble.vat.<vat id>``, and a
+message for a remote actor is published only to the subject of the vat
+that hosts it, with the actor's URI in a header. Vats find each other's
+actors through a shared directory: they announce actors as they start
+and stop on ``bubble.directory.announce``, and a vat that has not heard
+of an actor asks on ``bubble.directory.query``, where only the hosting
+vat answers. Non-owners therefore never see, let alone parse, messages
+for actors they do not host.
+
+`NatsClient` speaks the NATS protocol natively on trio. The older
+`TrioNatsClient` wraps the asyncio client through trio_asyncio, and is
+kept mostly so the two can be compared with ``bubble.bench.nats``.
+"""
+
+import json
+import secrets
 import functools
 
-from typing import Any, Callable, Awaitable
+from typing import Any, Dict, Callable, Optional, Awaitable
+from itertools import count
+from collections import OrderedDict, deque
+from dataclasses import field, dataclass
+from urllib.parse import urlparse
 
+import trio
 import structlog
 import trio_asyncio
 
-from nats.aio.client import Client as NATS
+from bubble.mesh.base import Batching
+from bubble.mesh.wire import encode_frame, split_frames
+from bubble.mesh.trace import trace_headers
+from bubble.mesh.directory import ActorDirectory
 
 logger = structlog.get_logger(__name__)
 
+ACTOR_HEADER = "Bubble-Actor"
+REPLY_HEADER = "Bubble-Reply-To"
+BATCH_HEADER = "Bubble-Batch"
+ANNOUNCE_SUBJECT = "bubble.directory.announce"
+QUERY_SUBJECT = "bubble.directory.query"
+
+CRLF = b"\r\n"
+HEADER_PREAMBLE = "NATS/1.0"
+
+
+def vat_subject(vat_id: str) -> str:
+    return f"bubble.vat.{vat_id}"
+
+
+class NatsTimeout(Exception):
+    """A request got no reply in time."""
+
+
+class NoResponders(Exception):
+    """A request went to a subject that nobody is subscribed to."""
+
+
+@dataclass
+class NatsMessage:
+    """A message received from NATS, independent of the client library."""
+
+    subject: str
+    data: bytes
+    reply: str = ""
+    headers: Optional[Dict[str, str]] = None
+
+
+Callback = Callable[[NatsMessage], Awaitable[None]]
+
+
+def encode_headers(headers: Dict[str, str]) -> bytes:
+    lines = [HEADER_PREAMBLE]
+    lines += [f"{key}: {value}" for key, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+def decode_headers(block: bytes) -> Dict[str, str]:
+    """Parse a header block, keeping any inline status as ``Status``."""
+    lines = block.decode().split("\r\n")
+    headers = {}
+    status = lines[0][len(HEADER_PREAMBLE) :].strip()
+    if status:
+        code, _, description = status.partition(" ")
+        headers["Status"] = code
+        if description:
+            headers["Description"] = description
+    for line in lines[1:]:
+        if line:
+            key, _, value = line.partition(":")
+            headers[key.strip()] = value.strip()
+    return headers
+
+
+@dataclass
+class Subscription:
+    sid: int
+    subject: str
+    queue: str
+    channel: trio.MemorySendChannel
+
+
+class NatsClient:
+    """A NATS client running natively on trio.
+
+    Implements the subset of the protocol we use: publishing with and
+    without headers, subscriptions with optional queue groups, and
+    request/reply through a shared inbox subscription. Outgoing
+    commands are buffered and written by a single task, so a burst of
+    publishes costs a few socket writes rather than one each.
+
+    When the connection drops, the client reconnects with a delay and
+    resubscribes; publishes made in the meantime stay buffered and go
+    out once it is back.
+
+    Each subscription runs its callbacks in order in its own task. A
+    subscriber that falls more than `pending_limit` messages behind
+    starts dropping messages, like a slow consumer in any NATS client.
+    """
+
+    def __init__(
+        self,
+        nursery: trio.Nursery,
+        url: str = "nats://localhost:4222",
+        name: str = "bubble",
+        reconnect_wait: float = 0.5,
+        max_reconnects: int = 60,
+        pending_limit: int = 65536,
+    ):
+        self.nursery = nursery
+        self.url = urlparse(url)
+        self.name = name
+        self.reconnect_wait = reconnect_wait
+        self.max_reconnects = max_reconnects
+        self.pending_limit = pending_limit
+
+        self.connected = False
+        self.closed = False
+        self.server_info: Dict[str, Any] = {}
+        self.stream: Optional[trio.abc.Stream] = None
+        self.leftover = bytearray()
+        self.cancel_scope = trio.CancelScope()
+
+        self.outbox = bytearray()
+        self.outbox_ready = trio.Event()
+        self.pongs: deque[trio.Event] = deque()
+
+        self.sids = count(1)
+        self.subscriptions: Dict[int, Subscription] = {}
+
+        self.inbox_prefix = f"_INBOX.{secrets.token_hex(11)}"
+        self.inbox_sid: Optional[int] = None
+        self.replies: Dict[str, trio.MemorySendChannel] = {}
+        self.tokens = count(1)
+
+    async def open_stream(self) -> trio.abc.Stream:
+        return await trio.open_tcp_stream(
+            self.url.hostname or "localhost", self.url.port or 4222
+        )
+
+    async def connect(self) -> None:
+        """Connect and start the connection's background tasks."""
+        await self.handshake()
+        await self.nursery.start(self.run)
+
+    async def handshake(self) -> None:
+        """Open a connection, introduce ourselves and restore our SUBs."""
+        stream = await self.open_stream()
+        buffer = bytearray()
+        line = await self.read_line(stream, buffer)
+        if not line.startswith(b"INFO "):
+            raise ConnectionError(
+                f"Unexpected greeting from NATS: {line!r}"
+            )
+        self.server_info = json.loads(line[5:])
+
+        options = {
+            "verbose": False,
+            "pedantic": False,
+            "headers": True,
+            "no_responders": True,
+            "protocol": 1,
+            "lang": "python-trio",
+            "version": "0.1",
+            "name": self.name,
+        }
+        if self.url.username:
+            options["user"] = self.url.username
+            options["pass"] = self.url.password or ""
+
+        commands = bytearray(b"CONNECT " + json.dumps(options).encode())
+        commands += CRLF
+        for sub in self.subscriptions.values():
+            commands += self.sub_command(sub)
+        if self.inbox_sid is not None:
+            commands += self.inbox_command()
+        commands += b"PING\r\n"
+        await stream.send_all(commands)
+
+        while True:
+            line = await self.read_line(stream, buffer)
+            if line == b"PONG":
+                break
+            if line.startswith(b"-ERR"):
+                raise ConnectionError(f"NATS refused us: {line!r}")
+
+        self.stream = stream
+        self.leftover = buffer
+        self.connected = True
+
+    async def read_line(
+        self, stream: trio.abc.ReceiveStream, buffer: bytearray
+    ) -> bytes:
+        while (end := buffer.find(CRLF)) < 0:
+            chunk = await stream.receive_some()
+            if not chunk:
+                raise trio.BrokenResourceError("NATS closed the connection")
+            buffer += chunk
+        line = bytes(buffer[:end])
+        del buffer[: end + 2]
+        return line
+
+    async def read_exactly(
+        self, stream: trio.abc.ReceiveStream, buffer: bytearray, size: int
+    ) -> bytes:
+        while len(buffer) < size:
+            chunk = await stream.receive_some()
+            if not chunk:
+                raise trio.BrokenResourceError("NATS closed the connection")
+            buffer += chunk
+        data = bytes(buffer[:size])
+        del buffer[:size]
+        return data
+
+    async def run(self, task_status=trio.TASK_STATUS_IGNORED) -> None:
+        """Serve the connection, reconnecting whenever it drops."""
+        with self.cancel_scope:
+            task_status.started()
+            while not self.closed:
+                assert self.stream is not None
+                try:
+                    async with trio.open_nursery() as nursery:
+                        nursery.start_soon(self.write_loop, self.stream)
+                        nursery.start_soon(self.read_loop, self.stream)
+                except* (trio.BrokenResourceError, OSError) as group:
+                    logger.warning(
+                        "NATS connection lost", error=group.exceptions[0]
+                    )
+                self.connected = False
+                await self.reconnect()
+
+    async def reconnect(self) -> None:
+        for attempt in range(self.max_reconnects):
+            await trio.sleep(self.reconnect_wait)
+            try:
+                await self.handshake()
+                logger.info("NATS reconnected", attempts=attempt + 1)
+                return
+            except (OSError, trio.BrokenResourceError) as e:
+                logger.debug("NATS reconnect failed", error=e)
+        logger.error("NATS gave up reconnecting", url=self.url.geturl())
+        self.closed = True
+
+    async def write_loop(self, stream: trio.abc.SendStream) -> None:
+        while True:
+            await self.outbox_ready.wait()
+            self.outbox_ready = trio.Event()
+            data = bytes(self.outbox)
+            self.outbox.clear()
+            try:
+                await stream.send_all(data)
+            except BaseException:
+                # Keep what we could not send for the next connection.
+                self.outbox[:0] = data
+                raise
+
+    async def read_loop(self, stream: trio.abc.ReceiveStream) -> None:
+        buffer = self.leftover
+        while True:
+            line = await self.read_line(stream, buffer)
+            op, _, rest = line.partition(b" ")
+            if op == b"MSG":
+                args = rest.split()
+                size = int(args[-1])
+                data = await self.read_exactly(stream, buffer, size + 2)
+                reply = args[2].decode() if len(args) == 4 else ""
+                self.dispatch(
+                    int(args[1]),
+                    NatsMessage(args[0].decode(), data[:-2], reply),
+                )
+            elif op == b"HMSG":
+                args = rest.split()
+                header_size, size = int(args[-2]), int(args[-1])
+                data = await self.read_exactly(stream, buffer, size + 2)
+                reply = args[2].decode() if len(args) == 5 else ""
+                self.dispatch(
+                    int(args[1]),
+                    NatsMessage(
+                        args[0].decode(),
+                        data[header_size:-2],
+                        reply,
+                        decode_headers(data[:header_size]),
+                    ),
+                )
+            elif op == b"PING":
+                self.write(b"PONG\r\n")
+            elif op == b"PONG":
+                if self.pongs:
+                    self.pongs.popleft().set()
+            elif op == b"-ERR":
+                logger.error("NATS error", error=rest.decode())
+            elif op == b"INFO":
+                self.server_info = json.loads(rest)
+
+    def dispatch(self, sid: int, message: NatsMessage) -> None:
+        if sid == self.inbox_sid:
+            channel = self.replies.pop(message.subject, None)
+            if channel is not None:
+                channel.send_nowait(message)
+            return
+        sub = self.subscriptions.get(sid)
+        if sub is None:
+            return
+        try:
+            sub.channel.send_nowait(message)
+        except trio.WouldBlock:
+            logger.warning("NATS slow consumer", subject=sub.subject)
+
+    def write(self, command: bytes) -> None:
+        self.outbox += command
+        self.outbox_ready.set()
+
+    def sub_command(self, sub: Subscription) -> bytes:
+        queue = f" {sub.queue}" if sub.queue else ""
+        return f"SUB {sub.subject}{queue} {sub.sid}\r\n".encode()
+
+    def inbox_command(self) -> bytes:
+        return f"SUB {self.inbox_prefix}.* {self.inbox_sid}\r\n".encode()
+
+    async def publish(
+        self,
+        subject: str,
+        payload: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        reply: str = "",
+    ) -> None:
+        """Publish a message to a subject."""
+        if self.closed:
+            raise ConnectionError("NATS client is closed")
+        reply = f" {reply}" if reply else ""
+        if headers:
+            block = encode_headers(headers)
+            size = len(block) + len(payload)
+            self.write(
+                f"HPUB {subject}{reply} {len(block)} {size}\r\n".encode()
+                + block
+                + payload
+                + CRLF
+            )
+        else:
+            self.write(
+                f"PUB {subject}{reply} {len(payload)}\r\n".encode()
+                + payload
+                + CRLF
+            )
+        # Let the writer catch up before the buffer grows without bound.
+        if len(self.outbox) > 8 * 1024 * 1024:
+            await self.flush()
+
+    async def subscribe(
+        self, subject: str, cb: Callback, queue: str = ""
+    ) -> int:
+        """Subscribe to a subject with a callback; returns the sid."""
+        send, receive = trio.open_memory_channel[NatsMessage](
+            self.pending_limit
+        )
+        sub = Subscription(next(self.sids), subject, queue, send)
+        self.subscriptions[sub.sid] = sub
+        self.write(self.sub_command(sub))
+        self.nursery.start_soon(self.deliver, receive, cb)
+        return sub.sid
+
+    async def deliver(
+        self, receive: trio.MemoryReceiveChannel, cb: Callback
+    ) -> None:
+        async with receive:
+            async for message in receive:
+                try:
+                    await cb(message)
+                except Exception as e:
+                    logger.error(
+                        "NATS callback failed",
+                        subject=message.subject,
+                        error=e,
+                    )
+
+    async def unsubscribe(self, sid: int) -> None:
+        sub = self.subscriptions.pop(sid, None)
+        if sub is not None:
+            self.write(f"UNSUB {sid}\r\n".encode())
+            await sub.channel.aclose()
+
+    async def request(
+        self,
+        subject: str,
+        payload: bytes,
+        timeout: float = 5.0,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> NatsMessage:
+        """Publish with a fresh reply inbox and wait for the first reply."""
+        if self.inbox_sid is None:
+            self.inbox_sid = next(self.sids)
+            self.write(self.inbox_command())
+        inbox = f"{self.inbox_prefix}.{next(self.tokens)}"
+        send, receive = trio.open_memory_channel[NatsMessage](1)
+        self.replies[inbox] = send
+        try:
+            await self.publish(subject, payload, headers, reply=inbox)
+            with trio.move_on_after(timeout):
+                reply = await receive.receive()
+                if (reply.headers or {}).get("Status") == "503":
+                    raise NoResponders(subject)
+                return reply
+            raise NatsTimeout(subject)
+        finally:
+            self.replies.pop(inbox, None)
+
+    async def flush(self, timeout: float = 5.0) -> None:
+        """Wait until the server has seen everything we sent so far."""
+        pong = trio.Event()
+        self.pongs.append(pong)
+        self.write(b"PING\r\n")
+        with trio.fail_after(timeout):
+            await pong.wait()
+
+    async def close(self) -> None:
+        """Send what is buffered and close the connection."""
+        if self.closed:
+            return
+        if self.connected:
+            with trio.move_on_after(1):
+                await self.flush()
+        self.closed = True
+        self.connected = False
+        self.cancel_scope.cancel()
+        for sub in self.subscriptions.values():
+            await sub.channel.aclose()
+        if self.stream is not None:
+            await self.stream.aclose()
+
 
 class TrioNatsClient:
-    """A trio-compatible wrapper around the NATS client."""
+    """A trio-compatible wrapper around the asyncio NATS client."""
 
     def __init__(self, url: str = "nats://localhost:4222"):
+        from nats.aio.client import Client as NATS
+
         self.url = url
         self.nc = NATS()
         self.connected = False
@@ -25,55 +465,273 @@ class TrioNatsClient:
         await trio_asyncio.aio_as_trio(self.nc.connect)(self.url)
         self.connected = True
 
-    async def publish(self, subject: str, payload: bytes) -> None:
+    async def publish(
+        self,
+        subject: str,
+        payload: bytes,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
         """Publish a message to a subject."""
         if not self.connected:
             await self.connect()
-        await trio_asyncio.aio_as_trio(self.nc.publish)(subject, payload)
+        f = functools.partial(
+            self.nc.publish, subject, payload, headers=headers
+        )
+        await trio_asyncio.aio_as_trio(f)()
 
-    async def subscribe(
-        self, subject: str, cb: Callable[[Any], Awaitable[None]]
-    ) -> None:
+    async def subscribe(self, subject: str, cb: Callback) -> None:
         """Subscribe to a subject with a callback."""
         if not self.connected:
             await self.connect()
 
-        async def trio_cb(msg):
-            await trio_asyncio.aio_as_trio(cb)(msg)
+        async def aio_cb(msg):
+            message = NatsMessage(
+                subject=msg.subject,
+                data=msg.data,
+                reply=msg.reply,
+                headers=msg.headers,
+            )
+            await trio_asyncio.trio_as_aio(cb)(message)
 
-        f = functools.partial(self.nc.subscribe, subject, cb=trio_cb)
+        f = functools.partial(self.nc.subscribe, subject, cb=aio_cb)
         await trio_asyncio.aio_as_trio(f)()
 
     async def request(
-        self, subject: str, payload: bytes, timeout: float = 5.0
-    ) -> Any:
+        self,
+        subject: str,
+        payload: bytes,
+        timeout: float = 5.0,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> NatsMessage:
         """Make a request and wait for a response."""
+        from nats.errors import TimeoutError, NoRespondersError
+
         if not self.connected:
             await self.connect()
         f = functools.partial(
-            self.nc.request, subject, payload, timeout=timeout
+            self.nc.request,
+            subject,
+            payload,
+            timeout=timeout,
+            headers=headers,
         )
-        return await trio_asyncio.aio_as_trio(f)()
+        try:
+            msg = await trio_asyncio.aio_as_trio(f)()
+        except NoRespondersError:
+            raise NoResponders(subject)
+        except TimeoutError:
+            raise NatsTimeout(subject)
+        return NatsMessage(
+            subject=msg.subject,
+            data=msg.data,
+            reply=msg.reply,
+            headers=msg.headers,
+        )
+
+    async def close(self) -> None:
+        """Close the connection."""
+        if self.connected:
+            await trio_asyncio.aio_as_trio(self.nc.close)()
+            self.connected = False
+
+
+@dataclass
+class Batch:
+    """Messages waiting to go to one vat as a single frame."""
+
+    frames: bytearray = field(default_factory=bytearray)
+    count: int = 0
 
-    async def broadcast_actor_message(self, actor_uri: str, message: bytes):
-        """Broadcast a message intended for a specific actor."""
-        subject = f"bubble.actor.{actor_uri}"
-        await self.publish(subject, message)
+
+class NatsTransport:
+    """Unicast actor messaging over NATS, routed through a directory.
+
+    Args:
+        nursery: Where timers for batched messages run.
+        client: A connected NATS client.
+        vat_id: This vat's id, unique within the cluster.
+        hosts: Whether an actor URI currently lives in this vat.
+
+    Requests carry the caller's reply address in a header, and the NATS
+    inbox to answer on as their reply subject. We remember the pairing
+    until the reply is sent, so the reply goes straight to the waiting
+    caller without a directory lookup.
+
+    Messages from actors that opt into `Batching` are held per
+    destination vat and published together, framed as in the shard
+    link, with a header telling the receiver to fan them out.
+    """
+
+    def __init__(
+        self,
+        nursery: trio.Nursery,
+        client: Any,
+        vat_id: str,
+        hosts: Callable[[str], bool],
+        lookup_timeout: float = 1.0,
+        max_return_routes: int = 10000,
+    ):
+        self.nursery = nursery
+        self.client = client
+        self.vat_id = vat_id
+        self.hosts = hosts
+        self.batches: Dict[str, Batch] = {}
+        self.lookup_timeout = lookup_timeout
+        self.directory = ActorDirectory()
+        self.return_routes: OrderedDict[str, str] = OrderedDict()
+        self.max_return_routes = max_return_routes
+
+    @property
+    def connected(self) -> bool:
+        return self.client.connected
 
     async def subscribe_to_actor_messages(
         self, cb: Callable[[str, bytes], Awaitable[None]]
-    ):
-        """Subscribe to all actor messages."""
+    ) -> None:
+        """Receive messages for this vat's actors and serve the directory."""
 
-        async def wrapper(msg):
-            subject = msg.subject
-            actor_uri = subject.split("bubble.actor.")[-1]
+        async def on_message(msg: NatsMessage):
+            if BATCH_HEADER in (msg.headers or {}):
+                for actor_uri, message in split_frames(bytearray(msg.data)):
+                    await cb(actor_uri, message)
+                return
+            actor_uri = (msg.headers or {}).get(ACTOR_HEADER)
+            if actor_uri is None:
+                logger.warning("actor message without actor header")
+                return
+            reply_to = (msg.headers or {}).get(REPLY_HEADER)
+            if reply_to and msg.reply:
+                self.remember_return_route(reply_to, msg.reply)
             await cb(actor_uri, msg.data)
 
-        await self.subscribe("bubble.actor.*", wrapper)
+        async def on_announce(msg: NatsMessage):
+            news = json.loads(msg.data)
+            if news["vat"] == self.vat_id:
+                return
+            for actor_uri in news.get("started", []):
+                self.directory.learn(actor_uri, news["vat"])
+            for actor_uri in news.get("stopped", []):
+                self.directory.forget(actor_uri, news["vat"])
 
-    async def close(self) -> None:
-        """Close the connection."""
-        if self.connected:
-            await trio_asyncio.aio_as_trio(self.nc.close)()
-            self.connected = False
+        async def on_query(msg: NatsMessage):
+            if msg.reply and self.hosts(msg.data.decode()):
+                await self.client.publish(msg.reply, self.vat_id.encode())
+
+        await self.client.subscribe(vat_subject(self.vat_id), on_message)
+        await self.client.subscribe(ANNOUNCE_SUBJECT, on_announce)
+        await self.client.subscribe(QUERY_SUBJECT, on_query)
+
+    async def locate(self, actor_uri: str) -> str:
+        """Find the vat hosting an actor, asking the cluster if needed."""
+        vat_id = self.directory.lookup(actor_uri)
+        if vat_id is None:
+            try:
+                reply = await self.client.request(
+                    QUERY_SUBJECT,
+                    actor_uri.encode(),
+                    timeout=self.lookup_timeout,
+                )
+            except (NatsTimeout, NoResponders):
+                raise ValueError(f"No route found for actor {actor_uri}")
+            vat_id = reply.data.decode()
+            self.directory.learn(actor_uri, vat_id)
+        return vat_id
+
+    def remember_return_route(self, reply_to: str, inbox: str) -> None:
+        self.return_routes[reply_to] = inbox
+        # Callers that time out never hear back; forget the oldest.
+        while len(self.return_routes) > self.max_return_routes:
+            self.return_routes.popitem(last=False)
+
+    async def send_actor_message(
+        self,
+        actor_uri: str,
+        message: bytes,
+        batching: Optional[Batching] = None,
+    ):
+        """Publish a message on the subject of the actor's vat."""
+        inbox = self.return_routes.pop(actor_uri, None)
+        if inbox is not None:
+            await self.client.publish(
+                inbox, message, headers=trace_headers() or None
+            )
+            return
+        subject = vat_subject(await self.locate(actor_uri))
+        if batching is None:
+            await self.client.publish(
+                subject,
+                message,
+                headers={ACTOR_HEADER: actor_uri, **trace_headers()},
+            )
+            return
+
+        batch = self.batches.get(subject)
+        if batch is None:
+            batch = self.batches[subject] = Batch()
+            self.nursery.start_soon(
+                self.flush_later, subject, batch, batching.delay
+            )
+        batch.frames += encode_frame(actor_uri, message)
+        batch.count += 1
+        if (
+            batch.count >= batching.max_messages
+            or len(batch.frames) >= batching.max_bytes
+        ):
+            await self.flush_batch(subject, batch)
+
+    async def flush_later(self, subject: str, batch: Batch, delay: float):
+        await trio.sleep(delay)
+        await self.flush_batch(subject, batch)
+
+    async def flush_batch(self, subject: str, batch: Batch) -> None:
+        if self.batches.get(subject) is not batch:
+            return  # Already sent because it filled up.
+        del self.batches[subject]
+        await self.client.publish(
+            subject,
+            bytes(batch.frames),
+            headers={BATCH_HEADER: str(batch.count)},
+        )
+
+    async def request_actor_message(
+        self,
+        actor_uri: str,
+        message: bytes,
+        reply_to: str,
+        timeout: float,
+    ) -> bytes:
+        """Send a request over NATS request/reply and return the reply.
+
+        Raises `trio.TooSlowError` on timeout, like `trio.fail_after`.
+        """
+        deadline = trio.current_time() + timeout
+        with trio.fail_at(deadline):
+            vat_id = await self.locate(actor_uri)
+        try:
+            reply = await self.client.request(
+                vat_subject(vat_id),
+                message,
+                timeout=deadline - trio.current_time(),
+                headers={
+                    ACTOR_HEADER: actor_uri,
+                    REPLY_HEADER: reply_to,
+                    **trace_headers(),
+                },
+            )
+        except NatsTimeout:
+            raise trio.TooSlowError(f"No reply from actor {actor_uri}")
+        except NoResponders:
+            # The vat we had on file is gone.
+            self.directory.forget(actor_uri, vat_id)
+            raise ValueError(f"No route found for actor {actor_uri}")
+        return reply.data
+
+    async def announce(self, **news: list[str]) -> None:
+        payload = json.dumps({"vat": self.vat_id, **news}).encode()
+        await self.client.publish(ANNOUNCE_SUBJECT, payload)
+
+    async def actor_started(self, actor_uri: str) -> None:
+        await self.announce(started=[actor_uri])
+
+    async def actor_stopped(self, actor_uri: str) -> None:
+        await self.announce(stopped=[actor_uri])
@@ -10,13 +10,19 @@ We keep the name as a tribute, even though our actors are more likely to be
 processing RDF graphs than routing phone calls. Progress?
 """
 
+import math
+
 from typing import (
     Any,
     Dict,
+    Self,
     TypeVar,
     Callable,
+    Hashable,
+    Optional,
 )
 from datetime import UTC, datetime
+from collections import deque
 
 import trio
 import tenacity
@@ -29,12 +35,15 @@ from rdflib import (
     Literal,
 )
 
+from swash import here
 from swash.prfx import NT
 from swash.util import P, add, new
 from bubble.mesh.base import (
+    vat,
     send,
     this,
     spawn,
+    persist,
     receive,
     txgraph,
 )
@@ -45,7 +54,21 @@ State = TypeVar("State")
 
 
 class ServerActor:
-    """A long-running actor that processes messages, inspired by gen_server."""
+    """A long-running actor that processes messages, inspired by gen_server.
+
+    By default messages are handled strictly one at a time. Subclasses
+    that spend most of their time awaiting remote services can raise
+    `max_concurrency` to keep several handlers in flight at once, and
+    override `ordering_key` so that messages sharing a key are still
+    handled in arrival order.
+    """
+
+    #: How many messages may be in flight at once; 1 means sequential.
+    max_concurrency: int = 1
+
+    #: Seconds without mail before the actor is passivated; None means
+    #: it stays awake for as long as it lives.
+    idle_timeout: Optional[float] = None
 
     def __init__(self):
         """Initialize the actor with its initial state."""
@@ -66,18 +89,122 @@ class ServerActor:
         async with trio.open_nursery() as nursery:
             try:
                 await self.init()
-                while not self.stop:
-                    msg = await receive()
-                    logger.info("received message", graph=msg)
-                    response = await self.handle(nursery, msg)
-                    logger.info("sending response", graph=response)
-
-                    for reply_to in msg.objects(msg.identifier, NT.replyTo):
-                        await send(URIRef(reply_to), response)
+                if self.max_concurrency > 1:
+                    await self.serve_concurrently(nursery)
+                else:
+                    while not self.stop:
+                        msg = await self.next_message(nursery)
+                        if msg is None:
+                            return
+                        await self.process(nursery, msg)
             except Exception as e:
                 logger.error("actor message handling error", error=e)
                 raise
 
+    async def serve_concurrently(self, nursery: trio.Nursery):
+        """Handle up to `max_concurrency` messages at the same time.
+
+        A slot is taken before each receive and given back when the
+        handler finishes, so a saturated actor stops draining its
+        mailbox and senders feel the backpressure. Messages with the
+        same `ordering_key` queue up in a lane and run one after the
+        other; messages without a key run as soon as they arrive.
+        """
+        slots = trio.Semaphore(self.max_concurrency)
+        lanes: Dict[Hashable, deque[Graph]] = {}
+        accepting = trio.CancelScope()
+
+        async def run_one(msg: Graph):
+            try:
+                await self.process(nursery, msg)
+            finally:
+                slots.release()
+                if self.stop:
+                    # Stop taking new messages but let the others finish.
+                    accepting.cancel()
+
+        async def run_lane(key: Hashable):
+            lane = lanes[key]
+            try:
+                while lane:
+                    await run_one(lane[0])
+                    lane.popleft()
+            finally:
+                del lanes[key]
+
+        async with trio.open_nursery() as handlers:
+            with accepting:
+                while not self.stop:
+                    await slots.acquire()
+                    msg = await self.next_message(nursery, handlers)
+                    if msg is None:
+                        return
+                    key = self.ordering_key(msg)
+                    if key is None:
+                        handlers.start_soon(run_one, msg)
+                    elif key in lanes:
+                        lanes[key].append(msg)
+                    else:
+                        lanes[key] = deque([msg])
+                        handlers.start_soon(run_lane, key)
+
+    async def next_message(
+        self, *nurseries: trio.Nursery
+    ) -> Optional[Graph]:
+        """Wait for the next message, or return None once passivated.
+
+        An actor is only put to sleep when it has been idle for
+        `idle_timeout` and none of the given nurseries has tasks left,
+        since a sleeping actor has nowhere for its children to live.
+        """
+        while True:
+            with trio.move_on_after(self.idle_timeout or math.inf):
+                return await receive()
+            if any(n.child_tasks for n in nurseries):
+                continue
+            await self.hibernate()
+            if vat.get().passivate():
+                return None
+
+    async def process(self, nursery: trio.Nursery, msg: Graph):
+        """Handle one message and send the response to its reply targets."""
+        logger.info("received message", graph=msg)
+        system = vat.get()
+        context = system.curr.get()
+        # Concurrent handlers share the task that received the message,
+        # so the trace is taken from the message, not from the task.
+        with system.tracer.span(
+            "handle",
+            context.addr,
+            traceparent=system.tracer.stamp_of(msg)[0],
+            follow_current=False,
+        ):
+            started = trio.current_time()
+            try:
+                response = await self.handle(nursery, msg)
+            finally:
+                context.metrics.handling.observe(
+                    trio.current_time() - started
+                )
+            logger.info("sending response", graph=response)
+
+            for reply_to in msg.objects(msg.identifier, NT.replyTo):
+                try:
+                    await send(URIRef(reply_to), response)
+                except ValueError:
+                    # The caller gave up waiting and its reply address
+                    # is gone.
+                    logger.warning("dropping unroutable reply", to=reply_to)
+
+    def ordering_key(self, graph: Graph) -> Optional[Hashable]:
+        """Return a key for messages that must be handled in order.
+
+        Only consulted when `max_concurrency` is above one. Messages
+        with equal keys are handled sequentially in arrival order;
+        returning None lets the message run alongside any other.
+        """
+        return None
+
     async def init(self):
         """Initialize the actor before it begins its performance.
 
@@ -87,6 +214,28 @@ class ServerActor:
         """
         pass
 
+    async def hibernate(self):
+        """Save the actor into its graph before it sleeps.
+
+        Called before passivation, which lets go of the actor object, so
+        whatever it keeps in attributes must go into the graph it runs
+        in for `rehydrate` to find. Overrides write that and then call
+        this, which saves the graph. Actors that keep all their state in
+        graphs already, as most do, need not override anything.
+        """
+        graph = here.graph.get()
+        if isinstance(graph.identifier, URIRef):
+            await persist(graph)
+
+    @classmethod
+    def rehydrate(cls, actor: URIRef) -> Self:
+        """Make the actor again from what `hibernate` left in its graph.
+
+        Called with that graph bound when a message comes for a
+        passivated actor; `init` runs again after, as on any start.
+        """
+        return cls()
+
     async def handle(self, nursery: trio.Nursery, graph: Graph) -> Graph:
         """Handle an incoming message, producing a response.
 
@@ -0,0 +1,141 @@
+"""Worker pools for actors whose handlers are CPU-bound.
+
+Every actor shares the one trio thread, so a handler that spends a
+second parsing RDF or building Ogg pages stalls every other actor and
+every HTTP request for that second. A worker actor keeps its mailbox on
+the trio thread but runs the handler body in a thread or in a separate
+process, and only the message and its response cross the boundary.
+
+Messages usually live in the repository's shared store, which the trio
+thread keeps mutating. They are therefore marshalled into plain lists
+of triples on the way out and rebuilt as standalone graphs inside the
+worker, so the handler never sees the live dataset.
+"""
+
+import multiprocessing
+
+from typing import Callable, Optional
+from concurrent.futures import ProcessPoolExecutor
+
+import trio
+import structlog
+
+from rdflib import Graph, IdentifiedNode
+from rdflib.graph import _TripleType
+
+from bubble.mesh.otp import ServerActor
+from bubble.mesh.base import spawn
+
+logger = structlog.get_logger()
+
+Marshalled = tuple[IdentifiedNode, list[_TripleType]]
+Work = Callable[[Graph], Graph]
+
+
+def marshal(graph: Graph) -> Marshalled:
+    """Flatten a graph into a picklable identifier and triple list."""
+    assert isinstance(graph.identifier, IdentifiedNode)
+    return graph.identifier, list(graph.triples((None, None, None)))
+
+
+def unmarshal(data: Marshalled) -> Graph:
+    """Rebuild a standalone graph from marshalled triples."""
+    identifier, triples = data
+    graph = Graph(identifier=identifier)
+    graph.addN((s, p, o, graph) for s, p, o in triples)
+    return graph
+
+
+def run_marshalled(work: Work, data: Marshalled) -> Marshalled:
+    """Run a handler body on marshalled data; this is what the worker sees."""
+    return marshal(work(unmarshal(data)))
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """The shared process pool, started on first use.
+
+    Worker processes are spawned rather than forked, since forking a
+    process that already runs trio and its worker threads is unsafe.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+async def offload(
+    work: Work,
+    graph: Graph,
+    *,
+    processes: bool = False,
+    limiter: Optional[trio.CapacityLimiter] = None,
+) -> Graph:
+    """Run `work(graph)` off the trio thread and return its result.
+
+    With `processes` the work function must be picklable, which in
+    practice means defined at module level.
+    """
+    data = marshal(graph)
+    if processes:
+        future = process_pool().submit(run_marshalled, work, data)
+        try:
+            result = await trio.to_thread.run_sync(
+                future.result, abandon_on_cancel=True, limiter=limiter
+            )
+        except trio.Cancelled:
+            future.cancel()
+            raise
+    else:
+        result = await trio.to_thread.run_sync(
+            run_marshalled, work, data, limiter=limiter
+        )
+    return unmarshal(result)
+
+
+class WorkerActor(ServerActor):
+    """A server actor whose handler body runs in a worker pool.
+
+    The work function takes the request graph and returns the response
+    graph. It runs without the vat, the repository or any of the usual
+    context parameters, so it should be a pure function of its message.
+    """
+
+    def __init__(
+        self, work: Work, *, processes: bool = False, workers: int = 1
+    ):
+        super().__init__()
+        self.name = getattr(work, "__name__", self.name)
+        self.work = work
+        self.processes = processes
+        self.max_concurrency = workers
+        self.limiter = trio.CapacityLimiter(workers)
+
+    async def handle(self, nursery: trio.Nursery, graph: Graph) -> Graph:
+        return await offload(
+            self.work,
+            graph,
+            processes=self.processes,
+            limiter=self.limiter,
+        )
+
+
+async def spawn_worker(
+    nursery: trio.Nursery,
+    work: Work,
+    *,
+    processes: bool = False,
+    workers: int = 1,
+    name: Optional[str] = None,
+):
+    """Spawn an actor that answers each message with `work(message)`.
+
+    Up to `workers` messages are processed at once, in threads by
+    default or in the shared process pool when `processes` is set.
+    """
+    actor = WorkerActor(work, processes=processes, workers=workers)
+    return await spawn(nursery, actor, name=name or actor.name)
@@ -0,0 +1,244 @@
+"""Sharding a town across several vat processes on one host.
+
+A vat runs on a single trio thread, so one town uses one core. Here we
+run several vats side by side, one per process, and let each of them
+own a slice of the actor address space. An actor's URI decides which
+shard it lives on by consistent hashing: a vat only ever mints actor
+addresses that hash to itself, so any sibling can route a message from
+the address alone, with no directory to consult.
+
+Siblings talk over Unix sockets in a shared directory. The link plugs
+into the same `Vat.send` fallback that NATS uses, so actors never need
+to know which shard their correspondents are on.
+"""
+
+import os
+import sys
+import bisect
+import socket
+import hashlib
+import importlib
+
+from typing import Dict, Callable, Optional, Awaitable, AsyncIterator
+from functools import partial
+from collections import defaultdict
+
+import trio
+import structlog
+
+from bubble.mesh.base import Vat, Batching, vat
+from bubble.mesh.wire import encode_frame, split_frames
+
+logger = structlog.get_logger(__name__)
+
+Entry = Callable[[trio.Nursery], Awaitable[None]]
+
+
+def ring_hash(key: str) -> int:
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HashRing:
+    """Consistent hashing of keys onto shard numbers.
+
+    Each shard gets many points on the ring so that keys spread evenly,
+    and changing the shard count only moves the keys near the points
+    that were added or removed.
+    """
+
+    def __init__(self, shards: int, replicas: int = 64):
+        if shards < 1:
+            raise ValueError("A ring needs at least one shard")
+        points = sorted(
+            (ring_hash(f"{shard}:{replica}"), shard)
+            for shard in range(shards)
+            for replica in range(replicas)
+        )
+        self.hashes = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def owner(self, key: str) -> int:
+        i = bisect.bisect(self.hashes, ring_hash(key)) % len(self.hashes)
+        return self.shards[i]
+
+
+async def read_frames(
+    stream: trio.abc.ReceiveStream,
+) -> AsyncIterator[tuple[str, bytes]]:
+    """Yield (actor URI, message) pairs until the stream closes."""
+    buffer = bytearray()
+    while True:
+        for frame in split_frames(buffer):
+            yield frame
+        chunk = await stream.receive_some()
+        if not chunk:
+            return
+        buffer += chunk
+
+
+class ShardLink:
+    """A transport between sibling vats over Unix sockets."""
+
+    def __init__(
+        self,
+        nursery: trio.Nursery,
+        shard: int,
+        shards: int,
+        socket_dir: str,
+    ):
+        self.nursery = nursery
+        self.shard = shard
+        self.ring = HashRing(shards)
+        self.socket_dir = socket_dir
+        self.connected = False
+        self.peers: Dict[int, trio.SocketStream] = {}
+        self.peer_locks: Dict[int, trio.Lock] = defaultdict(trio.Lock)
+
+    def socket_path(self, shard: int) -> str:
+        return os.path.join(self.socket_dir, f"vat-{shard}.sock")
+
+    def owner(self, actor_uri: str) -> int:
+        return self.ring.owner(actor_uri)
+
+    def owns(self, actor_uri: str) -> bool:
+        return self.owner(actor_uri) == self.shard
+
+    async def subscribe_to_actor_messages(
+        self, cb: Callable[[str, bytes], Awaitable[None]]
+    ) -> None:
+        """Start accepting messages from siblings."""
+        await self.nursery.start(self.serve, cb)
+        self.connected = True
+
+    async def serve(
+        self,
+        cb: Callable[[str, bytes], Awaitable[None]],
+        task_status=trio.TASK_STATUS_IGNORED,
+    ) -> None:
+        path = self.socket_path(self.shard)
+        os.makedirs(self.socket_dir, exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)
+
+        sock = trio.socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        await sock.bind(path)
+        sock.listen()
+
+        async def handle(stream: trio.SocketStream):
+            async with stream:
+                async for actor_uri, message in read_frames(stream):
+                    await cb(actor_uri, message)
+
+        logger.info("shard listening", shard=self.shard, path=path)
+        await trio.serve_listeners(
+            handle, [trio.SocketListener(sock)], task_status=task_status
+        )
+
+    async def connect(self, shard: int, patience: float = 5.0):
+        """Connect to a sibling, waiting for it to come up if needed."""
+        with trio.move_on_after(patience):
+            while True:
+                try:
+                    return await trio.open_unix_socket(
+                        self.socket_path(shard)
+                    )
+                except (FileNotFoundError, ConnectionRefusedError):
+                    await trio.sleep(0.05)
+        raise ConnectionError(f"Shard {shard} is not listening")
+
+    async def send_actor_message(
+        self,
+        actor_uri: str,
+        message: bytes,
+        batching: Optional[Batching] = None,
+    ) -> None:
+        """Send a message to the shard that owns the actor.
+
+        Frames are written straight to a stream, so there is nothing to
+        gain from batching them here.
+        """
+        owner = self.owner(actor_uri)
+        if owner == self.shard:
+            # We own the address but the actor is not in our deck.
+            raise ValueError(f"No route found for actor {actor_uri}")
+
+        frame = encode_frame(actor_uri, message)
+        async with self.peer_locks[owner]:
+            for attempt in range(2):
+                if owner not in self.peers:
+                    self.peers[owner] = await self.connect(owner)
+                try:
+                    await self.peers[owner].send_all(frame)
+                    return
+                except (trio.BrokenResourceError, trio.ClosedResourceError):
+                    # The sibling restarted; reconnect once and retry.
+                    del self.peers[owner]
+                    if attempt:
+                        raise
+
+    async def actor_started(self, actor_uri: str) -> None:
+        # Placement is decided by the address, so there is nothing to tell.
+        pass
+
+    async def actor_stopped(self, actor_uri: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        for stream in self.peers.values():
+            await stream.aclose()
+        self.peers.clear()
+        self.connected = False
+
+
+def load_entry(spec: str) -> Entry:
+    """Resolve a ``package.module:function`` entry point."""
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+async def run_shard(
+    entry: Entry,
+    site: str,
+    shard: int,
+    shards: int,
+    socket_dir: str,
+) -> None:
+    """Run one shard: a vat joined to its siblings, then the entry point.
+
+    The entry point runs with the vat bound and gets a nursery to spawn
+    its actors into; every shard runs the same entry point.
+    """
+    system = Vat(site, structlog.get_logger().bind(shard=shard))
+    async with trio.open_nursery() as nursery:
+        with vat.bind(system):
+            await system.setup_shards(nursery, shard, shards, socket_dir)
+            await entry(nursery)
+
+
+async def run_shards(
+    entry: str,
+    site: str,
+    shards: int,
+    socket_dir: str,
+    python: Optional[str] = None,
+) -> None:
+    """Start one worker process per shard and wait for all of them."""
+    async with trio.open_nursery() as nursery:
+        for shard in range(shards):
+            command = [
+                python or sys.executable,
+                "-m",
+                "bubble",
+                "shard",
+                entry,
+                "--base-url",
+                site,
+                "--shards",
+                str(shards),
+                "--socket-dir",
+                socket_dir,
+                "--index",
+                str(shard),
+            ]
+            nursery.start_soon(partial(trio.run_process, command))
@@ -0,0 +1,226 @@
+"""Traces that follow one request from actor to actor and across vats.
+
+A trace begins where someone opens a root span, usually an HTTP
+handler. Any message sent inside a span is stamped with a W3C style
+``traceparent`` naming the trace and the sending span, along with the
+wall clock time it left. The stamp never goes into the graph the
+sender holds, which may well be one the repository saves. A message
+for another vat carries it as triples in its encoding, so it crosses
+NATS and shard links like everything else in the message, and NATS
+publishes repeat it as a header for those watching the wire rather
+than the graphs. A message for an actor in the same vat is not
+encoded at all, so the vat keeps its stamp on the side.
+
+Each vat keeps its recent finished spans in a bounded buffer. The hops
+it records are these:
+
+``send``
+    From `send` until the message is in a mailbox or with the transport.
+``deliver``
+    From when the message left its sender until the recipient took it
+    out of its mailbox: the time in transit plus the time in the queue.
+``handle``
+    A server actor working on the message.
+``call``
+    A whole request and reply round trip.
+
+Span times are wall clock seconds, so that spans from different vats
+line up, give or take the skew between their clocks.
+"""
+
+import time
+import secrets
+
+from typing import Iterator, Optional, ContextManager
+from weakref import WeakKeyDictionary
+from contextlib import nullcontext, contextmanager
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from rdflib import XSD, Graph, URIRef, Literal
+
+from swash.prfx import NT
+
+TRACE_HEADER = "traceparent"
+
+NOT_TRACING: ContextManager[None] = nullcontext()
+
+#: The span whose work is under way in this task, if any.
+current_span: ContextVar[Optional["Span"]] = ContextVar(
+    "current_span", default=None
+)
+
+
+@dataclass
+class Span:
+    """One timed hop of a trace."""
+
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    actor: Optional[URIRef]
+    start: float
+    end: Optional[float] = None
+    #: The other actor involved, like the recipient of a send.
+    peer: Optional[URIRef] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple[str, str]]:
+    """The trace id and parent span id of a traceparent, if well formed."""
+    if not value:
+        return None
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def stamp_triples(message: Graph, span: Span) -> list:
+    """The triples that mark a message as sent from within a span."""
+    return [
+        (message.identifier, NT.traceparent, Literal(span.traceparent)),
+        (
+            message.identifier,
+            NT.sentAt,
+            Literal(span.start, datatype=XSD.double),
+        ),
+    ]
+
+
+def trace_headers() -> dict[str, str]:
+    """Headers carrying the current span, for transports that have them."""
+    span = current_span.get()
+    return {} if span is None else {TRACE_HEADER: span.traceparent}
+
+
+class Tracer:
+    """The recent finished spans of one vat."""
+
+    def __init__(self, capacity: int = 10000):
+        self.spans: deque[Span] = deque(maxlen=capacity)
+        #: Stamps of messages sent within this vat, by message.
+        self.stamps: WeakKeyDictionary[Graph, tuple[str, float]] = (
+            WeakKeyDictionary()
+        )
+
+    def stamp(self, message: Graph, span: Optional[Span]) -> None:
+        """Remember the span a message is handed over in, if any."""
+        if span is None:
+            self.stamps.pop(message, None)
+        else:
+            self.stamps[message] = (span.traceparent, span.start)
+
+    def stamp_of(
+        self, message: Graph
+    ) -> tuple[Optional[str], Optional[float]]:
+        """The traceparent and send time of a message, if stamped.
+
+        Messages from this vat have their stamps on the side; those
+        from other vats carry them in their triples.
+        """
+        stamp = self.stamps.get(message)
+        if stamp is not None:
+            return stamp
+        traceparent = message.value(message.identifier, NT.traceparent)
+        sent = message.value(message.identifier, NT.sentAt)
+        return (
+            None if traceparent is None else str(traceparent),
+            None if sent is None else float(sent.toPython()),
+        )
+
+    def span(
+        self,
+        name: str,
+        actor: Optional[URIRef],
+        peer: Optional[URIRef] = None,
+        *,
+        traceparent: Optional[str] = None,
+        follow_current: bool = True,
+        root: bool = False,
+    ) -> ContextManager[Optional[Span]]:
+        """Time a block as a span of whatever trace it belongs to.
+
+        The parent is the given traceparent, or else the current span
+        unless `follow_current` is off. A block with no parent starts a
+        new trace if `root` is set, and is otherwise not traced at all:
+        the span yielded is None and nothing is recorded.
+        """
+        parent = parse_traceparent(traceparent)
+        if parent is None and follow_current:
+            current = current_span.get()
+            if current is not None:
+                parent = current.trace_id, current.span_id
+        if parent is None and not root:
+            return NOT_TRACING
+        trace_id, parent_id = parent or (secrets.token_hex(16), None)
+        return self.timed(
+            Span(
+                trace_id,
+                secrets.token_hex(8),
+                parent_id,
+                name,
+                actor,
+                time.time(),
+                peer=peer,
+            )
+        )
+
+    @contextmanager
+    def timed(self, span: Span) -> Iterator[Span]:
+        token = current_span.set(span)
+        try:
+            yield span
+        finally:
+            current_span.reset(token)
+            span.end = time.time()
+            self.spans.append(span)
+
+    def delivered(self, message: Graph, actor: URIRef) -> None:
+        """Record a message's trip into an actor's hands.
+
+        What the actor does next belongs to the message's trace, or to
+        no trace at all if the message carries no stamp.
+        """
+        traceparent, sent = self.stamp_of(message)
+        parent = parse_traceparent(traceparent)
+        if parent is None or sent is None:
+            current_span.set(None)
+            return
+        span = Span(
+            parent[0],
+            secrets.token_hex(8),
+            parent[1],
+            "deliver",
+            actor,
+            sent,
+            time.time(),
+        )
+        self.spans.append(span)
+        current_span.set(span)
+
+    def trace(self, trace_id: str) -> list[Span]:
+        """The spans of one trace that passed through this vat."""
+        spans = [s for s in self.spans if s.trace_id == trace_id]
+        return sorted(spans, key=lambda s: s.start)
+
+    def traces(self, limit: int = 50) -> list[list[Span]]:
+        """The most recent traces, newest first."""
+        traces: dict[str, list[Span]] = {}
+        for span in self.spans:
+            traces.setdefault(span.trace_id, []).append(span)
+        newest = sorted(
+            traces.values(),
+            key=lambda spans: min(s.start for s in spans),
+            reverse=True,
+        )
+        return [sorted(t, key=lambda s: s.start) for t in newest[:limit]]
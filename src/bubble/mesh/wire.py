@@ -0,0 +1,327 @@
+"""A compact binary encoding for RDF messages between vats and peers.
+
+Messages used to travel as TriG text, which every hop had to run
+through the full TriG parser. This codec writes each distinct term once
+into a table and every quad as four varint references into it. IRIs
+are split at their last ``/`` or ``#`` so that the namespace is also
+stored once, and base64 literals, which is how audio chunks travel,
+are carried as raw bytes. The whole thing may be zstd-compressed when
+the ``zstandard`` package is around.
+
+An encoded message starts with a NUL byte, which no TriG document can,
+so a receiver can tell the two apart without any other negotiation.
+Over WebSockets the binary format is offered as a subprotocol instead,
+since a browser peer speaks TriG unless it asks otherwise.
+"""
+
+import base64
+import struct
+import binascii
+
+from typing import Iterable, Iterator, Optional
+
+from rdflib import XSD, BNode, Graph, URIRef, Dataset, Literal
+from rdflib.term import Node
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+SUBPROTOCOL = "bubble-rdf"
+
+MAGIC = b"\x00BRD"
+VERSION = 1
+FLAG_ZSTD = 1
+
+# Messages smaller than this are not worth compressing.
+COMPRESSION_THRESHOLD = 1024
+
+IRI, BLANK, PLAIN, LANG, TYPED, BASE64 = range(6)
+
+Quad = tuple[Node, Node, Node, Optional[Node]]
+
+# Frames are the actor URI and the message, each prefixed by its length.
+FRAME_HEADER = struct.Struct(">II")
+
+
+def write_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def write_bytes(out: bytearray, data: bytes) -> None:
+    write_varint(out, len(data))
+    out += data
+
+
+def write_text(out: bytearray, text: str) -> None:
+    write_bytes(out, text.encode())
+
+
+class Reader:
+    """A cursor over an encoded message."""
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def varint(self) -> int:
+        n = shift = 0
+        while True:
+            try:
+                byte = self.data[self.pos]
+            except IndexError:
+                raise ValueError("Truncated RDF message")
+            self.pos += 1
+            n |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return n
+            shift += 7
+
+    def bytes(self) -> bytes:
+        size = self.varint()
+        end = self.pos + size
+        if end > len(self.data):
+            raise ValueError("Truncated RDF message")
+        chunk = bytes(self.data[self.pos : end])
+        self.pos = end
+        return chunk
+
+    def text(self) -> str:
+        return self.bytes().decode()
+
+
+def split_iri(iri: str) -> tuple[str, str]:
+    cut = max(iri.rfind("/"), iri.rfind("#")) + 1
+    return iri[:cut], iri[cut:]
+
+
+def raw_base64(literal: Literal) -> Optional[bytes]:
+    """The bytes of a base64 literal, if they round-trip exactly."""
+    lexical = str(literal)
+    try:
+        raw = base64.b64decode(lexical, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if base64.b64encode(raw).decode() != lexical:
+        return None
+    return raw
+
+
+class Encoder:
+    def __init__(self):
+        self.namespaces: dict[str, int] = {}
+        self.terms: dict[Node, int] = {}
+        self.namespace_table = bytearray()
+        self.term_table = bytearray()
+        self.quads = bytearray()
+        self.quad_count = 0
+
+    def namespace(self, ns: str) -> int:
+        index = self.namespaces.get(ns)
+        if index is None:
+            index = self.namespaces[ns] = len(self.namespaces)
+            write_text(self.namespace_table, ns)
+        return index
+
+    def term(self, term: Node) -> int:
+        index = self.terms.get(term)
+        if index is not None:
+            return index
+
+        out = self.term_table
+        if isinstance(term, URIRef):
+            ns, local = split_iri(term)
+            ns_index = self.namespace(ns)
+            out.append(IRI)
+            write_varint(out, ns_index)
+            write_text(out, local)
+        elif isinstance(term, BNode):
+            out.append(BLANK)
+            write_text(out, term)
+        elif isinstance(term, Literal):
+            raw = None
+            if term.datatype == XSD.base64Binary:
+                raw = raw_base64(term)
+            if raw is not None:
+                out.append(BASE64)
+                write_bytes(out, raw)
+            elif term.language:
+                out.append(LANG)
+                write_text(out, term)
+                write_text(out, term.language)
+            elif term.datatype:
+                # The datatype goes into the table before the literal.
+                datatype = self.term(term.datatype)
+                out = self.term_table
+                out.append(TYPED)
+                write_text(out, term)
+                write_varint(out, datatype)
+            else:
+                out.append(PLAIN)
+                write_text(out, term)
+        else:
+            raise TypeError(f"Cannot encode RDF term {term!r}")
+
+        index = self.terms[term] = len(self.terms)
+        return index
+
+    def add(self, s: Node, p: Node, o: Node, g: Optional[Node]) -> None:
+        refs = (self.term(s), self.term(p), self.term(o))
+        if g is None or g == DATASET_DEFAULT_GRAPH_ID:
+            graph = 0
+        else:
+            graph = self.term(g) + 1
+        for ref in refs:
+            write_varint(self.quads, ref)
+        write_varint(self.quads, graph)
+        self.quad_count += 1
+
+    def finish(self) -> bytes:
+        out = bytearray()
+        write_varint(out, len(self.namespaces))
+        out += self.namespace_table
+        write_varint(out, len(self.terms))
+        out += self.term_table
+        write_varint(out, self.quad_count)
+        out += self.quads
+        return bytes(out)
+
+
+def decode_terms(reader: Reader) -> list[Node]:
+    namespaces = [reader.text() for _ in range(reader.varint())]
+    terms: list[Node] = []
+    for _ in range(reader.varint()):
+        kind = reader.varint()
+        if kind == IRI:
+            ns = namespaces[reader.varint()]
+            terms.append(URIRef(ns + reader.text()))
+        elif kind == BLANK:
+            terms.append(BNode(reader.text()))
+        elif kind == PLAIN:
+            terms.append(Literal(reader.text()))
+        elif kind == LANG:
+            lexical = reader.text()
+            terms.append(Literal(lexical, lang=reader.text()))
+        elif kind == TYPED:
+            lexical = reader.text()
+            datatype = terms[reader.varint()]
+            terms.append(Literal(lexical, datatype=datatype))
+        elif kind == BASE64:
+            terms.append(
+                Literal(
+                    base64.b64encode(reader.bytes()).decode(),
+                    datatype=XSD.base64Binary,
+                )
+            )
+        else:
+            raise ValueError(f"Unknown RDF term kind {kind}")
+    return terms
+
+
+def is_binary(data: bytes) -> bool:
+    """Whether a message is in this format rather than TriG."""
+    return data[: len(MAGIC)] == MAGIC
+
+
+def encode_quads(
+    quads: Iterable[Quad], compress: Optional[bool] = None
+) -> bytes:
+    """Encode quads, compressing if asked to or if it seems worth it.
+
+    With ``compress=None``, large messages are compressed when zstd is
+    available; asking for compression without it is an error.
+    """
+    encoder = Encoder()
+    for s, p, o, g in quads:
+        if isinstance(g, Graph):
+            g = g.identifier
+        encoder.add(s, p, o, g)
+    body = encoder.finish()
+
+    if compress is None:
+        compress = (
+            zstandard is not None and len(body) >= COMPRESSION_THRESHOLD
+        )
+    flags = 0
+    if compress:
+        if zstandard is None:
+            raise RuntimeError("Compression needs the zstandard package")
+        body = zstandard.ZstdCompressor().compress(body)
+        flags |= FLAG_ZSTD
+
+    return MAGIC + bytes((VERSION, flags)) + body
+
+
+def decode_quads(data: bytes) -> Iterator[Quad]:
+    if not is_binary(data):
+        raise ValueError("Not a binary RDF message")
+    version, flags = data[len(MAGIC)], data[len(MAGIC) + 1]
+    if version != VERSION:
+        raise ValueError(f"Unsupported RDF message version {version}")
+
+    body = data[len(MAGIC) + 2 :]
+    if flags & FLAG_ZSTD:
+        if zstandard is None:
+            raise ValueError("Message is compressed but zstd is missing")
+        body = zstandard.ZstdDecompressor().decompress(body)
+
+    reader = Reader(body)
+    terms = decode_terms(reader)
+    for _ in range(reader.varint()):
+        s, p, o, g = (reader.varint() for _ in range(4))
+        yield terms[s], terms[p], terms[o], terms[g - 1] if g else None
+
+
+def encode_graph(graph: Graph, compress: Optional[bool] = None) -> bytes:
+    """Encode a graph, or all graphs of a dataset, with their names."""
+    if isinstance(graph, Dataset):
+        return encode_quads(graph.quads(), compress)
+    return encode_quads(
+        ((s, p, o, graph.identifier) for s, p, o in graph), compress
+    )
+
+
+def decode_dataset(
+    data: bytes, dataset: Optional[Dataset] = None
+) -> Dataset:
+    """Decode a message into a new dataset, or into the one given."""
+    if dataset is None:
+        dataset = Dataset()
+    graphs: dict[Optional[Node], Graph] = {None: dataset.default_context}
+    quads = []
+    for s, p, o, g in decode_quads(data):
+        if g not in graphs:
+            graphs[g] = dataset.graph(g)
+        quads.append((s, p, o, graphs[g]))
+    dataset.addN(quads)
+    return dataset
+
+
+def encode_frame(actor_uri: str, message: bytes) -> bytes:
+    """Frame a message for an actor, for streams and batches."""
+    uri = actor_uri.encode()
+    return FRAME_HEADER.pack(len(uri), len(message)) + uri + message
+
+
+def split_frames(buffer: bytearray) -> Iterator[tuple[str, bytes]]:
+    """Take complete (actor URI, message) frames off a buffer.
+
+    Whatever is left over is the start of a frame still in transit.
+    """
+    while len(buffer) >= FRAME_HEADER.size:
+        uri_size, message_size = FRAME_HEADER.unpack_from(buffer)
+        uri_end = FRAME_HEADER.size + uri_size
+        end = uri_end + message_size
+        if len(buffer) < end:
+            return
+        frame = (
+            buffer[FRAME_HEADER.size : uri_end].decode(),
+            bytes(buffer[uri_end:end]),
+        )
+        del buffer[:end]
+        yield frame
@@ -18,6 +18,7 @@ import subprocess
 
 from typing import (
     Any,
+    TypeVar,
     BinaryIO,
     Callable,
     Iterator,
@@ -25,7 +26,10 @@ from typing import (
     Generator,
     cast,
 )
+from weakref import WeakKeyDictionary
+from datetime import UTC, datetime
 from contextlib import contextmanager, asynccontextmanager
+from dataclasses import dataclass
 from urllib.parse import urlparse
 from collections.abc import AsyncIterator
 
@@ -47,6 +51,7 @@ from rdflib import (
     Namespace,
     IdentifiedNode,
 )
+from rdflib.term import Node
 from rdflib.namespace import DCAT, PROV, DCTERMS
 from cryptography.hazmat.primitives.asymmetric import ed25519
 
@@ -55,8 +60,22 @@ import swash
 from swash import here
 from swash.mint import fresh_uri
 from swash.prfx import NT
-from swash.util import O, P, S, add, new, get_single_object
+from swash.util import (
+    O,
+    P,
+    S,
+    TriplesAddedEvent,
+    add,
+    new,
+    muted,
+    add_triples,
+    get_single_object,
+)
 from bubble.keys import generate_keypair, get_public_key_bytes
+from swash.store import NoisyMemory, CompactStore
+from swash.census import Census
+from swash.sqlite import SQLiteStore
+from swash.snapshot import Snapshots
 from bubble.repo.git import Git
 
 FROTH = Namespace("https://node.town/ns/froth#")
@@ -64,6 +83,35 @@ FROTH = Namespace("https://node.town/ns/froth#")
 
 logger = structlog.get_logger()
 
+T = TypeVar("T")
+
+
+def index_file(workdir: str | os.PathLike) -> str:
+    """Where a repository keeps its on-disk index, out of git's sight."""
+    directory = os.path.join(workdir, ".index")
+    os.makedirs(directory, exist_ok=True)
+    ignore = os.path.join(directory, ".gitignore")
+    if not os.path.exists(ignore):
+        with open(ignore, "w") as f:
+            f.write("*\n")
+    return os.path.join(directory, "graphs.sqlite")
+
+
+#: The kinds of triple store a repository's dataset can live in, each
+#: made from the repository's working directory.
+STORES: dict[str, Callable[[str | os.PathLike], rdflib.store.Store]] = {
+    "memory": lambda workdir: NoisyMemory(),
+    "compact": lambda workdir: CompactStore(),
+    "sqlite": lambda workdir: SQLiteStore(index_file(workdir)),
+}
+
+
+def open_dataset(
+    store: str = "memory", workdir: str | os.PathLike = "."
+) -> Dataset:
+    """A union dataset in the named kind of triple store."""
+    return Dataset(store=STORES[store](workdir), default_union=True)
+
 
 class context:
     """Manages the current graph, activity and agent context.
@@ -131,6 +179,10 @@ context.clock.set(
 )
 
 
+def digest(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
 def timestamp() -> O:
     """Get the current time from our contextual clock.
 
@@ -210,6 +262,64 @@ class FileBlob:
         self.close()
 
 
+@dataclass
+class LockStats:
+    """How often writers found a lock taken, and how long they waited."""
+
+    acquired: int = 0
+    contended: int = 0
+    waited: float = 0.0
+
+    @asynccontextmanager
+    async def hold(self, lock: trio.Lock) -> AsyncIterator[None]:
+        self.acquired += 1
+        if lock.locked():
+            self.contended += 1
+            started = trio.current_time()
+            await lock.acquire()
+            self.waited += trio.current_time() - started
+        else:
+            await lock.acquire()
+        try:
+            yield
+        finally:
+            lock.release()
+
+
+class GraphJournal:
+    """The triples added to some graphs of one store, by graph.
+
+    Only graphs we have been asked to `track` are journaled; the rest
+    of the store's writes go unrecorded.
+    """
+
+    def __init__(self):
+        self.added: dict[Node, list[tuple[Node, Node, Node]]] = {}
+
+    def track(self, identifier: Node) -> None:
+        self.added[identifier] = []
+
+    def tracks(self, identifier: Node) -> bool:
+        return identifier in self.added
+
+    def on_triple_added(self, event: rdflib.store.TripleAddedEvent) -> None:
+        context = event.context  # type: ignore
+        added = self.added.get(getattr(context, "identifier", None))
+        if added is not None:
+            added.append(event.triple)  # type: ignore
+
+    def on_triples_added(self, event: TriplesAddedEvent) -> None:
+        context = event.context  # type: ignore
+        added = self.added.get(getattr(context, "identifier", None))
+        if added is not None:
+            added.extend(event.triples)  # type: ignore
+
+    def drain(self, identifier: Node) -> list[tuple[Node, Node, Node]]:
+        added = self.added[identifier]
+        self.added[identifier] = []
+        return added
+
+
 class Repository:
     """A versioned RDF dataset with Git-backed persistence.
 
@@ -223,7 +333,7 @@ class Repository:
     you've done your homework.
     """
 
-    dirty_graphs: set[Graph] = set()
+    dirty_graphs: set[Graph]
 
     async def __init__(
         self,
@@ -263,7 +373,18 @@ class Repository:
         )
 
         self.namespace = Namespace(self.base_url)
-        self.dataset = dataset or Dataset(default_union=True)
+        # An empty dataset is falsy, so test for None.
+        self.dataset = dataset if dataset is not None else open_dataset()
+        self.snapshots = Snapshots(self.dataset)
+        self.census = Census(self.dataset)
+        self.dirty_graphs = set()
+        self.graph_locks: dict[URIRef, trio.Lock] = {}
+        self.catalog_lock = trio.Lock()
+        self.graph_lock_stats = LockStats()
+        self.catalog_lock_stats = LockStats()
+        self.journals: WeakKeyDictionary[
+            rdflib.store.Store, GraphJournal
+        ] = WeakKeyDictionary()
 
         self.dataset.bind("home", self.namespace)
         self.metadata_id = metadata_id
@@ -302,6 +423,9 @@ class Repository:
         self.dataset.store.dispatcher.subscribe(
             rdflib.store.TripleRemovedEvent, self.on_triple_removed
         )
+        self.dataset.store.dispatcher.subscribe(
+            TriplesAddedEvent, self.on_triples_added
+        )
 
     async def _init_keypair(self):
         """Initialize or load the repository's keypair."""
@@ -344,6 +468,11 @@ class Repository:
         assert isinstance(graph, Graph)
         self.dirty_graphs.add(graph)
 
+    def on_triples_added(self, event: TriplesAddedEvent) -> None:
+        graph = event.context  # type: ignore
+        assert isinstance(graph, Graph)
+        self.dirty_graphs.add(graph)
+
     @classmethod
     async def create(
         cls,
@@ -512,6 +641,9 @@ class Repository:
         await self.git.write_file(
             str(graph_file.relative_to(self.git.workdir)), content
         )
+        if self.index is not None:
+            self.index.record_digest(identifier, digest(content))
+            self.index.commit()
 
     async def load_graph(self, identifier: URIRef) -> None:
         """Load a graph from its graph.trig file"""
@@ -520,10 +652,31 @@ class Repository:
             content = await self.git.read_file(
                 str(graph_file.relative_to(self.git.workdir))
             )
+            checksum = digest(content)
+            # The file was last changed when the graph last was.
+            modified = datetime.fromtimestamp(
+                (await graph_file.stat()).st_mtime, UTC
+            )
+            if (
+                self.index is not None
+                and self.index.digest_of(identifier) == checksum
+            ):
+                logger.debug("Graph already indexed", identifier=identifier)
+                self.census.dated(identifier, modified)
+                return
             logger.debug(
                 "Loading graph", identifier=identifier, file=graph_file
             )
-            self.graph(identifier).parse(data=content, format="trig")
+            graph = self.graph(identifier)
+            # What we just read is already on disk, so the graph is
+            # not dirty, and nobody needs to hear about every triple.
+            with muted(self.dataset.store):
+                if self.index is not None:
+                    graph.remove((None, None, None))
+                graph.parse(data=content, format="trig")
+            self.touch(identifier, modified)
+            if self.index is not None:
+                self.index.record_digest(identifier, checksum)
         except FileNotFoundError:
             logger.debug(
                 "New graph, no content to load", identifier=identifier
@@ -533,8 +686,7 @@ class Repository:
         """Save all graphs and the graph catalog"""
         logger.debug("Saving all graphs")
         # Save metadata directly since we maintain it in memory
-        content = self.metadata.serialize(format="turtle")
-        await self.git.write_file("void.ttl", content)
+        await self.save_catalog()
 
         # Save all graphs with their full metadata
         if self.dirty_graphs:
@@ -542,7 +694,161 @@ class Repository:
             self.dirty_graphs.clear()
             logger.debug("Saving graphs", count=len(dirty_graphs))
             for graph in dirty_graphs:
-                await self.save_graph(graph.identifier)
+                async with self.graph_lock(graph.identifier):
+                    await self.save_graph(graph.identifier)
+
+    async def autosave(self, interval: float = 5.0) -> None:
+        """Save whatever is dirty now and then, and once more at the end.
+
+        Persisting a graph writes only that graph, which leaves the
+        provenance that `new` records elsewhere, and whatever handlers
+        write without persisting, to be picked up here. Meant to run
+        as a task for as long as a town does.
+        """
+        try:
+            while True:
+                await trio.sleep(interval)
+                if self.dirty_graphs:
+                    await self.save_all()
+        finally:
+            with trio.CancelScope(shield=True):
+                if self.dirty_graphs:
+                    await self.save_all()
+
+    async def save_catalog(self) -> None:
+        async with self.catalog_lock_stats.hold(self.catalog_lock):
+            self.dirty_graphs.discard(self.metadata)
+            content = self.metadata.serialize(format="turtle")
+            await self.git.write_file("void.ttl", content)
+            if self.index is not None:
+                self.index.commit()
+
+    def touch(
+        self, identifier: Node, modified: Optional[datetime] = None
+    ) -> None:
+        """Note that a graph was written without the store saying so.
+
+        The census keeps the graph's change time unless given a new one.
+        """
+        self.snapshots.touch(identifier)
+        self.census.touch(identifier, modified)
+
+    def snapshot(self, graphs: frozenset[URIRef] = frozenset()) -> Dataset:
+        """A read-only copy of the named graphs as they are right now.
+
+        With no graphs named, the copy has all of them. An on-disk
+        SQLite store reads through a transaction of its own instead of
+        a copy. Close the snapshot when done with it.
+        """
+        index = self.index
+        if index is not None and index.path != ":memory:":
+            return Dataset(store=index.reader(), default_union=True)
+        return self.snapshots.take(graphs)  # type: ignore
+
+    async def read(
+        self,
+        reader: Callable[..., T],
+        *args: Any,
+        graphs: frozenset[URIRef] = frozenset(),
+    ) -> T:
+        """Run a reader in a worker thread, over a snapshot.
+
+        The reader sees the snapshot as `here.dataset`, scoped to the
+        named graphs as `here.graphs`, so writers can carry on
+        meanwhile without it seeing any of their work. Name the graphs
+        the reader needs, or it waits while every graph is copied.
+        """
+        snapshot = self.snapshot(graphs)
+
+        def read() -> T:
+            with here.dataset.bind(snapshot), here.graphs.bind(graphs):
+                return reader(*args)
+
+        try:
+            return await trio.to_thread.run_sync(read)
+        finally:
+            snapshot.close()
+
+    def graphs_around(self, subject: URIRef) -> frozenset[URIRef]:
+        """The graphs a page about a resource reads.
+
+        Those are the graphs that say something about the resource or
+        about the resources it links to, and the builtin vocabularies.
+        """
+        graphs = set(self.builtin_graphs())
+        neighbours = {subject}
+        for _, _, o, g in self.dataset.quads((subject, None, None, None)):
+            graphs.add(g)
+            if isinstance(o, IdentifiedNode):
+                neighbours.add(o)
+        for neighbour in neighbours - {subject}:
+            for *_, g in self.dataset.quads((neighbour, None, None, None)):
+                graphs.add(g)
+        return frozenset(graphs)
+
+    @property
+    def index(self) -> Optional[SQLiteStore]:
+        """The on-disk store under the dataset, if it lives in one."""
+        store = self.dataset.store
+        return store if isinstance(store, SQLiteStore) else None
+
+    @asynccontextmanager
+    async def graph_lock(self, identifier: URIRef) -> AsyncIterator[None]:
+        """Hold the write lock of one graph.
+
+        Writers of different graphs go ahead side by side; only writers
+        of the same graph take turns. Locks exist only while someone
+        holds or wants them.
+        """
+        lock = self.graph_locks.setdefault(identifier, trio.Lock())
+        try:
+            async with self.graph_lock_stats.hold(lock):
+                yield
+        finally:
+            if not lock.locked() and not lock.statistics().tasks_waiting:
+                self.graph_locks.pop(identifier, None)
+
+    async def flush(self, identifier: URIRef) -> None:
+        """Save one graph, and the graph catalog if it has changed.
+
+        Unlike `save_all`, this leaves other dirty graphs alone, so a
+        busy actor persisting its own graph does not pay for everyone
+        else's.
+        """
+        if self.metadata in self.dirty_graphs:
+            await self.save_catalog()
+        async with self.graph_lock(identifier):
+            self.dirty_graphs.discard(self.graph(identifier))
+            await self.save_graph(identifier)
+
+    def absorb(self, graph: Graph) -> int:
+        """Copy into the repo what an outside graph gained since last time.
+
+        The first time we see a graph we copy all of it, then keep a
+        journal of the triples added to it, so that each later call
+        copies only those. Other graphs in the same store get their
+        own full copy when they are first absorbed. Removals are not
+        carried over. Graphs that already live in our dataset have
+        nothing to copy. Returns the number of triples copied.
+        """
+        target = self.graph(graph.identifier)
+        if graph.store is self.dataset.store:
+            return 0
+        journal = self.journals.get(graph.store)
+        if journal is None:
+            journal = self.journals[graph.store] = GraphJournal()
+            graph.store.dispatcher.subscribe(
+                rdflib.store.TripleAddedEvent, journal.on_triple_added
+            )
+            graph.store.dispatcher.subscribe(
+                TriplesAddedEvent, journal.on_triples_added
+            )
+        if journal.tracks(graph.identifier):
+            triples = journal.drain(graph.identifier)
+        else:
+            journal.track(graph.identifier)
+            triples = list(graph)
+        return add_triples(target, triples)
 
     async def load_all(self) -> None:
         """Load all graphs"""
@@ -691,7 +997,10 @@ class Repository:
         self.metadata.add((identifier, NT.hasFilePath, Literal(path)))
 
         graph = self.dataset.graph(identifier, base=self.namespace)
-        graph.parse(path, format="turtle")
+        # Builtin graphs are never saved, so they need not be dirty.
+        with muted(self.dataset.store):
+            graph.parse(path, format="turtle")
+        self.touch(identifier)
         return graph
 
     def reload_builtin_graphs(self) -> None:
@@ -705,12 +1014,12 @@ class Repository:
                 "Reloading builtin graph", identifier=identifier, path=path
             )
 
-            # Clear existing graph
+            # Clear existing graph and reload from file
             graph = self.dataset.graph(identifier)
-            graph.remove((None, None, None))
-
-            # Reload from file
-            graph.parse(path, format="turtle")
+            with muted(self.dataset.store):
+                graph.remove((None, None, None))
+                graph.parse(path, format="turtle")
+            self.touch(identifier)
 
     def graph(self, identifier: S) -> Graph:
         assert isinstance(identifier, URIRef)
@@ -748,6 +1057,13 @@ class Repository:
             )
         ]
 
+    def builtin_graphs(self) -> list[URIRef]:
+        """The graphs that come with the code, like vocabularies."""
+        return [
+            URIRef(str(s))
+            for s in self.metadata.subjects(FROTH.isBuiltin, Literal(True))
+        ]
+
     def add(self, triple: tuple[URIRef, URIRef, URIRef | Literal]) -> None:
         """Add a triple to the current graph."""
         graph = context.buffer.get()
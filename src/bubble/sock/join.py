@@ -1,8 +1,12 @@
 import base64
 
-from typing import Tuple, AsyncGenerator
+from typing import Tuple, Optional, AsyncGenerator
 from datetime import UTC, datetime
-from contextlib import asynccontextmanager
+from contextlib import (
+    AbstractAsyncContextManager,
+    nullcontext,
+    asynccontextmanager,
+)
 
 import trio
 import httpx
@@ -14,25 +18,45 @@ from httpx_ws import aconnect_ws
 from cryptography.hazmat.primitives.asymmetric import ed25519
 
 from swash.prfx import NT, PROV
+from bubble.mesh.wire import SUBPROTOCOL, encode_graph, decode_dataset
 
 logger = structlog.get_logger(__name__)
 
 
+def offer(binary: bool) -> Optional[list[str]]:
+    return [SUBPROTOCOL] if binary else None
+
+
+def http_client(
+    client: Optional[httpx.AsyncClient],
+) -> AbstractAsyncContextManager[httpx.AsyncClient]:
+    """The given client, left open, or a fresh one for this connection."""
+    if client is not None:
+        return nullcontext(client)
+    return httpx.AsyncClient(verify=False)
+
+
 @asynccontextmanager
 async def anonymous_connection(
     ws_url: str,
+    binary: bool = False,
+    client: Optional[httpx.AsyncClient] = None,
 ) -> AsyncGenerator[Tuple[WebSocket, URIRef], None]:
     """
     Context manager for establishing an anonymous WebSocket connection to a town.
 
     Args:
         ws_url: The WebSocket URL of the town to connect to.
+        binary: Offer the binary wire format instead of TriG.
+        client: The HTTP client to connect with, if not a new one.
 
     Yields:
         A tuple of (websocket, actor_uri) for the established connection.
     """
-    async with httpx.AsyncClient(verify=False) as client:
-        async with aconnect_ws(f"{ws_url}join", client=client) as ws:
+    async with http_client(client) as client:
+        async with aconnect_ws(
+            f"{ws_url}join", client=client, subprotocols=offer(binary)
+        ) as ws:
             # Receive the handshake with our temporary identity
             handshake_msg = await ws.receive_text()
             handshake = Graph()
@@ -67,6 +91,8 @@ async def signed_connection(
     ws_url: str,
     private_key: ed25519.Ed25519PrivateKey,
     public_key: ed25519.Ed25519PublicKey,
+    binary: bool = False,
+    client: Optional[httpx.AsyncClient] = None,
 ) -> AsyncGenerator[Tuple[WebSocket, URIRef], None]:
     """
     Context manager for establishing a signed WebSocket connection to a town.
@@ -75,6 +101,8 @@ async def signed_connection(
         ws_url: The WebSocket URL of the town to connect to.
         private_key: The Ed25519 private key for signing.
         public_key: The corresponding public key.
+        binary: Offer the binary wire format instead of TriG.
+        client: The HTTP client to connect with, if not a new one.
 
     Yields:
         A tuple of (websocket, actor_uri) for the established connection.
@@ -84,8 +112,10 @@ async def signed_connection(
     join_url = f"{ws_url}join/{public_key_hex}"
     logger.info("Connecting to town with identity", url=join_url)
 
-    async with httpx.AsyncClient(verify=False) as client:
-        async with aconnect_ws(join_url, client=client) as ws:
+    async with http_client(client) as client:
+        async with aconnect_ws(
+            join_url, client=client, subprotocols=offer(binary)
+        ) as ws:
             # Receive the initial handshake message
             handshake_msg = await ws.receive_text()
             handshake = Graph()
@@ -130,10 +160,13 @@ async def signed_connection(
 async def messages(ws: WebSocket) -> AsyncGenerator[Dataset, None]:
     """Continuously receive and process messages from the WebSocket."""
     while True:
-        message = await ws.receive_text()
-        msg = Dataset()
-        msg.parse(data=message, format="trig")
-        yield msg
+        if ws.subprotocol == SUBPROTOCOL:
+            yield decode_dataset(await ws.receive_bytes())
+        else:
+            message = await ws.receive_text()
+            msg = Dataset()
+            msg.parse(data=message, format="trig")
+            yield msg
 
 
 async def heartbeat(ws: WebSocket) -> None:
@@ -142,7 +175,10 @@ async def heartbeat(ws: WebSocket) -> None:
         while True:
             await trio.sleep(5)
             heartbeat = create_heartbeat_graph()
-            await ws.send_text(heartbeat.serialize(format="trig"))
+            if ws.subprotocol == SUBPROTOCOL:
+                await ws.send_bytes(encode_graph(heartbeat))
+            else:
+                await ws.send_text(heartbeat.serialize(format="trig"))
             logger.info("Sent heartbeat")
     except Exception as e:
         logger.error("Heartbeat error", error=e)
@@ -1,5 +1,6 @@
 import base64
 
+from typing import Optional
 from datetime import UTC, datetime
 
 import structlog
@@ -16,11 +17,19 @@ from swash.prfx import NT
 from swash.util import S, add, new
 from bubble.keys import verify_signed_data
 from bubble.mesh.base import Vat, ActorContext, with_transient_graph
+from bubble.mesh.wire import SUBPROTOCOL, encode_graph, decode_dataset
 from bubble.repo.repo import context
 
 logger = structlog.get_logger(__name__)
 
 
+def negotiate_subprotocol(websocket: WebSocket) -> Optional[str]:
+    """Speak the binary wire format if the peer offers it, else TriG."""
+    if SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        return SUBPROTOCOL
+    return None
+
+
 async def handle_anonymous_join(websocket: WebSocket, vat: Vat):
     """
     Handle an anonymous/transient actor joining a town via WebSocket.
@@ -37,7 +46,7 @@ async def handle_anonymous_join(websocket: WebSocket, vat: Vat):
         websocket: The WebSocket connection object
         vat: The Vat instance managing the town and its actors
     """
-    await websocket.accept()
+    await websocket.accept(subprotocol=negotiate_subprotocol(websocket))
 
     try:
         # Generate a temporary identity for this anonymous actor
@@ -137,7 +146,7 @@ async def handle_actor_join(
         key: The Ed25519 public key object of the remote actor.
         vat: The Vat instance managing the town and its actors.
     """
-    await websocket.accept()
+    await websocket.accept(subprotocol=negotiate_subprotocol(websocket))
 
     try:
         # Perform the handshake and verify the actor's signature
@@ -346,14 +355,17 @@ async def _run_message_forwarders(websocket, remote_actor_uri, proc, recv):
         proc: The process URI associated with this session.
         recv: The receive channel for messages destined for the remote actor.
     """
+    binary = negotiate_subprotocol(websocket) == SUBPROTOCOL
 
     async def forward_messages_to_remote_actor():
         """
         Forward messages from the town (received on `recv` channel) to the remote actor via WebSocket.
         """
         async for message in recv:
-            msg_trig = message.serialize(format="trig")
-            await websocket.send_text(msg_trig)
+            if binary:
+                await websocket.send_bytes(encode_graph(message))
+            else:
+                await websocket.send_text(message.serialize(format="trig"))
 
     async def forward_messages_to_town():
         """
@@ -376,9 +388,12 @@ async def _run_message_forwarders(websocket, remote_actor_uri, proc, recv):
         """
         Receive a dataset from the WebSocket.
         """
-        data = await websocket.receive_text()
         msg = Dataset(default_union=True)
-        msg.parse(data=data, format="trig")
+        if binary:
+            decode_dataset(await websocket.receive_bytes(), msg)
+        else:
+            data = await websocket.receive_text()
+            msg.parse(data=data, format="trig")
         return msg
 
     async def acknowledge_heartbeat(msg: Dataset, heartbeat: S):
@@ -405,13 +420,18 @@ async def _run_message_forwarders(websocket, remote_actor_uri, proc, recv):
         await send_dataset(msg)
 
     async def send_dataset(msg: Dataset):
-        await websocket.send_text(msg.serialize(format="trig"))
+        if binary:
+            await websocket.send_bytes(encode_graph(msg))
+        else:
+            await websocket.send_text(msg.serialize(format="trig"))
 
     # Run both forwarding coroutines concurrently
     try:
         async with open_nursery() as nursery:
             nursery.start_soon(forward_messages_to_remote_actor)
-            nursery.start_soon(forward_messages_to_town)
+            await forward_messages_to_town()
+            # The peer has gone, so nothing more can be forwarded to it.
+            nursery.cancel_scope.cancel()
     except Exception as e:
         logger.error("websocket handler error (forwarders)", error=e)
         raise
@@ -1,3 +1,5 @@
+from typing import Self
+
 from rdflib import PROV, URIRef, Literal
 
 from swash.prfx import AS, NT
@@ -16,11 +18,24 @@ from bubble.repo.repo import context, timestamp
 
 
 class DiscussionParticipant(DispatchingActor):
+    idle_timeout = 15 * 60
+
     def __init__(self, name: str, chat: URIRef):
         super().__init__()
         self.name = name
         self.chat = chat
 
+    async def hibernate(self):
+        add(this(), {NT.name: Literal(self.name), NT.timeline: self.chat})
+        await super().hibernate()
+
+    @classmethod
+    def rehydrate(cls, actor: URIRef) -> Self:
+        name = get_single_object(actor, NT.name)
+        chat = get_single_object(actor, NT.timeline)
+        assert isinstance(chat, URIRef)
+        return cls(str(name), chat)
+
     async def setup(self, actor_uri: URIRef):
         """Initialize by creating a DiscussionParticipation with message prompt."""
         new(
@@ -18,6 +18,11 @@ from bubble.apis.replicate import make_image
 
 
 class ImageGenerator(DispatchingActor):
+    # Generations spend their time waiting on Replicate, so let a few
+    # of them run side by side.
+    max_concurrency = 4
+    idle_timeout = 15 * 60
+
     async def setup(self, actor_uri: URIRef):
         new(
             NT.ImageGenerator,
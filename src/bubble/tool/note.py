@@ -13,6 +13,9 @@ from bubble.repo.repo import context, timestamp
 
 
 class NoteEditor(DispatchingActor):
+    # Notes are written in bursts and then left alone for weeks.
+    idle_timeout = 15 * 60
+
     async def setup(self, actor_uri: URIRef):
         """Initialize by creating a TextEditor affordance."""
         new(
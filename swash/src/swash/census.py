@@ -0,0 +1,235 @@
+"""Running counts of what each graph in a dataset holds.
+
+Asking a graph how many subjects it has, or how many things of each
+type, means reading every triple in it, and an overview of a bubble
+asks that of every graph at once. A `Census` instead keeps a `Tally`
+per graph that follows the store's events, a triple at a time, so the
+answer is always at hand.
+
+An add event may be for a triple the graph already holds, so the
+census looks before it counts; stores dispatch adds before they make
+them, which is what lets it. Writes the store does not announce, such
+as those under `muted`, must be followed by a `touch` of the graph
+they went to, which counts it again from scratch.
+
+A graph's change time is when the census last heard it written. A
+recount is not a change, so `touch` keeps the time it had unless told
+otherwise, and a graph loaded from somewhere can be `dated` by it.
+
+Counting distinct subjects means keeping every one of them, with how
+many triples it has, which is fine for a store that holds them all in
+memory anyway. A store that keeps counts of its own, as the SQLite
+index does, is asked instead: the census then keeps only the change
+times and each graph's number of subjects as last read off the
+store's index, reads nothing at startup, and looks nothing up on
+write.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Optional,
+    Protocol,
+    NamedTuple,
+    runtime_checkable,
+)
+from datetime import datetime, timezone
+from collections import Counter
+
+from rdflib import RDF, Graph, Dataset
+from rdflib.term import Node
+from rdflib.graph import QuotedGraph, _TripleType
+from rdflib.store import TripleAddedEvent, TripleRemovedEvent
+
+from swash.util import TriplesAddedEvent
+
+
+def now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class GraphStats(NamedTuple):
+    """What the census knows of one graph at one moment."""
+
+    triples: int
+    subjects: int
+    types: dict[Node, int]
+    modified: Optional[datetime]
+
+
+class Tally:
+    """The counts for one graph, kept up as its triples come and go."""
+
+    def __init__(self, triples: Iterable[_TripleType] = ()):
+        self.triples = 0
+        # Triples per subject, so we know when the last one goes.
+        self.subjects: Counter[Node] = Counter()
+        self.types: Counter[Node] = Counter()
+        for triple in triples:
+            self.add(triple)
+
+    def add(self, triple: _TripleType) -> None:
+        s, p, o = triple
+        self.triples += 1
+        self.subjects[s] += 1
+        if p == RDF.type:
+            self.types[o] += 1
+
+    def remove(self, triple: _TripleType) -> None:
+        s, p, o = triple
+        self.triples -= 1
+        drop(self.subjects, s)
+        if p == RDF.type:
+            drop(self.types, o)
+
+    def stats(self, modified: Optional[datetime] = None) -> GraphStats:
+        return GraphStats(
+            triples=self.triples,
+            subjects=len(self.subjects),
+            types=dict(self.types),
+            modified=modified,
+        )
+
+
+@runtime_checkable
+class CountingStore(Protocol):
+    """A store that keeps its own per-graph counts, like `SQLiteStore`."""
+
+    def graph_counts(self) -> dict[Node, tuple[int, dict[Node, int]]]: ...
+
+    def subject_count(self, identifier: Node) -> int: ...
+
+
+def holds(graph: Graph, triple: _TripleType) -> bool:
+    # Cheaper than `triple in graph` for a triple the store lacks,
+    # which is most of them.
+    return any(
+        context.identifier == graph.identifier
+        for context in graph.store.contexts(triple)
+    )
+
+
+def drop(counter: Counter[Node], key: Node) -> None:
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+class Census:
+    """Per-graph statistics for one dataset, maintained on write."""
+
+    def __init__(
+        self, dataset: Dataset, clock: Callable[[], datetime] = now
+    ):
+        self.dataset = dataset
+        self.clock = clock
+        self.tallies: dict[Node, Tally] = {}
+        self.modified: dict[Node, datetime] = {}
+        store = dataset.store
+        self.index = store if isinstance(store, CountingStore) else None
+        #: Subjects per graph as last read off the index, while valid.
+        self.subjects: dict[Node, int] = {}
+        if self.index is None:
+            # Whatever the store held before we started listening.
+            for graph in dataset.graphs():
+                self.tallies[graph.identifier] = Tally(
+                    graph.triples((None, None, None))
+                )
+        dispatcher = store.dispatcher
+        dispatcher.subscribe(TripleAddedEvent, self.on_triple_added)
+        dispatcher.subscribe(TripleRemovedEvent, self.on_triple_removed)
+        dispatcher.subscribe(TriplesAddedEvent, self.on_triples_added)
+
+    def changed(self, graph: Any) -> None:
+        identifier = getattr(graph, "identifier", None)
+        self.modified[identifier] = self.clock()
+        self.subjects.pop(identifier, None)
+
+    def tally(self, graph: Any) -> Tally:
+        identifier = getattr(graph, "identifier", None)
+        tally = self.tallies.get(identifier)
+        if tally is None:
+            tally = self.tallies[identifier] = Tally()
+        self.changed(graph)
+        return tally
+
+    def on_triple_added(self, event: Any) -> None:
+        if self.index is not None:
+            self.changed(event.context)
+        elif not holds(event.context, event.triple):
+            self.tally(event.context).add(event.triple)
+
+    def on_triple_removed(self, event: Any) -> None:
+        if self.index is not None:
+            self.changed(event.context)
+        else:
+            self.tally(event.context).remove(event.triple)
+
+    def on_triples_added(self, event: Any) -> None:
+        graph = event.context
+        if self.index is not None:
+            self.changed(graph)
+            return
+        fresh = list(dict.fromkeys(event.triples))
+        # A graph with nothing in it holds none of them, which spares
+        # a lookup per triple when a batch fills a new graph.
+        counted = self.tallies.get(getattr(graph, "identifier", None))
+        if counted is not None and counted.triples:
+            fresh = [t for t in fresh if not holds(graph, t)]
+        if fresh:
+            tally = self.tally(graph)
+            for triple in fresh:
+                tally.add(triple)
+
+    def touch(
+        self, identifier: Node, modified: Optional[datetime] = None
+    ) -> None:
+        """Count a graph again after writes nobody heard."""
+        if self.index is not None:
+            # The index counted them as they went in, all but subjects.
+            self.subjects.pop(identifier, None)
+        else:
+            graph = Graph(store=self.dataset.store, identifier=identifier)
+            self.tallies[identifier] = Tally(
+                graph.triples((None, None, None))
+            )
+        if modified is not None:
+            self.modified[identifier] = modified
+
+    def dated(self, identifier: Node, modified: datetime) -> None:
+        """Note when a graph was last changed, as far as we know."""
+        self.modified[identifier] = modified
+
+    def stats(self) -> dict[Node, GraphStats]:
+        """The statistics of every graph in the dataset right now.
+
+        This reads nothing but the counts, so it takes time in
+        proportion to the number of graphs, not the triples in them;
+        only a graph changed since the last call has its subjects
+        counted again, off the store's index.
+        """
+        counts = {} if self.index is None else self.index.graph_counts()
+        result = {}
+        for graph in self.dataset.graphs():
+            if isinstance(graph, QuotedGraph):
+                continue
+            identifier = graph.identifier
+            modified = self.modified.get(identifier)
+            if self.index is None:
+                tally = self.tallies.get(identifier) or Tally()
+                result[identifier] = tally.stats(modified)
+                continue
+            triples, types = counts.get(identifier, (0, {}))
+            subjects = self.subjects.get(identifier)
+            if subjects is None:
+                subjects = self.subjects[identifier] = (
+                    self.index.subject_count(identifier)
+                )
+            result[identifier] = GraphStats(
+                triples=triples,
+                subjects=subjects,
+                types=types,
+                modified=modified,
+            )
+        return result
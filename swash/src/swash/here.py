@@ -47,6 +47,8 @@ class Parameter(Generic[T]):
 
 graph: Parameter[Graph] = Parameter("graph", Graph())
 dataset: Parameter[Dataset] = Parameter("dataset", None)
+#: The named graphs a request reads from the dataset; none means all.
+graphs: Parameter[frozenset[URIRef]] = Parameter("graphs", frozenset())
 site: Parameter[Namespace] = Parameter("site")
 
 
@@ -1,12 +1,13 @@
+from typing import Optional
+
 import structlog
 
-from rdflib import URIRef, Literal, IdentifiedNode
-from rdflib.collection import Collection
+from rdflib import RDF, BNode, Graph, Literal, IdentifiedNode
 
 from swash import here
 from swash.mint import fresh_uri
 from swash.prfx import SWA, JSON
-from swash.util import O, S, new, is_a, select_rows
+from swash.util import O, S, add_triples
 
 # import importhook
 
@@ -27,67 +28,88 @@ finally:
     pass
 
 
-def json_from_rdf(
-    node: O,
-) -> dict | list | str | bool | int | float | None:
+Value = dict | list | str | bool | int | float | None
+
+
+def json_from_rdf(node: O, graph: Optional[Graph] = None) -> Value:
+    """Read a JSON value back out of its RDF form in a graph.
+
+    Walks the triples under the node directly, a few index lookups per
+    property, rather than asking SPARQL about every object on the way.
+    The graph is the current one unless given.
+    """
     if node == JSON.null:
         return None
 
     if isinstance(node, Literal):
         return node.toPython()
 
-    if is_a(node, JSON.Array):
-        assert isinstance(node, IdentifiedNode)
-        list = Collection(here.graph.get(), node)
-        return [json_from_rdf(item) for item in list]
-    if is_a(node, JSON.Object):
-        return {
-            row.key.toPython(): json_from_rdf(row.value)
-            for row in select_rows(
-                """
-            SELECT ?key ?value WHERE {
-                ?node json:has ?prop .
-                ?prop json:key ?key .
-                ?prop json:val ?value .
-            }
-            """,
-                {"node": node},
+    if not isinstance(node, IdentifiedNode):
+        raise ValueError(f"Unexpected subject type: {node}")
+
+    graph = graph if graph is not None else here.graph.get()
+    types = set(graph.objects(node, RDF.type))
+    if JSON.Array in types:
+        return [json_from_rdf(item, graph) for item in graph.items(node)]
+    if JSON.Object in types:
+        result = {}
+        for prop in graph.objects(node, JSON.has):
+            key = graph.value(prop, JSON.key)
+            assert isinstance(key, Literal)
+            result[key.toPython()] = json_from_rdf(
+                graph.value(prop, JSON.val), graph
             )
-        }
+        return result
+    return None
 
 
-def rdf_from_json(
-    value: dict | None | str | bool | int | float | list,
-) -> S:
+def rdf_from_json(value: Value) -> S:
     """Convert a Python dictionary to an RDF JSON object representation.
 
+    All the triples are gathered first and added to the current graph
+    in one batch, which is heard as a single event.
+
     Args:
         value: The Python dictionary to convert
 
     Returns:
         A blank node representing the root of the JSON object in RDF
     """
+    graph = here.graph.get()
+    triples: list = []
+    root = encode(value, graph, triples)
+    add_triples(graph, triples)
+    return root  # type: ignore
 
+
+def encode(value: Value, graph: Graph, triples: list) -> O:
     if value is None:
         return JSON.null
     elif isinstance(value, dict):
-        props = []
+        node = fresh_uri(graph)
+        triples.append((node, RDF.type, JSON.Object))
         for key, val in value.items():
-            prop = new(
-                JSON.Property,
-                {JSON.key: key, JSON.val: rdf_from_json(val)},
-            )
-            props.append(prop)
-
-        return new(JSON.Object, {JSON.has: props})
+            prop = fresh_uri(graph)
+            triples += [
+                (prop, RDF.type, JSON.Property),
+                (prop, JSON.key, Literal(key)),
+                (prop, JSON.val, encode(val, graph, triples)),
+                (node, JSON.has, prop),
+            ]
+        return node
     elif isinstance(value, list):
-        items = []
-        for item in value:
-            items.append(rdf_from_json(item))
-
-        collection = Collection(here.graph.get(), fresh_uri(SWA), items)
-        assert isinstance(collection.uri, URIRef)
-
-        return new(JSON.Array, {}, subject=collection.uri)
+        node = fresh_uri(SWA)
+        triples.append((node, RDF.type, JSON.Array))
+        # An RDF list, as `Collection` would make it.
+        cell: IdentifiedNode = node
+        for i, item in enumerate(value):
+            if i:
+                rest = BNode()
+                triples.append((cell, RDF.rest, rest))
+                cell = rest
+            triples.append((cell, RDF.first, encode(item, graph, triples)))
+        if value:
+            triples.append((cell, RDF.rest, RDF.nil))
+        return node
     else:
         return Literal(value)
@@ -36,7 +36,7 @@ from swash.html import (
     classes,
 )
 from swash.prfx import NT, Schema
-from swash.util import P, S
+from swash.util import P, S, scoped
 
 router = APIRouter(prefix="/rdf", default_response_class=HypermediaResponse)
 
@@ -65,9 +65,10 @@ def autoexpanding(depth: int):
 def get_label(dataset: Dataset, uri: URIRef) -> Optional[S]:
     # Get all labels with their languages
     labels = []
+    graph = scoped(dataset)
 
     # First try SKOS prefLabel
-    for s, p, o, c in dataset.quads((uri, SKOS.prefLabel, None, None)):
+    for o in graph.objects(uri, SKOS.prefLabel):
         if isinstance(o, Literal):
             labels.append(
                 (o, o.language or "", 1)
@@ -77,7 +78,7 @@ def get_label(dataset: Dataset, uri: URIRef) -> Optional[S]:
 
     # Fall back to RDFS label if no prefLabel found
     if not labels:
-        for s, p, o, c in dataset.quads((uri, RDFS.label, None, None)):
+        for o in graph.objects(uri, RDFS.label):
             if isinstance(o, Literal):
                 labels.append(
                     (o, o.language or "", 2)
@@ -110,7 +111,7 @@ def get_subject_data(
     data = {"type": None, "predicates": []}
     graph = context or dataset or here.graph.get()
     assert isinstance(graph, Graph)
-    for predicate, obj in graph.predicate_objects(subject):
+    for predicate, obj in scoped(graph).predicate_objects(subject):
         if predicate == RDF.type:
             data["type"] = obj
         else:
@@ -139,7 +140,9 @@ def has_doxxing_risk(predicate: Optional[P]) -> bool:
     if predicate is None:
         return False
     return any(
-        here.dataset.get().triples((predicate, NT.hasRisk, NT.DoxxingRisk))
+        scoped(here.dataset.get()).triples(
+            (predicate, NT.hasRisk, NT.DoxxingRisk)
+        )
     )
 
 
@@ -183,7 +186,7 @@ frameless = here.Parameter("frameless", default=False)
 
 @html.dd("flex flex-col")
 def render_subresource(subject: S, predicate: Optional[P] = None) -> None:
-    dataset = here.dataset.get()
+    dataset = scoped(here.dataset.get())
     if isinstance(subject, BNode):
         if any(dataset.triples((subject, RDF.first, None))):
             render_list(dataset.collection(subject), predicate)
@@ -417,7 +420,7 @@ def render_affordance_resource(subject: S, data: Dict) -> None:
     render_resource_header(subject, data)
 
     # Get affordances from the graph
-    dataset = here.dataset.get()
+    dataset = scoped(here.dataset.get())
     affordances = list(dataset.objects(subject, NT.affordance))
 
     if affordances:
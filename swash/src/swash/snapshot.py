@@ -0,0 +1,211 @@
+"""Read-only snapshots of a dataset, for readers in other threads.
+
+A render or a SPARQL query can take a while, and a store that is being
+written meanwhile shows it half-applied writes, or breaks outright if
+the reader is in another thread. A snapshot is a frozen copy of every
+graph in a dataset, taken in one go on the thread that does the
+writing, and then safe to read anywhere for as long as anyone likes.
+
+Copying everything for every reader would be slow, so a snapshot
+copies only the graphs its reader asked for, and `Snapshots` keeps a
+version per graph, bumped whenever the store says a triple was added
+or removed there. A copy whose version has not moved is shared by
+every snapshot taken meanwhile, which is safe because nobody writes to
+it, and is let go with the last snapshot that holds it, so that no
+copy of the dataset outlives its readers.
+
+Writes the store does not announce, such as those under `muted`, must
+be followed by a `touch` of the graph they went to.
+"""
+
+from typing import Any, Iterator, Optional, Generator
+from weakref import WeakValueDictionary
+from collections import defaultdict
+
+from rdflib import Graph, Dataset
+from rdflib.term import Node, URIRef
+from rdflib.graph import _TripleType, _ContextType, _TriplePatternType
+from rdflib.store import (
+    Store,
+    TripleAddedEvent,
+    TripleRemovedEvent,
+)
+
+from swash.util import TriplesAddedEvent
+from swash.store import Bindings
+
+
+class Frozen:
+    """The triples of one graph as they were, indexed by each term."""
+
+    def __init__(self, triples: Iterator[_TripleType], version: int = 0):
+        self.version = version
+        self.triples = frozenset(triples)
+        self.spo: defaultdict[Node, list[_TripleType]] = defaultdict(list)
+        self.pos: defaultdict[Node, list[_TripleType]] = defaultdict(list)
+        self.osp: defaultdict[Node, list[_TripleType]] = defaultdict(list)
+        for triple in self.triples:
+            s, p, o = triple
+            self.spo[s].append(triple)
+            self.pos[p].append(triple)
+            self.osp[o].append(triple)
+
+    def matching(
+        self, pattern: _TriplePatternType
+    ) -> Iterator[_TripleType]:
+        s, p, o = pattern
+        if s is not None and p is not None and o is not None:
+            if pattern in self.triples:
+                yield pattern  # type: ignore
+            return
+        candidates = None
+        for term, index in ((s, self.spo), (p, self.pos), (o, self.osp)):
+            if term is not None:
+                rows = index.get(term, ())
+                if candidates is None or len(rows) < len(candidates):
+                    candidates = rows
+        if candidates is None:
+            yield from self.triples
+            return
+        for triple in candidates:
+            if (
+                (s is None or triple[0] == s)
+                and (p is None or triple[1] == p)
+                and (o is None or triple[2] == o)
+            ):
+                yield triple
+
+
+class SnapshotStore(Bindings, Store):
+    """A read-only rdflib store over frozen graphs."""
+
+    context_aware = True
+    formula_aware = False
+    graph_aware = True
+    transaction_aware = False
+
+    def __init__(
+        self,
+        frozen: dict[Node, Frozen],
+        namespaces: dict[str, URIRef],
+    ):
+        super().__init__()
+        self.frozen = frozen
+        self.graphs = {
+            identifier: Graph(store=self, identifier=identifier)
+            for identifier in frozen
+        }
+        self.namespace_of = dict(namespaces)
+        self.prefix_of = {uri: prefix for prefix, uri in namespaces.items()}
+
+    def holding(self, triple: _TripleType) -> Iterator[Graph]:
+        for identifier, frozen in self.frozen.items():
+            if triple in frozen.triples:
+                yield self.graphs[identifier]
+
+    def triples(
+        self,
+        triple_pattern: _TriplePatternType,
+        context: Optional[_ContextType] = None,
+    ) -> Iterator[tuple[_TripleType, Iterator[_ContextType]]]:
+        if context is not None:
+            frozen = self.frozen.get(context.identifier)
+            if frozen is None:
+                return
+            for triple in frozen.matching(triple_pattern):
+                yield triple, iter((context,))
+            return
+        seen: set[_TripleType] = set()
+        for frozen in self.frozen.values():
+            for triple in frozen.matching(triple_pattern):
+                if len(self.frozen) > 1:
+                    if triple in seen:
+                        continue
+                    seen.add(triple)
+                yield triple, self.holding(triple)
+
+    def __len__(self, context: Optional[_ContextType] = None) -> int:
+        if context is not None:
+            frozen = self.frozen.get(context.identifier)
+            return 0 if frozen is None else len(frozen.triples)
+        return len(
+            frozenset().union(
+                *(frozen.triples for frozen in self.frozen.values())
+            )
+        )
+
+    def contexts(
+        self, triple: Optional[_TripleType] = None
+    ) -> Generator[_ContextType, None, None]:
+        if triple is None or triple == (None, None, None):
+            yield from self.graphs.values()
+        else:
+            yield from self.holding(triple)
+
+    def add_graph(self, graph: Graph) -> None:
+        # Datasets add their default graph, and any graph asked for by
+        # name, as a matter of course; one the snapshot did not see
+        # is just empty.
+        pass
+
+    def add(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("A snapshot is read-only")
+
+    def remove(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("A snapshot is read-only")
+
+    def remove_graph(self, graph: Graph) -> None:
+        raise TypeError("A snapshot is read-only")
+
+    def bind(
+        self, prefix: str, namespace: URIRef, override: bool = True
+    ) -> None:
+        # Graphs bind their namespaces as they are made, so this
+        # cannot refuse, but there is nothing to bind them to.
+        pass
+
+
+class Snapshots:
+    """Snapshots of one dataset, sharing what has not changed."""
+
+    def __init__(self, dataset: Dataset):
+        self.dataset = dataset
+        self.versions: defaultdict[Node, int] = defaultdict(int)
+        self.frozen: WeakValueDictionary[Node, Frozen] = (
+            WeakValueDictionary()
+        )
+        dispatcher = dataset.store.dispatcher
+        dispatcher.subscribe(TripleAddedEvent, self.on_change)
+        dispatcher.subscribe(TripleRemovedEvent, self.on_change)
+        dispatcher.subscribe(TriplesAddedEvent, self.on_change)
+
+    def on_change(self, event: Any) -> None:
+        self.touch(getattr(event.context, "identifier", None))
+
+    def touch(self, identifier: Optional[Node]) -> None:
+        """Note that a graph has changed since its last snapshot."""
+        self.versions[identifier] += 1
+
+    def take(self, graphs: frozenset[Node] = frozenset()) -> Dataset:
+        """A read-only dataset as the live one is right now.
+
+        Only the named graphs are copied, or all of them if none are
+        named. Call this where the writes happen; the result may then
+        be read from any thread.
+        """
+        frozen: dict[Node, Frozen] = {}
+        for graph in self.dataset.graphs():
+            identifier = graph.identifier
+            if graphs and identifier not in graphs:
+                continue
+            version = self.versions[identifier]
+            copy = self.frozen.get(identifier)
+            if copy is None or copy.version != version:
+                copy = self.frozen[identifier] = Frozen(
+                    graph.triples((None, None, None)), version
+                )
+            frozen[identifier] = copy
+        namespaces = dict(self.dataset.namespaces())
+        return Dataset(
+            store=SnapshotStore(frozen, namespaces), default_union=True
+        )
@@ -0,0 +1,592 @@
+"""A quad store in a SQLite file, for bubbles bigger than memory.
+
+Terms live once in a `terms` table and quads refer to them by id, in a
+`quads` table with one index per access path: by subject, predicate
+and object, by predicate and object, by object and subject, and by
+graph. Only a bounded cache of terms and SQLite's own page cache stay
+in memory, so a dataset of any size can be opened and queried.
+
+The file is an index, not the record. A repository keeps writing its
+TriG files as before; the store remembers a digest of each graph file
+as it was last loaded or saved, so that on the next start only the
+files that changed need parsing again.
+
+Writes go into one long transaction that is committed every so many
+writes and whenever `commit` is called, so losing the process loses at
+most the writes since then, which the TriG files still have. A commit
+takes every graph's writes along, saved to its file or not, so the
+first write to a graph forgets its digest in the same transaction: a
+graph that holds anything its file does not is parsed again on the
+next start.
+
+The index also counts what each graph holds: a trigger on the quads
+table keeps its number of triples, and of things of each type, in the
+same transaction as the write, so that a census need not read a single
+triple to know them.
+
+A reader in another thread gets a `reader`: a read-only store on a
+connection of its own, inside a transaction that sees the database as
+it was when the reader was made, however the writer carries on.
+"""
+
+import sqlite3
+
+from os import PathLike
+from typing import Any, Iterator, Optional, Generator
+from pathlib import Path
+
+from rdflib import RDF, Graph
+from rdflib.term import Node, BNode, URIRef, Literal
+from rdflib.graph import (
+    _QuadType,
+    _TripleType,
+    _ContextType,
+    _TriplePatternType,
+)
+from rdflib.store import VALID_STORE, Store, TripleRemovedEvent
+
+from swash.store import Bindings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT NOT NULL,
+    lang TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS terms_by_value
+    ON terms (value, kind, datatype, lang);
+CREATE TABLE IF NOT EXISTS quads (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    g INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o, g)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS quads_pos ON quads (p, o, s);
+CREATE INDEX IF NOT EXISTS quads_osp ON quads (o, s, p);
+CREATE INDEX IF NOT EXISTS quads_gspo ON quads (g, s, p, o);
+CREATE TABLE IF NOT EXISTS graphs (id INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS digests (
+    graph TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+"""
+
+#: Counts kept by triggers, and how to fill them for quads already in.
+COUNTS = """
+CREATE TABLE counts (
+    g INTEGER PRIMARY KEY,
+    triples INTEGER NOT NULL
+);
+CREATE TABLE types (
+    g INTEGER NOT NULL,
+    type INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (g, type)
+) WITHOUT ROWID;
+CREATE TRIGGER count_added AFTER INSERT ON quads BEGIN
+    INSERT INTO counts (g, triples) VALUES (NEW.g, 1)
+        ON CONFLICT (g) DO UPDATE SET triples = triples + 1;
+END;
+CREATE TRIGGER count_removed AFTER DELETE ON quads BEGIN
+    UPDATE counts SET triples = triples - 1 WHERE g = OLD.g;
+END;
+CREATE TRIGGER type_added AFTER INSERT ON quads
+WHEN NEW.p = (SELECT id FROM terms WHERE value = '{type}'
+    AND kind = 0 AND datatype = '' AND lang = '')
+BEGIN
+    INSERT INTO types (g, type, count) VALUES (NEW.g, NEW.o, 1)
+        ON CONFLICT (g, type) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER type_removed AFTER DELETE ON quads
+WHEN OLD.p = (SELECT id FROM terms WHERE value = '{type}'
+    AND kind = 0 AND datatype = '' AND lang = '')
+BEGIN
+    DELETE FROM types WHERE g = OLD.g AND type = OLD.o AND count <= 1;
+    UPDATE types SET count = count - 1 WHERE g = OLD.g AND type = OLD.o;
+END;
+INSERT INTO counts (g, triples) SELECT g, COUNT(*) FROM quads GROUP BY g;
+INSERT INTO types (g, type, count)
+    SELECT q.g, q.o, COUNT(*) FROM quads q JOIN terms t ON t.id = q.p
+    WHERE t.value = '{type}' AND t.kind = 0
+        AND t.datatype = '' AND t.lang = ''
+    GROUP BY q.g, q.o;
+""".format(type=RDF.type)
+
+URI, BLANK, LITERAL = 0, 1, 2
+
+#: The columns of three joined terms, for queries that decode quads.
+TERM_COLUMNS = ", ".join(
+    f"{t}.kind, {t}.value, {t}.datatype, {t}.lang" for t in "spo"
+)
+
+
+def encode(term: Node) -> tuple[str, int, str, str]:
+    if isinstance(term, Literal):
+        return (
+            str(term),
+            LITERAL,
+            str(term.datatype or ""),
+            term.language or "",
+        )
+    if isinstance(term, BNode):
+        return str(term), BLANK, "", ""
+    if isinstance(term, URIRef):
+        return str(term), URI, "", ""
+    raise TypeError(f"Cannot store {term!r}")
+
+
+def decode(kind: int, value: str, datatype: str, lang: str) -> Node:
+    if kind == URI:
+        return URIRef(value)
+    if kind == BLANK:
+        return BNode(value)
+    return Literal(
+        value,
+        datatype=URIRef(datatype) if datatype else None,
+        lang=lang or None,
+    )
+
+
+class SQLiteStore(Bindings, Store):
+    """A context-aware rdflib store in a SQLite database file."""
+
+    context_aware = True
+    formula_aware = False
+    graph_aware = True
+    transaction_aware = False
+
+    def __init__(
+        self,
+        configuration: Optional[str | PathLike] = None,
+        identifier: Any = None,
+        *,
+        cache_size: int = 100_000,
+        commit_every: int = 10_000,
+        readonly: bool = False,
+    ):
+        self.db: Optional[sqlite3.Connection] = None
+        self.path: Optional[str | PathLike] = None
+        self.readonly = readonly
+        self.cache_size = cache_size
+        self.commit_every = commit_every
+        self.ids: dict[Node, int] = {}
+        self.terms: dict[int, Node] = {}
+        self.known_graphs: set[int] = set()
+        #: Graphs with a digest, which their next write must forget.
+        self.digested: set[str] = set()
+        self.writes = 0
+        #: Iterations under way, which a commit must not cut off.
+        self.readers = 0
+        self.namespace_of: dict[str, URIRef] = {}
+        self.prefix_of: dict[URIRef, str] = {}
+        super().__init__(configuration, identifier)
+
+    def open(
+        self, configuration: str | PathLike, create: bool = True
+    ) -> int:
+        self.path = configuration
+        if self.readonly:
+            self.db = sqlite3.connect(
+                f"{Path(configuration).absolute().as_uri()}?mode=ro",
+                uri=True,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+        else:
+            self.db = sqlite3.connect(
+                configuration, isolation_level=None, check_same_thread=False
+            )
+            self.db.execute("PRAGMA journal_mode = WAL")
+            self.db.execute("PRAGMA synchronous = NORMAL")
+            self.db.executescript(SCHEMA)
+            # An index from before the counts gets them now, once.
+            if not self.db.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'counts'"
+            ).fetchone():
+                self.db.executescript(f"BEGIN; {COUNTS} COMMIT;")
+        self.db.execute("PRAGMA cache_size = -65536")
+        # A reader's view of the database is fixed by its first read.
+        self.db.execute("BEGIN")
+        for prefix, uri in self.db.execute(
+            "SELECT prefix, uri FROM namespaces"
+        ):
+            self.namespace_of[prefix] = URIRef(uri)
+            self.prefix_of[URIRef(uri)] = prefix
+        self.known_graphs = {
+            id for (id,) in self.db.execute("SELECT id FROM graphs")
+        }
+        self.digested = self.digested_graphs()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = True) -> None:
+        if self.db is None:
+            return
+        if commit_pending_transaction:
+            self.db.execute("COMMIT")
+        else:
+            self.db.execute("ROLLBACK")
+        self.db.close()
+        self.db = None
+
+    def reader(self) -> "SQLiteStore":
+        """A read-only store over the database as it is now.
+
+        Our pending writes are committed first, unless an iteration
+        is under way, so that the reader sees them. The reader is safe
+        to use from another thread and should be closed when done.
+        """
+        assert self.path is not None
+        if not self.readers:
+            self.commit()
+        return SQLiteStore(
+            self.path, cache_size=self.cache_size, readonly=True
+        )
+
+    def writing(self) -> None:
+        if self.readonly:
+            raise TypeError("A reader is read-only")
+
+    def commit(self) -> None:
+        assert self.db is not None
+        self.db.execute("COMMIT")
+        self.db.execute("BEGIN")
+        self.writes = 0
+
+    def rollback(self) -> None:
+        assert self.db is not None
+        self.db.execute("ROLLBACK")
+        self.db.execute("BEGIN")
+        self.digested = self.digested_graphs()
+        self.ids.clear()
+        self.terms.clear()
+        self.writes = 0
+
+    def wrote(self, count: int = 1) -> None:
+        self.writes += count
+        if self.writes >= self.commit_every and not self.readers:
+            self.commit()
+
+    def remember(self, id: int, term: Node) -> None:
+        if len(self.ids) >= self.cache_size:
+            self.ids.clear()
+            self.terms.clear()
+        self.ids[term] = id
+        self.terms[id] = term
+
+    def term_id(self, term: Node, create: bool = False) -> Optional[int]:
+        id = self.ids.get(term)
+        if id is not None:
+            return id
+        assert self.db is not None
+        key = encode(term)
+        row = self.db.execute(
+            "SELECT id FROM terms"
+            " WHERE value = ? AND kind = ? AND datatype = ? AND lang = ?",
+            key,
+        ).fetchone()
+        if row is not None:
+            id = row[0]
+        elif create:
+            id = self.db.execute(
+                "INSERT INTO terms (value, kind, datatype, lang)"
+                " VALUES (?, ?, ?, ?)",
+                key,
+            ).lastrowid
+        else:
+            return None
+        self.remember(id, term)  # type: ignore
+        return id
+
+    def term(self, id: int, *columns: Any) -> Node:
+        """The term of an id, decoded from its columns if not cached."""
+        term = self.terms.get(id)
+        if term is None:
+            if not columns:
+                assert self.db is not None
+                columns = self.db.execute(
+                    "SELECT kind, value, datatype, lang FROM terms"
+                    " WHERE id = ?",
+                    (id,),
+                ).fetchone()
+            term = decode(*columns)
+            self.remember(id, term)
+        return term
+
+    def graph_id(self, graph: Graph) -> int:
+        id = self.term_id(graph.identifier, create=True)
+        assert id is not None
+        if id not in self.known_graphs:
+            assert self.db is not None
+            self.db.execute(
+                "INSERT OR IGNORE INTO graphs (id) VALUES (?)", (id,)
+            )
+            self.known_graphs.add(id)
+        return id
+
+    def changed(self, identifier: Node) -> None:
+        """Forget the digest of a graph that no longer matches it."""
+        if self.digested and str(identifier) in self.digested:
+            assert self.db is not None
+            self.db.execute(
+                "DELETE FROM digests WHERE graph = ?", (str(identifier),)
+            )
+            self.digested.discard(str(identifier))
+
+    def graph(self, id: int) -> Graph:
+        return Graph(store=self, identifier=self.term(id))  # type: ignore
+
+    def add(
+        self,
+        triple: _TripleType,
+        context: _ContextType,
+        quoted: bool = False,
+    ) -> None:
+        assert context is not None, "Every triple needs a graph"
+        assert not quoted, "Quoted graphs are not supported"
+        self.writing()
+        Store.add(self, triple, context, quoted)
+        self.changed(context.identifier)
+        s, p, o = (self.term_id(term, create=True) for term in triple)
+        self.db.execute(
+            "INSERT OR IGNORE INTO quads (s, p, o, g) VALUES (?, ?, ?, ?)",
+            (s, p, o, self.graph_id(context)),
+        )
+        self.wrote()
+
+    def addN(self, quads: Iterator[_QuadType]) -> None:  # noqa: N802
+        self.writing()
+        assert self.db is not None
+        rows = []
+        for s, p, o, context in quads:
+            assert context is not None, "Every triple needs a graph"
+            Store.add(self, (s, p, o), context, False)
+            self.changed(context.identifier)
+            rows.append(
+                (
+                    self.term_id(s, create=True),
+                    self.term_id(p, create=True),
+                    self.term_id(o, create=True),
+                    self.graph_id(context),
+                )
+            )
+        self.db.executemany(
+            "INSERT OR IGNORE INTO quads (s, p, o, g) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self.wrote(len(rows))
+
+    def where(
+        self,
+        pattern: _TriplePatternType,
+        context: Optional[_ContextType],
+    ) -> Optional[tuple[str, list[int]]]:
+        """SQL conditions for a pattern, or None if nothing can match."""
+        conditions, args = [], []
+        for column, term in zip("spo", pattern):
+            if term is not None:
+                id = self.term_id(term)
+                if id is None:
+                    return None
+                conditions.append(f"q.{column} = ?")
+                args.append(id)
+        if context is not None:
+            id = self.term_id(context.identifier)
+            if id is None:
+                return None
+            conditions.append("q.g = ?")
+            args.append(id)
+        return " AND ".join(conditions) or "1", args
+
+    def triples(
+        self,
+        triple_pattern: _TriplePatternType,
+        context: Optional[_ContextType] = None,
+    ) -> Iterator[tuple[_TripleType, Iterator[_ContextType]]]:
+        assert self.db is not None
+        where = self.where(triple_pattern, context)
+        if where is None:
+            return
+        conditions, args = where
+        # Across all graphs, each triple is given only once.
+        distinct = "DISTINCT" if context is None else ""
+        cursor = self.db.execute(
+            f"SELECT q.s, q.p, q.o, {TERM_COLUMNS}"
+            f" FROM (SELECT {distinct} q.s, q.p, q.o FROM quads q"
+            f" WHERE {conditions}) q"
+            " JOIN terms s ON s.id = q.s"
+            " JOIN terms p ON p.id = q.p"
+            " JOIN terms o ON o.id = q.o",
+            args,
+        )
+        self.readers += 1
+        try:
+            for row in cursor:
+                s, p, o = row[:3]
+                triple = (
+                    self.term(s, *row[3:7]),
+                    self.term(p, *row[7:11]),
+                    self.term(o, *row[11:15]),
+                )
+                yield triple, self.graphs_holding(s, p, o)  # type: ignore
+        finally:
+            self.readers -= 1
+            cursor.close()
+
+    def graphs_holding(self, s: int, p: int, o: int) -> Iterator[Graph]:
+        assert self.db is not None
+        ids = self.db.execute(
+            "SELECT g FROM quads WHERE s = ? AND p = ? AND o = ?",
+            (s, p, o),
+        ).fetchall()
+        for (id,) in ids:
+            yield self.graph(id)
+
+    def __len__(self, context: Optional[_ContextType] = None) -> int:
+        assert self.db is not None
+        if context is None:
+            query = (
+                "SELECT COUNT(*) FROM (SELECT DISTINCT s, p, o FROM quads)"
+            )
+            return self.db.execute(query).fetchone()[0]
+        id = self.term_id(context.identifier)
+        if id is None:
+            return 0
+        return self.db.execute(
+            "SELECT COUNT(*) FROM quads WHERE g = ?", (id,)
+        ).fetchone()[0]
+
+    def remove(
+        self,
+        triple_pattern: _TriplePatternType,
+        context: Optional[_ContextType] = None,
+    ) -> None:
+        self.writing()
+        assert self.db is not None
+        where = self.where(triple_pattern, context)
+        if where is None:
+            return
+        conditions, args = where
+        # A chunk at a time, so that removing a huge graph stays small.
+        while True:
+            quads = self.db.execute(
+                f"SELECT s, p, o, g FROM quads q WHERE {conditions}"
+                " LIMIT 1000",
+                args,
+            ).fetchall()
+            if not quads:
+                break
+            self.db.executemany(
+                "DELETE FROM quads"
+                " WHERE s = ? AND p = ? AND o = ? AND g = ?",
+                quads,
+            )
+            for s, p, o, g in quads:
+                self.changed(self.term(g))
+                self.dispatcher.dispatch(
+                    TripleRemovedEvent(
+                        triple=(self.term(s), self.term(p), self.term(o)),
+                        context=self.graph(g),
+                    )
+                )
+            self.wrote(len(quads))
+
+    def contexts(
+        self, triple: Optional[_TripleType] = None
+    ) -> Generator[_ContextType, None, None]:
+        assert self.db is not None
+        if triple is None or triple == (None, None, None):
+            ids = [id for (id,) in self.db.execute("SELECT id FROM graphs")]
+            for id in ids:
+                yield self.graph(id)
+            return
+        s, p, o = (self.term_id(term) for term in triple)
+        if None in (s, p, o):
+            return
+        yield from self.graphs_holding(s, p, o)  # type: ignore
+
+    def add_graph(self, graph: Graph) -> None:
+        # Datasets add their default graph as a matter of course, and
+        # a reader has no way to; a graph it lacks is just empty.
+        if not self.readonly:
+            self.graph_id(graph)
+
+    def remove_graph(self, graph: Graph) -> None:
+        self.writing()
+        assert self.db is not None
+        self.remove((None, None, None), graph)
+        id = self.term_id(graph.identifier)
+        if id is not None:
+            self.db.execute("DELETE FROM graphs WHERE id = ?", (id,))
+            self.db.execute("DELETE FROM counts WHERE g = ?", (id,))
+            self.known_graphs.discard(id)
+
+    def bind(
+        self, prefix: str, namespace: URIRef, override: bool = True
+    ) -> None:
+        before = dict(self.namespace_of)
+        super().bind(prefix, namespace, override)
+        if self.namespace_of == before or self.readonly:
+            return
+        assert self.db is not None
+        self.db.execute("DELETE FROM namespaces")
+        self.db.executemany(
+            "INSERT INTO namespaces (prefix, uri) VALUES (?, ?)",
+            [
+                (prefix, str(uri))
+                for prefix, uri in self.namespace_of.items()
+            ],
+        )
+
+    def digested_graphs(self) -> set[str]:
+        assert self.db is not None
+        rows = self.db.execute("SELECT graph FROM digests")
+        return {graph for (graph,) in rows}
+
+    def digest_of(self, identifier: Node) -> Optional[str]:
+        """The digest of a graph's file as last loaded or saved."""
+        assert self.db is not None
+        row = self.db.execute(
+            "SELECT digest FROM digests WHERE graph = ?", (str(identifier),)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def record_digest(self, identifier: Node, digest: str) -> None:
+        """Note that a graph now matches the file with this digest."""
+        assert self.db is not None
+        self.db.execute(
+            "INSERT OR REPLACE INTO digests (graph, digest) VALUES (?, ?)",
+            (str(identifier), digest),
+        )
+        self.digested.add(str(identifier))
+
+    def graph_counts(self) -> dict[Node, tuple[int, dict[Node, int]]]:
+        """Every graph's number of triples, and of things per type."""
+        assert self.db is not None
+        counts: dict[Node, tuple[int, dict[Node, int]]] = {}
+        types: dict[int, dict[Node, int]] = {}
+        for g, type, count in self.db.execute(
+            "SELECT g, type, count FROM types"
+        ).fetchall():
+            types.setdefault(g, {})[self.term(type)] = count
+        for g, triples in self.db.execute(
+            "SELECT g, triples FROM counts"
+        ).fetchall():
+            counts[self.term(g)] = (triples, types.get(g, {}))
+        return counts
+
+    def subject_count(self, identifier: Node) -> int:
+        """How many distinct subjects a graph has, read off its index."""
+        assert self.db is not None
+        id = self.term_id(identifier)
+        if id is None:
+            return 0
+        return self.db.execute(
+            "SELECT COUNT(DISTINCT s) FROM quads WHERE g = ?", (id,)
+        ).fetchone()[0]
@@ -0,0 +1,369 @@
+"""A compact in-memory quad store with interned terms.
+
+rdflib's `Memory` store keeps every triple as tuples of term objects
+in several layers of nested dicts and sets, which adds up to a few
+hundred bytes per triple before counting the terms themselves. This
+store gives each distinct term a small integer id, once, and keeps each
+quad as one row across four parallel arrays of ids. The SPO, POS and
+OSP indexes map a term id to the rows where it is the subject,
+predicate or object, and a fourth index does the same for graphs,
+again as plain arrays of integers.
+
+A lookup scans the shortest index row list that applies, checking the
+other positions as it goes. Removed rows are only marked dead, and
+everything is compacted once the dead outnumber the living. Terms are
+never forgotten, so a store that sees many short-lived terms keeps
+growing a little.
+
+Use it like any other rdflib store::
+
+    Dataset(store=CompactStore(), default_union=True)
+"""
+
+from array import array
+from typing import Any, Iterable, Iterator, Optional, Generator
+
+from rdflib import Graph
+from rdflib.term import Node, URIRef
+from rdflib.util import _coalesce
+from rdflib.graph import _TripleType, _ContextType, _TriplePatternType
+from rdflib.store import Store, TripleRemovedEvent
+from rdflib.plugins.stores.memory import Memory
+
+#: The id of no term at all, in the graph column of a removed row.
+DEAD = 0
+
+#: Compaction waits until there are at least this many dead rows.
+MIN_DEAD = 1024
+
+
+class Bindings:
+    """Namespace bindings that work just as in rdflib's `Memory` store."""
+
+    namespace_of: dict[str, URIRef]
+    prefix_of: dict[URIRef, str]
+
+    def bind(
+        self, prefix: str, namespace: URIRef, override: bool = True
+    ) -> None:
+        bound_namespace = self.namespace_of.get(prefix)
+        bound_prefix = _coalesce(
+            self.prefix_of.get(namespace),
+            self.prefix_of.get(bound_namespace),  # type: ignore
+        )
+        if override:
+            if bound_prefix is not None:
+                del self.namespace_of[bound_prefix]
+            if bound_namespace is not None:
+                del self.prefix_of[bound_namespace]
+            self.prefix_of[namespace] = prefix
+            self.namespace_of[prefix] = namespace
+        else:
+            self.prefix_of[_coalesce(bound_namespace, namespace)] = (  # type: ignore
+                _coalesce(bound_prefix, default=prefix)
+            )
+            self.namespace_of[_coalesce(bound_prefix, prefix)] = (  # type: ignore
+                _coalesce(bound_namespace, default=namespace)
+            )
+
+    def namespace(self, prefix: str) -> Optional[URIRef]:
+        return self.namespace_of.get(prefix)
+
+    def prefix(self, namespace: URIRef) -> Optional[str]:
+        return self.prefix_of.get(namespace)
+
+    def namespaces(self) -> Iterator[tuple[str, URIRef]]:
+        yield from list(self.namespace_of.items())
+
+
+class NoisyMemory(Memory):
+    """rdflib's `Memory` store, which also says what it removes.
+
+    The plain one dispatches an event for every triple added and
+    keeps quiet about removals, so nobody listening can tell that a
+    graph shrank.
+    """
+
+    def remove(
+        self,
+        triple_pattern: _TriplePatternType,
+        context: Optional[_ContextType] = None,
+    ) -> None:
+        removed = [
+            (triple, list(contexts) if context is None else [context])
+            for triple, contexts in self.triples(triple_pattern, context)
+        ]
+        super().remove(triple_pattern, context)
+        for triple, contexts in removed:
+            for graph in contexts:
+                self.dispatcher.dispatch(
+                    TripleRemovedEvent(triple=triple, context=graph)
+                )
+
+
+class CompactStore(Bindings, Store):
+    """A context-aware rdflib store of integer-encoded quads."""
+
+    context_aware = True
+    formula_aware = False
+    graph_aware = True
+    transaction_aware = False
+
+    def __init__(self, configuration: Any = None, identifier: Any = None):
+        super().__init__(configuration, identifier)
+        self.terms: list[Optional[Node]] = [None]
+        self.ids: dict[Node, int] = {}
+        # One row per quad, across four columns of term ids.
+        self.s = array("I")
+        self.p = array("I")
+        self.o = array("I")
+        self.c = array("I")
+        self.spo: dict[int, array] = {}
+        self.pos: dict[int, array] = {}
+        self.osp: dict[int, array] = {}
+        self.cspo: dict[int, array] = {}
+        self.graphs: dict[int, Graph] = {}
+        self.sizes: dict[int, int] = {}
+        self.live = 0
+        self.dead = 0
+        #: Iterations under way, which compaction must wait for.
+        self.readers = 0
+        self.namespace_of: dict[str, URIRef] = {}
+        self.prefix_of: dict[URIRef, str] = {}
+
+    def intern(self, term: Node) -> int:
+        id = self.ids.get(term)
+        if id is None:
+            id = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return id
+
+    def graph_id(self, graph: Graph) -> int:
+        id = self.intern(graph.identifier)
+        if id not in self.graphs:
+            self.graphs[id] = graph
+            self.sizes[id] = 0
+        return id
+
+    def find(self, s: int, p: int, o: int) -> list[int]:
+        """The live rows holding one triple, in whatever graph."""
+        by_s = self.spo.get(s)
+        by_o = self.osp.get(o)
+        if by_s is None or by_o is None:
+            return []
+        subjects, predicates = self.s, self.p
+        objects, contexts = self.o, self.c
+        return [
+            row
+            for row in (by_s if len(by_s) <= len(by_o) else by_o)
+            if subjects[row] == s
+            and predicates[row] == p
+            and objects[row] == o
+            and contexts[row]
+        ]
+
+    def add(
+        self,
+        triple: _TripleType,
+        context: _ContextType,
+        quoted: bool = False,
+    ) -> None:
+        assert context is not None, "Every triple needs a graph"
+        assert not quoted, "Quoted graphs are not supported"
+        Store.add(self, triple, context, quoted)
+        subject, predicate, object = triple
+        s = self.intern(subject)
+        p = self.intern(predicate)
+        o = self.intern(object)
+        c = self.graph_id(context)
+        contexts = self.c
+        for row in self.find(s, p, o):
+            if contexts[row] == c:
+                return
+
+        row = len(contexts)
+        self.s.append(s)
+        self.p.append(p)
+        self.o.append(o)
+        contexts.append(c)
+        for index, key in (
+            (self.spo, s),
+            (self.pos, p),
+            (self.osp, o),
+            (self.cspo, c),
+        ):
+            rows = index.get(key)
+            if rows is None:
+                index[key] = array("I", (row,))
+            else:
+                rows.append(row)
+        self.live += 1
+        self.sizes[c] += 1
+
+    def rows(
+        self,
+        pattern: _TriplePatternType,
+        context: Optional[_ContextType],
+    ) -> tuple[Iterable[int], tuple[int, int, int, int]]:
+        """Candidate rows for a pattern, and the ids it asks for.
+
+        The candidates come from the shortest applicable index, copied
+        so that writes during the iteration do not disturb it; they
+        still need checking against the ids, where 0 means any.
+        """
+        keys = []
+        shortest: Optional[array] = None
+        for term, index in zip(pattern, (self.spo, self.pos, self.osp)):
+            if term is None:
+                keys.append(0)
+                continue
+            key = self.ids.get(term)
+            rows = None if key is None else index.get(key)
+            if rows is None:
+                return (), (0, 0, 0, 0)
+            keys.append(key)
+            if shortest is None or len(rows) < len(shortest):
+                shortest = rows
+        c = 0
+        if context is not None:
+            c = self.ids.get(context.identifier, 0)
+            rows = self.cspo.get(c) if c else None
+            if rows is None:
+                return (), (0, 0, 0, 0)
+            if shortest is None or len(rows) < len(shortest):
+                shortest = rows
+        s, p, o = keys
+        if shortest is None:
+            return range(len(self.c)), (s, p, o, c)
+        return shortest[:], (s, p, o, c)
+
+    def matching(
+        self,
+        pattern: _TriplePatternType,
+        context: Optional[_ContextType],
+    ) -> Iterator[int]:
+        """The live rows matching a pattern, in one graph or all."""
+        candidates, (s, p, o, c) = self.rows(pattern, context)
+        subjects, predicates = self.s, self.p
+        objects, contexts = self.o, self.c
+        for row in candidates:
+            graph = contexts[row]
+            if (
+                graph
+                and (not s or subjects[row] == s)
+                and (not p or predicates[row] == p)
+                and (not o or objects[row] == o)
+                and (not c or graph == c)
+            ):
+                yield row
+
+    def triples(
+        self,
+        triple_pattern: _TriplePatternType,
+        context: Optional[_ContextType] = None,
+    ) -> Iterator[tuple[_TripleType, Iterator[_ContextType]]]:
+        terms = self.terms
+        subjects, predicates, objects = self.s, self.p, self.o
+        # Across all graphs, each triple is given only once, at the
+        # first row that holds it.
+        union = context is None and len(self.graphs) > 1
+        self.readers += 1
+        try:
+            for row in self.matching(triple_pattern, context):
+                s, p, o = subjects[row], predicates[row], objects[row]
+                triple = (terms[s], terms[p], terms[o])
+                if union:
+                    rows = self.find(s, p, o)
+                    if rows[0] != row:
+                        continue
+                    yield triple, self.graphs_of(rows)  # type: ignore
+                else:
+                    graphs = self.graphs_holding(s, p, o)
+                    yield triple, graphs  # type: ignore
+        finally:
+            self.readers -= 1
+
+    def graphs_of(self, rows: list[int]) -> Iterator[Graph]:
+        contexts = self.c
+        return (self.graphs[contexts[row]] for row in rows)
+
+    def graphs_holding(self, s: int, p: int, o: int) -> Iterator[Graph]:
+        yield from self.graphs_of(self.find(s, p, o))
+
+    def __len__(self, context: Optional[_ContextType] = None) -> int:
+        if context is not None:
+            return self.sizes.get(self.ids.get(context.identifier, 0), 0)
+        if len(self.graphs) == 1:
+            return self.live
+        return sum(1 for _ in self.triples((None, None, None)))
+
+    def remove(
+        self,
+        triple_pattern: _TriplePatternType,
+        context: Optional[_ContextType] = None,
+    ) -> None:
+        terms = self.terms
+        subjects, predicates = self.s, self.p
+        objects, contexts = self.o, self.c
+        for row in list(self.matching(triple_pattern, context)):
+            c = contexts[row]
+            contexts[row] = DEAD
+            self.live -= 1
+            self.dead += 1
+            self.sizes[c] -= 1
+            self.dispatcher.dispatch(
+                TripleRemovedEvent(
+                    triple=(
+                        terms[subjects[row]],
+                        terms[predicates[row]],
+                        terms[objects[row]],
+                    ),
+                    context=self.graphs[c],
+                )
+            )
+        if self.dead > max(self.live, MIN_DEAD) and not self.readers:
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop the dead rows and rebuild the indexes."""
+        contexts = self.c
+        alive = [row for row in range(len(contexts)) if contexts[row]]
+        self.s = array("I", (self.s[row] for row in alive))
+        self.p = array("I", (self.p[row] for row in alive))
+        self.o = array("I", (self.o[row] for row in alive))
+        self.c = array("I", (contexts[row] for row in alive))
+        for index, column in (
+            (self.spo, self.s),
+            (self.pos, self.p),
+            (self.osp, self.o),
+            (self.cspo, self.c),
+        ):
+            index.clear()
+            for row, key in enumerate(column):
+                rows = index.get(key)
+                if rows is None:
+                    index[key] = array("I", (row,))
+                else:
+                    rows.append(row)
+        self.dead = 0
+
+    def contexts(
+        self, triple: Optional[_TripleType] = None
+    ) -> Generator[_ContextType, None, None]:
+        if triple is None or triple == (None, None, None):
+            yield from list(self.graphs.values())
+            return
+        ids = [self.ids.get(term) for term in triple]
+        if None in ids:
+            return
+        yield from self.graphs_of(self.find(*ids))  # type: ignore
+
+    def add_graph(self, graph: Graph) -> None:
+        self.graph_id(graph)
+
+    def remove_graph(self, graph: Graph) -> None:
+        self.remove((None, None, None), graph)
+        id = self.ids.get(graph.identifier)
+        if id is not None:
+            self.graphs.pop(id, None)
+            self.sizes.pop(id, None)
@@ -3,7 +3,18 @@
 import sys
 import base64
 
-from typing import Any, Optional, Sequence, overload
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    NoReturn,
+    Optional,
+    Sequence,
+    overload,
+)
+from weakref import WeakKeyDictionary
+from functools import lru_cache
+from contextlib import contextmanager
 
 from rdflib import (
     RDF,
@@ -17,10 +28,21 @@ from rdflib import (
     Literal,
     Namespace,
     IdentifiedNode,
+    ConjunctiveGraph,
+)
+from rdflib.graph import (
+    ModificationException,
+    _ObjectType,
+    _SubjectType,
+    _PredicateType,
 )
-from rdflib.graph import _ObjectType, _SubjectType, _PredicateType
+from rdflib.paths import Path
 from rdflib.query import ResultRow
+from rdflib.store import Store
+from rdflib.events import Event
 from rdflib.collection import Collection
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.sparql import Query
 
 import swash.here as here
 
@@ -124,12 +146,96 @@ def select_one_row(query: str, bindings: dict = {}) -> ResultRow:
     return rows[0]
 
 
+class GraphSet(Graph):
+    """A read-only union of some of the named graphs in one store.
+
+    Each triple comes once, however many of the graphs hold it.
+    """
+
+    def __init__(self, store: Store, identifiers: Iterable[URIRef]):
+        super().__init__(store=store)
+        self.graphs = [
+            Graph(store=store, identifier=identifier)
+            for identifier in identifiers
+        ]
+
+    def triples(self, triple):  # type: ignore[override]
+        subject, predicate, object = triple
+        if isinstance(predicate, Path):
+            for subject, object in predicate.eval(self, subject, object):
+                yield subject, predicate, object
+            return
+        seen = set()
+        for graph in self.graphs:
+            for found in graph.triples((subject, predicate, object)):
+                if found not in seen:
+                    seen.add(found)
+                    yield found
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.triples((None, None, None)))
+
+    def add(self, triple) -> NoReturn:  # type: ignore[override]
+        raise ModificationException()
+
+    def addN(self, quads) -> NoReturn:  # type: ignore[override]
+        raise ModificationException()
+
+    def remove(self, triple) -> NoReturn:  # type: ignore[override]
+        raise ModificationException()
+
+
+#: The views `scoped` has made of each dataset, by the graphs they show.
+scopes: WeakKeyDictionary[Graph, dict[frozenset[URIRef], Graph]] = (
+    WeakKeyDictionary()
+)
+
+
+def scoped(graph: Graph) -> Graph:
+    """Narrow a dataset to the graphs in `here.graphs`, if any.
+
+    A union query over a whole dataset looks in every graph and has to
+    weed out triples held by more than one; a request that knows where
+    its data lives can bind `here.graphs` and look only there. Named
+    graphs are already as narrow as they get and come back as they are.
+    """
+    identifiers = here.graphs.get()
+    if not identifiers or not isinstance(graph, ConjunctiveGraph):
+        return graph
+    views = scopes.setdefault(graph, {})
+    view = views.get(identifiers)
+    if view is None:
+        if len(identifiers) == 1:
+            [identifier] = identifiers
+            view = Graph(store=graph.store, identifier=identifier)
+        else:
+            view = GraphSet(graph.store, identifiers)
+        views[identifiers] = view
+    return view
+
+
+#: The prefixes that queries in `select_rows` may use undeclared.
+PREFIXES = {"nt": NT, "json": JSON, "ai": AI}
+
+
+@lru_cache(maxsize=256)
+def prepare(
+    query: str, namespaces: tuple[tuple[str, URIRef], ...]
+) -> Query:
+    """Parse and algebrize a query, once per text and set of prefixes.
+
+    rdflib would otherwise do both all over again for every call, which
+    for a small graph costs far more than answering the query. How
+    often this pays off is in `prepare.cache_info()`.
+    """
+    return prepareQuery(query, initNs=dict(namespaces))
+
+
 def select_rows(query: str, bindings: dict = {}) -> list[ResultRow]:
     """Select multiple rows from a query on the current graph"""
-    results = here.graph.get().query(
-        query,
+    results = scoped(here.graph.get()).query(
+        prepare(query, tuple(PREFIXES.items())),
         initBindings=bindings,
-        initNs={"nt": NT, "json": JSON, "ai": AI},
     )
     return [row for row in results if isinstance(row, ResultRow)]
 
@@ -260,23 +366,76 @@ def build_resource[Subject: S](
     Returns:
         The subject node with added properties
     """
-    graph = here.graph.get()
+    triples = []
 
     if type is not None:
-        graph.add((subject, RDF.type, type))
+        triples.append((subject, RDF.type, type))
 
     if properties is not None:
         for predicate, object in properties.items():
             if isinstance(object, list) or isinstance(object, set):
                 # TODO: list should mean rdf list
                 for item in object:
-                    graph.add((subject, predicate, to_literal(item)))
+                    triples.append((subject, predicate, to_literal(item)))
             else:
-                graph.add((subject, predicate, to_literal(object)))
+                triples.append((subject, predicate, to_literal(object)))
 
+    add_triples(here.graph.get(), triples)
     return subject
 
 
+class TriplesAddedEvent(Event):
+    """Many triples added to one graph at once by `add_triples`.
+
+    Carries the `context` graph and the list of `triples`. A batch
+    dispatches this one event in place of a `TripleAddedEvent` per
+    triple, so whoever listens for writes should listen for both.
+    Like rdflib's own event, it goes out before the triples go in,
+    so a listener can still tell which of them are new.
+    """
+
+
+class Silence:
+    """A dispatcher for stores that nobody should hear for a while."""
+
+    def dispatch(self, event: Event) -> None:
+        pass
+
+
+@contextmanager
+def muted(store: Store) -> Iterator[Store]:
+    """Keep a store from dispatching any events within the block.
+
+    The block must not await anything, or other tasks would write to
+    the store unheard too.
+    """
+    dispatcher = store.dispatcher
+    store.dispatcher = Silence()  # type: ignore
+    try:
+        yield store
+    finally:
+        store.dispatcher = dispatcher
+
+
+def add_triples(graph: Graph, triples: Iterable[tuple[S, P, O]]) -> int:
+    """Add triples to a graph in one batch, returning how many.
+
+    The store gets them all through one `addN` call and its listeners
+    hear one `TriplesAddedEvent` rather than an event per triple.
+    Triples for a dataset go into its default graph, as with `add`.
+    """
+    context = getattr(graph, "default_context", graph)
+    batch = list(triples)
+    if not batch:
+        return 0
+    context.store.dispatcher.dispatch(
+        TriplesAddedEvent(context=context, triples=batch)
+    )
+    with muted(context.store) as store:
+        store.addN([(s, p, o, context) for s, p, o in batch])
+    return len(batch)
+
+
 def get_label(dataset: Dataset, uri: URIRef) -> Optional[S]:
     """Get the best label for a URI based on language preferences."""
     # Get all labels with their languages
@@ -56,6 +56,20 @@ def test(c: Context, coverage=False):
         c.run("coverage html")
 
 
+@task
+def bench(c: Context, suites="", save=False, strict=False):
+    """Run benchmarks and compare them against the baseline."""
+    baseline = "./src/bubble/bench/baseline.json"
+    run(
+        c,
+        sh(
+            "bubble bench",
+            *suites.split(),
+            {"--save": save and baseline, "--strict": strict},
+        ),
+    )
+
+
 @task
 def server(c: Context, watch=True, bind="127.0.0.1:2026"):
     """Run Bubble web server."""
@@ -0,0 +1,24 @@
+from bubble.bench.suite import compare
+
+
+def test_compare_flags_regressions_by_direction():
+    baseline = {
+        "actors": {
+            "call": {"calls_per_s": 1000.0, "call_p50_ms": 1.0},
+            "gone": {"calls_per_s": 1.0},
+        }
+    }
+    report = {
+        "actors": {
+            "call": {
+                "calls_per_s": 700.0,
+                "call_p50_ms": 0.5,
+                "call_max_ms": 99.0,
+            },
+        }
+    }
+    changes = {c.metric: c for c in compare(baseline, report)}
+    assert set(changes) == {"calls_per_s", "call_p50_ms"}
+    assert changes["calls_per_s"].regressed(0.25)
+    assert not changes["calls_per_s"].regressed(0.5)
+    assert not changes["call_p50_ms"].regressed(0.25)
@@ -0,0 +1,146 @@
+from datetime import UTC, datetime
+
+import pytest
+
+from rdflib import RDF, Dataset, Literal, Namespace
+
+from swash.html import document
+from swash.util import muted, add_triples
+from swash.store import NoisyMemory, CompactStore
+from swash.census import Tally, Census
+from swash.sqlite import SQLiteStore
+from bubble.repo.git import Git
+from bubble.repo.repo import Repository, open_dataset
+from bubble.http.render import render_graphs_overview
+
+EX = Namespace("http://example.com/")
+
+
+def recount(dataset: Dataset, census: Census) -> None:
+    for identifier, stats in census.stats().items():
+        graph = dataset.graph(identifier)
+        expected = Tally(graph.triples((None, None, None))).stats()
+        assert stats._replace(modified=None) == expected
+
+
+@pytest.mark.parametrize(
+    "store",
+    [NoisyMemory, CompactStore, lambda: SQLiteStore(":memory:")],
+    ids=["memory", "compact", "sqlite"],
+)
+def test_census_follows_writes(store):
+    dataset = Dataset(store=store(), default_union=True)
+    dataset.graph(EX.old).add((EX.thing, RDF.type, EX.Thing))
+    census = Census(dataset)
+    assert census.stats()[EX.old].types == {EX.Thing: 1}
+
+    words = dataset.graph(EX.words)
+    words.add((EX.a, RDF.type, EX.Word))
+    words.add((EX.a, RDF.type, EX.Word))
+    words.add((EX.a, RDF.value, Literal("a")))
+    add_triples(
+        words,
+        [
+            (EX.a, RDF.value, Literal("a")),
+            (EX.b, RDF.type, EX.Word),
+            (EX.b, RDF.type, EX.Word),
+            (EX.b, RDF.value, Literal("b")),
+        ],
+    )
+    stats = census.stats()[EX.words]
+    assert (stats.triples, stats.subjects) == (4, 2)
+    assert stats.types == {EX.Word: 2}
+    assert stats.modified is not None
+    recount(dataset, census)
+
+    # A batch into an empty graph still counts its repeats once.
+    add_triples(
+        dataset.graph(EX.more),
+        [(EX.c, RDF.type, EX.Word), (EX.c, RDF.type, EX.Word)],
+    )
+    assert census.stats()[EX.more].types == {EX.Word: 1}
+    recount(dataset, census)
+
+    words.remove((EX.a, None, None))
+    stats = census.stats()[EX.words]
+    assert (stats.triples, stats.subjects) == (2, 1)
+    assert stats.types == {EX.Word: 1}
+    recount(dataset, census)
+
+    # Writes nobody heard count once the graph is touched, which is
+    # a recount and not a change.
+    modified = census.stats()[EX.words].modified
+    with muted(dataset.store):
+        words.add((EX.c, RDF.type, EX.Word))
+    census.touch(EX.words)
+    assert census.stats()[EX.words].types == {EX.Word: 2}
+    assert census.stats()[EX.words].modified == modified
+    recount(dataset, census)
+
+
+def test_sqlite_census_reads_the_index(tmp_path, monkeypatch):
+    path = tmp_path / "index.db"
+    store = SQLiteStore(path)
+    words = Dataset(store=store, default_union=True).graph(EX.words)
+    words.add((EX.a, RDF.type, EX.Word))
+    words.add((EX.a, RDF.value, Literal("a")))
+    words.add((EX.b, RDF.type, EX.Word))
+    # An index from before the counts were kept gets them on opening.
+    store.db.executescript(
+        "DROP TABLE counts; DROP TABLE types;"
+        " DROP TRIGGER count_added; DROP TRIGGER count_removed;"
+        " DROP TRIGGER type_added; DROP TRIGGER type_removed; BEGIN;"
+    )
+    store.close()
+
+    store = SQLiteStore(path)
+    dataset = Dataset(store=store, default_union=True)
+    # The census of a store that counts reads no triples at all.
+    monkeypatch.setattr(store, "triples", None)
+    census = Census(dataset)
+    stats = census.stats()[EX.words]
+    assert (stats.triples, stats.subjects) == (3, 2)
+    assert stats.types == {EX.Word: 2}
+    assert not census.tallies
+
+    dataset.graph(EX.words).remove((EX.b, None, None))
+    stats = census.stats()[EX.words]
+    assert (stats.triples, stats.subjects) == (2, 1)
+    assert stats.types == {EX.Word: 1}
+    assert stats.modified is not None
+    store.close()
+
+
+@pytest.mark.parametrize("store", ["memory", "sqlite"])
+async def test_repository_keeps_a_census(tmp_path, store):
+    def open_repo():
+        return Repository.create(
+            Git(tmp_path),
+            base_url_template=EX,
+            dataset=open_dataset(store, tmp_path),
+        )
+
+    repo = await open_repo()
+    notes = repo.graph(EX.notes)
+    notes.add((EX.note, RDF.type, EX.Note))
+    notes.add((EX.note, RDF.value, Literal("hello")))
+    await repo.save_all()
+    repo.dataset.close()
+
+    # A graph read back without events is counted all the same, and
+    # dated by its file rather than by when it was read.
+    repo = await open_repo()
+    await repo.load_all()
+    stats = repo.census.stats()
+    assert (stats[EX.notes].triples, stats[EX.notes].subjects) == (2, 1)
+    file = await repo.graph_file(EX.notes).stat()
+    assert stats[EX.notes].modified == datetime.fromtimestamp(
+        file.st_mtime, UTC
+    )
+    recount(repo.dataset, repo.census)
+
+    with document() as page:
+        render_graphs_overview(stats)
+    html = page.to_html()
+    assert "1 subjects, 2 triples" in html
+    assert "Note (1)" in html
@@ -152,3 +152,11 @@ def test_integer_typing(integer: int):
 def test_float_typing(float: float):
     with here.graph.bind(Graph(base="https://example.com/")) as g:
         assert is_a(rdf_from_json(float), XSD.double)
+
+
+def test_json_from_rdf_reads_a_given_graph():
+    message = {"words": [{"word": "hi", "start": 0.5}, None], "final": True}
+    graph = Graph(base="https://example.com/")
+    with here.graph.bind(graph):
+        root = rdf_from_json(message)
+    assert json_from_rdf(root, graph) == message
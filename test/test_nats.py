@@ -0,0 +1,159 @@
+import json
+
+import trio
+
+from bubble.mesh.nats import (
+    NatsClient,
+    NatsMessage,
+    NatsTimeout,
+    NoResponders,
+)
+from bubble.mesh.broker import subject_matches
+
+
+class TinyNatsServer:
+    """A NATS server that knows just enough protocol for the client."""
+
+    def __init__(self):
+        self.subs = []
+        self.streams = []
+
+    async def serve(self, task_status=trio.TASK_STATUS_IGNORED):
+        listeners = await trio.open_tcp_listeners(0, host="127.0.0.1")
+        self.port = listeners[0].socket.getsockname()[1]
+        task_status.started()
+        await trio.serve_listeners(self.handle, listeners)
+
+    async def handle(self, stream: trio.SocketStream):
+        self.streams.append(stream)
+        await stream.send_all(b'INFO {"headers": true}\r\n')
+        buffer = bytearray()
+
+        async def line():
+            while b"\r\n" not in buffer:
+                chunk = await stream.receive_some()
+                if not chunk:
+                    raise trio.BrokenResourceError
+                buffer.extend(chunk)
+            end = buffer.index(b"\r\n")
+            text = buffer[:end].decode()
+            del buffer[: end + 2]
+            return text
+
+        async def payload(size):
+            while len(buffer) < size + 2:
+                buffer.extend(await stream.receive_some())
+            data = bytes(buffer[:size])
+            del buffer[: size + 2]
+            return data
+
+        try:
+            while True:
+                op, *args = (await line()).split(" ")
+                if op == "CONNECT":
+                    json.loads(" ".join(args))
+                elif op == "PING":
+                    await stream.send_all(b"PONG\r\n")
+                elif op == "SUB":
+                    self.subs.append((args[0], args[-1], stream))
+                elif op == "UNSUB":
+                    self.subs = [s for s in self.subs if s[1] != args[0]]
+                elif op in ("PUB", "HPUB"):
+                    data = await payload(int(args[-1]))
+                    await self.route(op, args, data)
+        except (trio.BrokenResourceError, trio.ClosedResourceError):
+            self.subs = [s for s in self.subs if s[2] is not stream]
+
+    async def route(self, op, args, data):
+        subject = args[0]
+        reply = args[1] if len(args) == (4 if op == "HPUB" else 3) else ""
+        sizes = " ".join(args[-2:] if op == "HPUB" else args[-1:])
+        delivered = False
+        for pattern, sid, target in list(self.subs):
+            if subject_matches(pattern, subject):
+                verb = "HMSG" if op == "HPUB" else "MSG"
+                head = " ".join(filter(None, [verb, subject, sid, reply]))
+                await target.send_all(
+                    f"{head} {sizes}\r\n".encode() + data + b"\r\n"
+                )
+                delivered = True
+        if not delivered and reply:
+            block = b"NATS/1.0 503\r\n\r\n"
+            for pattern, sid, target in list(self.subs):
+                if subject_matches(pattern, reply):
+                    head = f"HMSG {reply} {sid} {len(block)} {len(block)}"
+                    await target.send_all(
+                        head.encode() + b"\r\n" + block + b"\r\n"
+                    )
+
+
+async def test_native_nats_client():
+    server = TinyNatsServer()
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            await nursery.start(server.serve)
+            url = f"nats://127.0.0.1:{server.port}"
+            client = NatsClient(nursery, url)
+            await client.connect()
+
+            received = []
+
+            async def on_note(msg: NatsMessage):
+                received.append((msg.data, msg.headers))
+
+            async def on_echo(msg: NatsMessage):
+                await client.publish(msg.reply, msg.data.upper())
+
+            await client.subscribe("notes.*", on_note)
+            await client.subscribe("echo", on_echo)
+            await client.flush()
+
+            await client.publish("notes.a", b"plain")
+            await client.publish("notes.b", b"fancy", headers={"X": "1"})
+            reply = await client.request("echo", b"hello", timeout=1)
+            assert reply.data == b"HELLO"
+            assert received == [(b"plain", None), (b"fancy", {"X": "1"})]
+
+            try:
+                await client.request("nobody", b"?", timeout=1)
+                assert False, "expected no responders"
+            except NoResponders:
+                pass
+
+            # The client reconnects and resubscribes if the server
+            # drops it.
+            client.reconnect_wait = 0.01
+            for stream in server.streams:
+                await stream.aclose()
+            while len(server.streams) < 2 or not client.connected:
+                await trio.sleep(0.01)
+            await client.publish("notes.c", b"again")
+            await client.flush()
+            while len(received) < 3:
+                await trio.sleep(0.01)
+            assert received[-1] == (b"again", None)
+
+            await client.close()
+            nursery.cancel_scope.cancel()
+
+
+async def test_native_nats_request_timeout():
+    server = TinyNatsServer()
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            await nursery.start(server.serve)
+            client = NatsClient(nursery, f"nats://127.0.0.1:{server.port}")
+            await client.connect()
+
+            async def ignore(msg: NatsMessage):
+                pass
+
+            await client.subscribe("silent", ignore)
+            try:
+                await client.request("silent", b"?", timeout=0.1)
+                assert False, "expected a timeout"
+            except NatsTimeout:
+                pass
+
+            await client.close()
+            nursery.cancel_scope.cancel()
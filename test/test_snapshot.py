@@ -0,0 +1,94 @@
+import gc
+import threading
+
+import trio
+import pytest
+import trio.testing
+
+from rdflib import RDF, Dataset, Literal, Namespace
+
+from swash import here
+from swash.store import NoisyMemory
+from swash.snapshot import Snapshots
+from bubble.repo.git import Git
+from bubble.repo.repo import Repository, open_dataset
+
+EX = Namespace("http://example.com/")
+
+
+def test_snapshots_stay_as_they_were():
+    live = Dataset(store=NoisyMemory(), default_union=True)
+    snapshots = Snapshots(live)
+    live.graph(EX.a).add((EX.s, RDF.value, Literal(1)))
+    live.graph(EX.b).add((EX.s, RDF.value, Literal(2)))
+
+    before = snapshots.take()
+    live.graph(EX.a).add((EX.s, RDF.value, Literal(3)))
+    live.graph(EX.b).remove((EX.s, RDF.value, Literal(2)))
+    after = snapshots.take()
+
+    assert set(before.objects(EX.s, RDF.value)) == {Literal(1), Literal(2)}
+    assert set(after.objects(EX.s, RDF.value)) == {Literal(1), Literal(3)}
+    assert len(before.graph(EX.b)) == 1
+    assert len(after.graph(EX.b)) == 0
+
+    # A graph nobody touched is copied once and shared from then on.
+    again = snapshots.take()
+    assert again.store.frozen[EX.a] is after.store.frozen[EX.a]
+
+    with pytest.raises(TypeError):
+        after.graph(EX.a).add((EX.s, RDF.value, Literal(4)))
+
+
+def test_snapshots_copy_only_what_they_are_asked_for():
+    live = Dataset(store=NoisyMemory(), default_union=True)
+    snapshots = Snapshots(live)
+    live.graph(EX.a).add((EX.s, RDF.value, Literal(1)))
+    live.graph(EX.b).add((EX.s, RDF.value, Literal(2)))
+
+    scoped = snapshots.take(frozenset([EX.a]))
+    assert set(scoped.objects(EX.s, RDF.value)) == {Literal(1)}
+    assert set(snapshots.frozen) == {EX.a}
+
+    # Copies go with the last snapshot that holds them.
+    del scoped
+    gc.collect()
+    assert not snapshots.frozen
+
+
+@pytest.mark.parametrize("store", ["memory", "sqlite"])
+async def test_repository_reads_a_snapshot_in_a_thread(tmp_path, store):
+    repo = await Repository.create(
+        Git(tmp_path),
+        base_url_template=EX,
+        dataset=open_dataset(store, tmp_path),
+    )
+    notes = repo.graph(EX.notes)
+    notes.add((EX.note, RDF.value, Literal("before")))
+    written = threading.Event()
+    results = []
+
+    def reader():
+        written.wait(timeout=10)
+        dataset = here.dataset.get()
+        return threading.get_ident(), set(
+            dataset.objects(EX.note, RDF.value)
+        )
+
+    async def read():
+        results.append(await repo.read(reader))
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(read)
+        await trio.testing.wait_all_tasks_blocked()
+        # The writer goes on while the reader reads, unseen.
+        notes.add((EX.note, RDF.value, Literal("during")))
+        written.set()
+
+    [(thread, seen)] = results
+    assert thread != threading.get_ident()
+    assert seen == {Literal("before")}
+    assert set(repo.snapshot().objects(EX.note, RDF.value)) == {
+        Literal("before"),
+        Literal("during"),
+    }
@@ -0,0 +1,66 @@
+from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+
+import trio
+
+from httpx import AsyncClient
+from rdflib import Graph, Dataset, Namespace
+from httpx_ws import aconnect_ws
+from httpx_ws.transport import ASGIWebSocketTransport
+
+from swash.prfx import NT, RDF
+from bubble.repo.git import Git
+from bubble.http.town import Site
+from bubble.mesh.wire import SUBPROTOCOL, encode_graph, decode_dataset
+from bubble.repo.repo import Repository
+from bubble.sock.join import (
+    anonymous_connection,
+    create_heartbeat_graph,
+)
+
+EX = Namespace("http://example.com/")
+
+
+@asynccontextmanager
+async def town_client(tmp_path) -> AsyncGenerator[AsyncClient, None]:
+    """A client for a town served the way `bubble serve` does it."""
+    repo = await Repository.create(Git(tmp_path), base_url_template=EX)
+    site = Site("http://example.com/", "localhost:8000", repo)
+    with site.install_context(), repo.using_new_buffer():
+        async with AsyncClient(
+            base_url="http://example.com",
+            transport=ASGIWebSocketTransport(app=site.get_fastapi_app()),
+        ) as client:
+            yield client
+
+
+async def test_binary_join_round_trips_a_heartbeat(tmp_path):
+    with trio.fail_after(10):
+        async with (
+            town_client(tmp_path) as client,
+            anonymous_connection(
+                "ws://example.com/", binary=True, client=client
+            ) as (ws, me),
+        ):
+            assert ws.subprotocol == SUBPROTOCOL
+            assert me.startswith("http://example.com/")
+
+            await ws.send_bytes(encode_graph(create_heartbeat_graph()))
+            reply = Dataset(default_union=True)
+            decode_dataset(await ws.receive_bytes(), reply)
+
+    heartbeat = reply.value(None, RDF.type, NT.Heartbeat)
+    assert heartbeat is not None
+    assert reply.value(heartbeat, NT.acknowledgedAtTime) is not None
+
+
+async def test_text_join_is_the_default(tmp_path):
+    with trio.fail_after(10):
+        async with (
+            town_client(tmp_path) as client,
+            aconnect_ws("ws://example.com/join", client) as ws,
+        ):
+            assert ws.subprotocol is None
+            handshake = Graph()
+            handshake.parse(data=await ws.receive_text(), format="turtle")
+    assert handshake.value(None, RDF.type, NT.AnonymousHandshake)
@@ -0,0 +1,184 @@
+import subprocess
+
+import pytest
+import hypothesis.strategies as st
+
+from rdflib import RDF, Graph, URIRef, Dataset, Literal, Namespace
+from hypothesis import given, settings
+
+import swash.store
+
+from swash import here
+from swash.util import new, select_rows
+from swash.store import CompactStore
+from swash.sqlite import SQLiteStore
+from bubble.repo.git import Git
+from bubble.repo.repo import Repository, open_dataset
+
+EX = Namespace("http://example.com/")
+
+nodes = st.sampled_from([EX.a, EX.b, EX.c])
+objects = st.one_of(
+    nodes, st.sampled_from([Literal(1), Literal("1"), Literal("b")])
+)
+graphs = st.sampled_from([EX.g1, EX.g2])
+patterns = st.tuples(
+    st.none() | nodes, st.none() | nodes, st.none() | objects
+)
+operations = st.lists(
+    st.one_of(
+        st.tuples(st.just("add"), st.tuples(nodes, nodes, objects), graphs),
+        st.tuples(st.just("remove"), patterns, st.none() | graphs),
+    ),
+    max_size=40,
+)
+
+
+def quads(dataset: Dataset, pattern=(None, None, None), graph=None):
+    context = None if graph is None else dataset.graph(graph)
+    return {
+        (triple, frozenset(c.identifier for c in contexts))
+        for triple, contexts in dataset.store.triples(pattern, context)
+    }
+
+
+@pytest.mark.parametrize(
+    "make", [CompactStore, lambda: SQLiteStore(":memory:")]
+)
+@settings(max_examples=200, deadline=None)
+@given(ops=operations, pattern=patterns)
+def test_store_agrees_with_memory(make, ops, pattern):
+    expected = Dataset()
+    actual = Dataset(store=make())
+    for op, triple, graph in ops:
+        for dataset in (expected, actual):
+            if op == "add":
+                dataset.graph(graph).add(triple)
+            elif graph is None:
+                dataset.store.remove(triple, None)
+            else:
+                dataset.graph(graph).remove(triple)
+
+    assert quads(actual, pattern) == quads(expected, pattern)
+    for graph in (EX.g1, EX.g2):
+        assert quads(actual, pattern, graph) == quads(
+            expected, pattern, graph
+        )
+        assert len(actual.graph(graph)) == len(expected.graph(graph))
+
+
+def test_compact_store_compacts_dead_rows(monkeypatch):
+    monkeypatch.setattr(swash.store, "MIN_DEAD", 4)
+    store = CompactStore()
+    graph = Graph(store=store, identifier=EX.g)
+    for i in range(10):
+        graph.add((EX[f"s{i}"], RDF.value, Literal(i)))
+    graph.remove((None, RDF.value, None))
+    graph.add((EX.s0, RDF.value, Literal(0)))
+
+    assert len(store.c) == 1
+    assert store.dead == 0
+    assert set(graph) == {(EX.s0, RDF.value, Literal(0))}
+
+
+async def test_repository_on_compact_store(tmp_path):
+    def open_repo():
+        return Repository.create(
+            Git(tmp_path),
+            base_url_template=EX,
+            dataset=Dataset(store=CompactStore(), default_union=True),
+        )
+
+    repo = await open_repo()
+    graph = repo.graph(EX.notes)
+    with here.graph.bind(graph):
+        new(EX.Note, {EX.text: Literal("remember the milk")})
+    await repo.save_all()
+
+    reopened = await open_repo()
+    await reopened.load_all()
+    with here.graph.bind(reopened.dataset):
+        rows = select_rows(
+            f"SELECT ?text WHERE {{ ?note <{EX.text}> ?text }}"
+        )
+    assert [row.text for row in rows] == [Literal("remember the milk")]
+    assert isinstance(reopened.dataset.store, CompactStore)
+    assert URIRef(EX.notes) in reopened.list_graphs()
+
+
+async def test_repository_reopens_from_sqlite_index(tmp_path, monkeypatch):
+    def open_repo():
+        return Repository.create(
+            Git(tmp_path),
+            base_url_template=EX,
+            dataset=open_dataset("sqlite", tmp_path),
+        )
+
+    repo = await open_repo()
+    with here.graph.bind(repo.graph(EX.notes)):
+        new(EX.Note, {EX.text: Literal("remember the milk")})
+    await repo.save_all()
+    repo.dataset.close()
+
+    parsed = []
+    parse = Graph.parse
+    monkeypatch.setattr(
+        Graph,
+        "parse",
+        lambda self, *args, **kwargs: parsed.append(self.identifier)
+        or parse(self, *args, **kwargs),
+    )
+
+    reopened = await open_repo()
+    await reopened.load_all()
+    assert EX.notes not in parsed
+    assert (None, EX.text, Literal("remember the milk")) in (
+        reopened.graph(EX.notes)
+    )
+
+    # Edited behind the index's back, the file is parsed again and
+    # replaces what the index had.
+    file = reopened.graph_file(EX.notes)
+    await file.write_text(
+        f'<{EX.notes}> {{ <{EX.n}> <{EX.text}> "buy bread" . }}'
+    )
+    await reopened.load_graph(EX.notes)
+    assert EX.notes in parsed
+    assert set(reopened.graph(EX.notes)) == {
+        (EX.n, EX.text, Literal("buy bread"))
+    }
+
+    await reopened.git.init()
+    await reopened.git.add(".")
+    tracked = subprocess.run(
+        ["git", "ls-files"], cwd=tmp_path, capture_output=True, text=True
+    ).stdout
+    assert "void.ttl" in tracked
+    assert ".index" not in tracked
+
+
+async def test_unsaved_writes_do_not_survive_in_the_index(tmp_path):
+    def open_repo():
+        return Repository.create(
+            Git(tmp_path),
+            base_url_template=EX,
+            dataset=open_dataset("sqlite", tmp_path),
+        )
+
+    repo = await open_repo()
+    notes = repo.graph(EX.notes)
+    notes.add((EX.n, EX.text, Literal("saved")))
+    await repo.save_all()
+
+    # Saving another graph commits the index with this write in it,
+    # and then the process dies before the notes are saved.
+    notes.add((EX.n, EX.text, Literal("never saved")))
+    repo.graph(EX.other).add((EX.o, EX.text, Literal("other")))
+    await repo.save_graph(EX.other)
+    repo.dataset.close(commit_pending_transaction=False)
+
+    reopened = await open_repo()
+    await reopened.load_all()
+    assert set(reopened.graph(EX.notes)) == {
+        (EX.n, EX.text, Literal("saved"))
+    }
@@ -1,31 +1,70 @@
+import gc
+import os
 import re
+import weakref
+import tempfile
 
 from contextlib import asynccontextmanager
 
 import trio
+import rdflib.store
 
 from trio import Path
 from httpx import AsyncClient, ASGITransport
-from pytest import fixture
-from rdflib import Graph, URIRef, Literal, Namespace
+from pytest import raises, fixture
+from rdflib import RDFS, Graph, URIRef, Dataset, Literal, Namespace
 from asgi_lifespan import LifespanManager
 from structlog.stdlib import BoundLogger
 
+from swash import here
+from bubble.cli import shard as shard_cli
+from swash.html import document
 from swash.mint import fresh_uri
-from swash.prfx import NT, RDF
-from swash.util import is_a, bubble, get_single_object
+from swash.prfx import NT, RDF, PROV
+from swash.util import (
+    TriplesAddedEvent,
+    new,
+    is_a,
+    bubble,
+    add_triples,
+    get_single_object,
+)
 from bubble.logs import configure_logging
 from bubble.mesh.otp import (
     ServerActor,
 )
 from bubble.repo.git import Git
+from bubble.http.tool import DispatchContext, DispatchingActor, handler
 from bubble.http.town import (
     Site,
     town_app,
 )
-from bubble.mesh.base import send, this, spawn, receive
+from bubble.mesh.base import (
+    Vat,
+    Dedupe,
+    Batching,
+    vat,
+    send,
+    this,
+    spawn,
+    persist,
+    receive,
+    txgraph,
+    idempotent,
+    encode_keyed,
+)
 from bubble.mesh.call import call
-from bubble.repo.repo import Repository
+from bubble.mesh.pool import spawn_worker
+from bubble.repo.repo import Repository, context
+from bubble.http.trace import waterfall, render_trace, describe_trace
+from bubble.mesh.shard import HashRing, run_shards
+from bubble.mesh.broker import LocalBroker
+from bubble.http.metrics import (
+    describe_metrics,
+    prometheus_metrics,
+    prometheus_lock_metrics,
+)
+from bubble.mesh.directory import ActorDirectory
 
 
 @fixture
@@ -121,6 +160,736 @@ async def test_counter_actor(logger: BoundLogger, temp_repo: Repository):
                 await call(counter, bubble(EX.Stop, EX))
 
 
+async def test_actor_metrics(logger: BoundLogger, temp_repo: Repository):
+    town = Site("http://example.com/", "localhost:8000", repo=temp_repo)
+
+    async def doomed():
+        raise RuntimeError("as foretold")
+
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            with town.install_context():
+                counter = await spawn(nursery, CounterActor(0))
+                for _ in range(3):
+                    await call(counter, bubble(EX.Inc, EX))
+
+                town.vat.curr.get().trap = True
+                await spawn(nursery, doomed)
+                await receive()
+                town.vat.curr.get().trap = False
+
+                metrics = town.vat.deck[counter].metrics
+                assert metrics.received == 3
+                assert metrics.age.count == 3
+                assert metrics.handling.count == 3
+                assert metrics.peak_depth >= 1
+
+                text = prometheus_metrics(town.vat)
+                assert (
+                    "# TYPE bubble_actor_handler_seconds histogram" in text
+                )
+                assert f'actor="{counter}",name="CounterActor"' in text
+                assert 'le="+Inf"} 3' in text
+                assert 'bubble_actor_crashes_total{name="doomed"} 1' in text
+
+                id = town.site["actors"]
+                graph = describe_metrics(town.vat, id)
+                node = graph.value(predicate=NT.actor, object=counter)
+                assert graph.value(node, NT.messagesReceived) == Literal(3)
+                tally = graph.value(id, NT.crashes)
+                assert graph.value(tally, NT.crashCount) == Literal(1)
+
+                await call(counter, bubble(EX.Stop, EX))
+
+
+async def test_duplicate_messages_are_dropped(
+    logger: BoundLogger, temp_repo: Repository
+):
+    town = Site("http://example.com/", "localhost:8000", repo=temp_repo)
+    notes = []
+
+    async def collector():
+        while True:
+            msg = await receive()
+            notes.append(msg.value(msg.identifier, EX.n).toPython())
+
+    def note(n: int) -> Graph:
+        return bubble(EX.Note, EX, {EX.n: Literal(n)})
+
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            with town.install_context():
+                inbox = await spawn(nursery, collector)
+
+                # A keyed graph is taken in once, however often it is sent.
+                keyed = idempotent(note(0))
+                await send(inbox, keyed)
+                await send(inbox, keyed)
+                await send(inbox, idempotent(note(1), "once"))
+                await send(inbox, idempotent(note(2), "once"))
+
+                # Unkeyed graphs are always delivered.
+                plain = note(3)
+                await send(inbox, plain)
+                await send(inbox, plain)
+
+                # Bytes a transport sends twice arrive once.
+                data = encode_keyed(note(4))
+                await town.vat.deliver_remote(str(inbox), data)
+                await town.vat.deliver_remote(str(inbox), data)
+
+                while len(notes) < 5:
+                    await trio.sleep(0.01)
+                await trio.sleep(0.05)
+                assert notes == [0, 1, 3, 3, 4]
+                context = town.vat.deck[inbox]
+                assert context.metrics.duplicates == 3
+
+                # The window forgets the oldest keys first.
+                context.seen.clear()
+                context.dedupe = Dedupe(max_keys=2)
+                assert context.first_sighting("a")
+                assert context.first_sighting("b")
+                assert not context.first_sighting("a")
+                assert context.first_sighting("c")
+                assert context.first_sighting("a")
+
+                nursery.cancel_scope.cancel()
+
+
+async def test_failed_delivery_lets_the_retry_in(temp_repo: Repository):
+    town = Site("http://example.com/", "localhost:8000", repo=temp_repo)
+    notes = []
+
+    async def collector():
+        while True:
+            msg = await receive()
+            notes.append(msg.value(msg.identifier, EX.n).toPython())
+
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            with town.install_context():
+                inbox = await spawn(nursery, collector)
+                context = town.vat.deck[inbox]
+                message = idempotent(
+                    bubble(EX.Note, EX, {EX.n: Literal(0)})
+                )
+
+                # The mailbox closes under the sender, as in a shutdown.
+                mailbox = context.send
+                context.send, closed = trio.open_memory_channel[Graph](1)
+                await closed.aclose()
+                with raises(trio.BrokenResourceError):
+                    await send(inbox, message)
+
+                context.send = mailbox
+                await send(inbox, message)
+                while not notes:
+                    await trio.sleep(0.01)
+                assert notes == [0]
+                assert context.metrics.duplicates == 0
+
+                nursery.cancel_scope.cancel()
+
+
+async def test_persist_copies_and_saves_only_changes(
+    temp_repo: Repository,
+):
+    with context.repo.bind(temp_repo):
+        transcript = Graph(identifier=EX.transcript)
+        transcript.add((EX.line1, RDF.type, EX.Line))
+        transcript.add((EX.line2, RDF.type, EX.Line))
+        await persist(transcript)
+
+        stored = temp_repo.graph(EX.transcript)
+        assert len(stored) == 2
+        assert await temp_repo.graph_file(EX.transcript).exists()
+
+        # Later persists copy only what was added in between.
+        transcript.add((EX.line3, RDF.type, EX.Line))
+        assert temp_repo.absorb(transcript) == 1
+        assert temp_repo.absorb(transcript) == 0
+        assert len(stored) == 3
+
+        # Other dirty graphs are left for whoever persists them.
+        temp_repo.graph(EX.other).add((EX.a, RDF.type, EX.Thing))
+        await persist(transcript)
+        assert not await temp_repo.graph_file(EX.other).exists()
+        content = await temp_repo.graph_file(EX.transcript).read_text()
+        assert "line3" in content
+
+
+async def test_autosave_keeps_provenance_across_restarts(
+    temp_repo: Repository, tmp_path: Path
+):
+    town = Site("http://example.com/", "localhost:8000", repo=temp_repo)
+
+    async def scribe():
+        # The actor persists only its own graph.
+        async with txgraph() as graph:
+            graph.add((EX.page, RDF.type, EX.Page))
+
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(temp_repo.autosave, 60)
+            with (
+                town.install_context(),
+                temp_repo.using_new_buffer() as town_graph,
+            ):
+                actor = await spawn(nursery, scribe, name="scribe")
+                while actor in town.vat.deck:
+                    await trio.sleep(0.01)
+            nursery.cancel_scope.cancel()
+
+    repo = await Repository.create(Git(tmp_path), base_url_template=EX)
+    await repo.load_all()
+    provenance = repo.graph(town_graph)
+    assert provenance.value(actor, RDFS.label) == Literal(
+        "scribe", lang="en"
+    )
+    process = provenance.value(actor, PROV.wasAssociatedWith)
+    assert (process, RDF.type, NT.ActorProcess) in provenance
+
+
+async def test_batches_are_heard_once(temp_repo: Repository):
+    graph = temp_repo.graph(EX.words)
+    await temp_repo.save_all()
+
+    heard = []
+    store = temp_repo.dataset.store
+    store.dispatcher.subscribe(rdflib.store.TripleAddedEvent, heard.append)
+    store.dispatcher.subscribe(TriplesAddedEvent, heard.append)
+    with here.graph.bind(graph):
+        new(EX.Word, {EX.spelling: [Literal("a"), Literal("b")]})
+    assert len(graph) == 3
+    assert len(heard) == 1
+    assert temp_repo.dirty_graphs == {graph}
+
+    # A graph read back from disk has nothing new to save.
+    await temp_repo.save_all()
+    graph.remove((None, None, None))
+    temp_repo.dirty_graphs.clear()
+    await temp_repo.load_graph(EX.words)
+    assert len(graph) == 3
+    assert not temp_repo.dirty_graphs
+
+    # Batches into outside graphs reach the persist journal too.
+    transcript = Graph(identifier=EX.transcript)
+    assert temp_repo.absorb(transcript) == 0
+    add_triples(transcript, [(EX.line1, RDF.type, EX.Line)])
+    assert temp_repo.absorb(transcript) == 1
+
+
+async def test_absorb_copies_each_graph_of_a_store(temp_repo: Repository):
+    outside = Dataset()
+    a = outside.graph(EX.a)
+    b = outside.graph(EX.b)
+    a.add((EX.x, RDF.type, EX.Thing))
+    b.add((EX.y, RDF.type, EX.Thing))
+    assert temp_repo.absorb(a) == 1
+    assert temp_repo.absorb(b) == 1
+    assert len(temp_repo.graph(EX.b)) == 1
+
+    # Graphs nobody absorbs are not journaled.
+    outside.graph(EX.c).add((EX.z, RDF.type, EX.Thing))
+    journal = temp_repo.journals[outside.store]
+    assert set(journal.added) == {EX.a, EX.b}
+    b.add((EX.w, RDF.type, EX.Thing))
+    assert temp_repo.absorb(b) == 1
+    assert temp_repo.absorb(a) == 0
+
+
+async def test_writes_to_different_graphs_do_not_wait(
+    temp_repo: Repository,
+):
+    for name in ("a", "b"):
+        temp_repo.graph(EX[name]).add((EX[name], RDF.type, EX.Thing))
+    await temp_repo.save_all()
+    stats = temp_repo.graph_lock_stats
+    before = stats.acquired
+
+    async with trio.open_nursery() as nursery:
+        for name in ("a", "b", "a"):
+            nursery.start_soon(temp_repo.flush, EX[name])
+
+    # Only the second writer of the same graph had to wait.
+    assert stats.acquired - before == 3
+    assert stats.contended == 1
+    assert not temp_repo.graph_locks
+    text = prometheus_lock_metrics(temp_repo)
+    assert 'bubble_repo_lock_contended_total{lock="graph"} 1' in text
+
+
+class DrowsyCounter(CounterActor):
+    idle_timeout = 0.05
+
+    async def hibernate(self):
+        graph = here.graph.get()
+        graph.set((this(), EX.value, Literal(self.state)))
+        await super().hibernate()
+
+    @classmethod
+    def rehydrate(cls, actor: URIRef):
+        return cls(here.graph.get().value(actor, EX.value).toPython())
+
+
+async def test_idle_actor_passivates_and_wakes(
+    logger: BoundLogger, temp_repo: Repository
+):
+    town = Site("http://example.com/", "localhost:8000", repo=temp_repo)
+    actor = DrowsyCounter(0)
+    drowsy = weakref.ref(actor)
+    with trio.fail_after(2):
+        async with trio.open_nursery() as nursery:
+            with town.install_context():
+                system = vat.get()
+                with temp_repo.using_buffer(EX.home) as home:
+                    counter = await spawn(nursery, actor)
+                del actor
+                await call(counter, bubble(EX.Inc, EX))
+                proc = system.deck[counter].proc
+
+                while counter in system.deck:
+                    await trio.sleep(0.01)
+                assert counter in system.dormant
+
+                # It saved its state in its graph, and the vat kept
+                # nothing of it in memory.
+                assert home.value(counter, EX.value) == Literal(1)
+                assert await temp_repo.graph_file(EX.home).exists()
+                gc.collect()
+                assert drowsy() is None
+
+                # The next message makes it again in a new process, with
+                # its state intact and no mail lost, and the new process
+                # is recorded in its own graph, not the sender's.
+                with temp_repo.using_buffer(EX.elsewhere) as elsewhere:
+                    x = await call(counter, bubble(EX.Inc, EX))
+                assert (x.identifier, EX.value, Literal(2)) in x
+                assert counter not in system.dormant
+                woke = system.deck[counter].proc
+                assert woke != proc
+                assert (woke, PROV.wasInformedBy, proc) in home
+                assert (woke, None, None) not in elsewhere
+
+                await call(counter, bubble(EX.Stop, EX))
+
+
+class SleepyActor(ServerActor):
+    max_concurrency = 3
+
+    def __init__(self):
+        super().__init__()
+        self.running = 0
+        self.peak = 0
+        self.log: list[str] = []
+
+    def ordering_key(self, graph: Graph):
+        return graph.value(graph.identifier, EX.lane)
+
+    async def handle(self, nursery: trio.Nursery, graph: Graph) -> Graph:
+        name = str(graph.value(graph.identifier, EX.name))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        self.log.append(f"start {name}")
+        await trio.sleep(float(graph.value(graph.identifier, EX.delay)))
+        self.log.append(f"end {name}")
+        self.running -= 1
+        return bubble(EX.Done, EX, {EX.name: Literal(name)})
+
+
+def nap(name: str, delay: float, lane: str | None = None) -> Graph:
+    g = bubble(
+        EX.Nap, EX, {EX.name: Literal(name), EX.delay: Literal(delay)}
+    )
+    if lane is not None:
+        g.add((g.identifier, EX.lane, Literal(lane)))
+    return g
+
+
+async def test_concurrent_server_actor(
+    logger: BoundLogger, temp_repo: Repository
+):
+    town = Site("http://example.com/", "localhost:8000", repo=temp_repo)
+    actor = SleepyActor()
+    with trio.fail_after(2):
+        async with trio.open_nursery() as nursery:
+            with town.install_context():
+                sleepy = await spawn(nursery, actor)
+
+                async def request(msg: Graph):
+                    await call(sleepy, msg)
+
+                async with trio.open_nursery() as callers:
+                    for i in range(6):
+                        callers.start_soon(request, nap(f"n{i}", 0.05))
+
+                assert actor.peak == 3
+
+                actor.peak = 0
+                async with trio.open_nursery() as callers:
+                    callers.start_soon(request, nap("a", 0.1, lane="x"))
+                    await trio.sleep(0.01)
+                    callers.start_soon(request, nap("b", 0.01, lane="x"))
+
+                assert actor.peak == 1
+                assert actor.log[-4:] == [
+                    "start a",
+                    "end a",
+                    "start b",
+                    "end b",
+                ]
+
+                nursery.cancel_scope.cancel()
+
+
+class GreeterActor(DispatchingActor):
+    dispatch_subclasses = True
+
+    @handler(EX.Hello)
+    async def handle_hello(self, ctx: DispatchContext) -> Graph:
+        return bubble(EX.Greeting, EX, {EX.text: Literal("hello")})
+
+    @handler(EX.Goodbye)
+    async def handle_goodbye(self, ctx: DispatchContext) -> Graph:
+        return bubble(EX.Greeting, EX, {EX.text: Literal("goodbye")})
+
+
+async def test_dispatching_actor_index(
+    logger: BoundLogger, temp_repo: Repository, tmp_path: Path
+):
+    vocab = Graph()
+    vocab.add((EX.Wave, RDFS.subClassOf, EX.Hello))
+    vocab.add((EX.Salute, RDFS.subClassOf, EX.Wave))
+    path = tmp_path / "vocab.ttl"
+    vocab.serialize(path, format="turtle")
+    temp_repo.register_builtin_graph(URIRef("urn:x-test:vocab"), str(path))
+
+    # Subclass links outside the vocab graphs are no reason to dispatch.
+    notes = temp_repo.graph(EX.notes)
+    notes.add((EX.Bye, RDFS.subClassOf, EX.Goodbye))
+
+    town = Site("http://example.com/", "localhost:8000", repo=temp_repo)
+    actor = GreeterActor()
+    with trio.fail_after(1):
+        async with trio.open_nursery() as nursery:
+            with town.install_context():
+                greeter = await spawn(nursery, actor)
+
+                x = await call(greeter, bubble(EX.Goodbye, EX))
+                assert (x.identifier, EX.text, Literal("goodbye")) in x
+
+                x = await call(greeter, bubble(EX.Salute, EX))
+                assert (x.identifier, EX.text, Literal("hello")) in x
+
+                assert actor.dispatch_index[EX.Wave] == EX.Hello
+                assert EX.Bye not in actor.dispatch_index
+
+                handlers = town.vat.deck[greeter].metrics.handlers
+                assert handlers["handle_hello"].count == 1
+                assert handlers["handle_goodbye"].count == 1
+                text = prometheus_metrics(town.vat)
+                assert (
+                    f'bubble_actor_dispatch_seconds_count{{actor="{greeter}",'
+                    'name="GreeterActor",handler="handle_hello"} 1'
+                ) in text
+                metrics = describe_metrics(town.vat, EX.metrics)
+                timings = set(metrics.objects(None, NT.handler))
+                assert timings == {
+                    Literal("handle_hello"),
+                    Literal("handle_goodbye"),
+                }
+
+                nursery.cancel_scope.cancel()
+
+
+def shout(graph: Graph) -> Graph:
+    text = str(graph.value(graph.identifier, EX.text))
+    response = Graph(identifier=graph.identifier)
+    response.add((graph.identifier, EX.text, Literal(text.upper())))
+    return response
+
+
+async def test_worker_actor(logger: BoundLogger, temp_repo: Repository):
+    town = Site("http://example.com/", "localhost:8000", repo=temp_repo)
+    with trio.fail_after(2):
+        async with trio.open_nursery() as nursery:
+            with town.install_context():
+                worker = await spawn_worker(nursery, shout, workers=2)
+                msg = bubble(EX.Shout, EX, {EX.text: Literal("hi")})
+                x = await call(worker, msg)
+                assert x.identifier == msg.identifier
+                assert (x.identifier, EX.text, Literal("HI")) in x
+                nursery.cancel_scope.cancel()
+
+
+def test_hash_ring_spreads_and_is_stable():
+    ring = HashRing(4)
+    keys = [f"http://example.com/{i}" for i in range(2000)]
+    owners = [ring.owner(k) for k in keys]
+    assert all(owners.count(shard) > 300 for shard in range(4))
+
+    # Growing the ring only moves keys onto the new shard.
+    grown = HashRing(5)
+    moved = [k for k, o in zip(keys, owners) if grown.owner(k) != o]
+    assert all(grown.owner(k) == 4 for k in moved)
+
+
+async def test_sharded_vats_route_messages(
+    logger: BoundLogger, tmp_path: Path
+):
+    vats = [Vat("http://example.com/", logger) for _ in range(2)]
+    with trio.fail_after(2):
+        async with trio.open_nursery() as nursery:
+            for i, system in enumerate(vats):
+                await system.setup_shards(nursery, i, 2, str(tmp_path))
+
+            with vat.bind(vats[1]):
+                counter = await spawn(nursery, CounterActor(0))
+                assert vats[1].placement
+                assert vats[1].placement(str(counter))
+
+            with vat.bind(vats[0]):
+                assert counter not in vats[0].deck
+                await call(counter, bubble(EX.Inc, EX))
+                x = await call(counter, bubble(EX.Get, EX))
+                assert (x.identifier, EX.value, Literal(1)) in x
+
+            nursery.cancel_scope.cancel()
+
+
+async def mark_shard(nursery: trio.Nursery) -> None:
+    """An entry point for `run_shards` that leaves a mark and stops."""
+    assert vat.get().placement is not None
+    marks = os.environ["BUBBLE_SHARD_MARKS"]
+    await Path(marks, str(os.getpid())).write_text("ok")
+    nursery.cancel_scope.cancel()
+
+
+async def test_run_shards_starts_worker_processes(tmp_path, monkeypatch):
+    marks = tmp_path / "marks"
+    marks.mkdir()
+    monkeypatch.setenv("BUBBLE_SHARD_MARKS", str(marks))
+    with trio.fail_after(120):
+        await run_shards(
+            "test.test_town:mark_shard",
+            "http://example.com/",
+            2,
+            str(tmp_path / "vats"),
+        )
+    assert len(list(marks.iterdir())) == 2
+
+
+def test_shard_command_removes_its_socket_dir(tmp_path, monkeypatch):
+    seen = []
+
+    async def fake_run_shards(entry, site, shards, socket_dir):
+        assert os.path.isdir(socket_dir)
+        seen.append(socket_dir)
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(shard_cli, "run_shards", fake_run_shards)
+    shard_cli.shard(
+        "test.test_town:mark_shard",
+        "http://example.com/",
+        shards=2,
+        socket_dir=None,
+        index=None,
+    )
+    assert len(seen) == 1
+    assert not os.path.exists(seen[0])
+
+
+def test_actor_directory_expires_entries():
+    now = [0.0]
+    directory = ActorDirectory(ttl=10, clock=lambda: now[0])
+    directory.learn("http://example.com/a", "vat1")
+    assert directory.lookup("http://example.com/a") == "vat1"
+
+    # A stale exit announcement from another vat is ignored.
+    directory.forget("http://example.com/a", "vat2")
+    assert directory.lookup("http://example.com/a") == "vat1"
+
+    now[0] = 11
+    assert directory.lookup("http://example.com/a") is None
+    assert (directory.hits, directory.misses) == (2, 1)
+
+
+async def join_broker(nursery: trio.Nursery, vats: list[Vat]):
+    broker = LocalBroker(nursery)
+    for system in vats:
+        client = broker.client()
+        await client.connect()
+        await system.join_nats(nursery, client)
+    return broker
+
+
+async def test_nats_vats_unicast_through_directory(logger: BoundLogger):
+    vats = [Vat("http://example.com/", logger) for _ in range(3)]
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            broker = await join_broker(nursery, vats)
+
+            with vat.bind(vats[1]):
+                counter = await spawn(nursery, CounterActor(0))
+
+            with vat.bind(vats[0]):
+                await call(counter, bubble(EX.Inc, EX))
+                x = await call(counter, bubble(EX.Get, EX))
+                assert (x.identifier, EX.value, Literal(1)) in x
+
+            # Only the hosting vat ever saw the messages for the counter,
+            # and replies went straight back to the caller's inbox.
+            assert not broker.published[f"bubble.vat.{vats[2].vat_id}"]
+            assert not broker.published[f"bubble.vat.{vats[0].vat_id}"]
+            assert str(counter) in vats[2].transport.directory.locations
+            assert not vats[1].transport.return_routes
+
+            async def silent():
+                await trio.sleep_forever()
+
+            with vat.bind(vats[1]):
+                mute = await spawn(nursery, silent)
+            with vat.bind(vats[0]):
+                with raises(trio.TooSlowError):
+                    await call(mute, bubble(EX.Get, EX), timeout=0.1)
+
+            nursery.cancel_scope.cancel()
+
+
+async def test_trace_follows_a_call_across_vats(logger: BoundLogger):
+    vats = [Vat("http://example.com/", logger) for _ in range(2)]
+    caller, host = vats
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            await join_broker(nursery, vats)
+
+            with vat.bind(host):
+                counter = await spawn(nursery, CounterActor(0))
+
+            with vat.bind(caller):
+                with caller.tracer.span("test", this(), root=True) as root:
+                    assert root is not None
+                    sent = bubble(EX.Inc, EX)
+                    await call(counter, sent)
+                    assert not set(sent.objects(None, NT.traceparent))
+
+                # Outside any span, nothing is traced.
+                await call(counter, bubble(EX.Inc, EX))
+
+            nursery.cancel_scope.cancel()
+
+    ours = {span.name: span for span in caller.tracer.trace(root.trace_id)}
+    theirs = {span.name: span for span in host.tracer.trace(root.trace_id)}
+    assert set(ours) == {"test", "call", "send"}
+    assert set(theirs) == {"deliver", "handle", "send"}
+    assert ours["call"].parent_id == root.span_id
+    assert ours["send"].parent_id == ours["call"].span_id
+    assert theirs["deliver"].parent_id == ours["send"].span_id
+    assert theirs["handle"].parent_id == ours["send"].span_id
+    assert theirs["send"].parent_id == theirs["handle"].span_id
+    assert len(caller.tracer.spans) == 3
+
+    spans = caller.tracer.trace(root.trace_id)
+    spans += host.tracer.trace(root.trace_id)
+    graph = describe_trace(spans, URIRef("http://example.com/traces/t"))
+    rows = waterfall(graph)
+    assert [depth for depth, _ in rows] == [0, 1, 2, 3, 3, 4]
+    with document():
+        with here.dataset.bind(Dataset()):
+            render_trace(graph)
+
+
+async def test_trace_stays_out_of_local_messages(temp_repo: Repository):
+    town = Site("http://example.com/", "localhost:8000", repo=temp_repo)
+    with trio.fail_after(2):
+        async with trio.open_nursery() as nursery:
+            with town.install_context():
+                system = vat.get()
+                counter = await spawn(nursery, CounterActor(0))
+                message = temp_repo.graph(EX.message)
+                message.add((EX.message, RDF.type, EX.Inc))
+                with system.tracer.span("test", this(), root=True) as root:
+                    assert root is not None
+                    await call(counter, message)
+                nursery.cancel_scope.cancel()
+
+    assert not set(message.objects(None, NT.traceparent))
+    assert not set(message.objects(None, NT.sentAt))
+    # The stamp went along beside the message instead.
+    spans = system.tracer.trace(root.trace_id)
+    [call_span] = [s for s in spans if s.name == "call"]
+    [send] = [s for s in spans if s.parent_id == call_span.span_id]
+    [handle] = [s for s in spans if s.name == "handle"]
+    assert send.name == "send"
+    assert handle.parent_id == send.span_id
+    assert any(
+        s.name == "deliver" and s.parent_id == send.span_id for s in spans
+    )
+
+
+class ChattyActor:
+    batching = Batching(delay=0.05)
+
+    def __init__(self, target: URIRef, count: int):
+        self.target = target
+        self.count = count
+
+    async def __call__(self):
+        for i in range(self.count):
+            await send(self.target, bubble(EX.Note, EX, {EX.n: Literal(i)}))
+
+
+async def test_nats_batches_messages_per_vat(logger: BoundLogger):
+    vats = [Vat("http://example.com/", logger) for _ in range(2)]
+    notes = []
+
+    async def collector():
+        while True:
+            msg = await receive()
+            notes.append(msg.value(msg.identifier, EX.n).toPython())
+
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            broker = await join_broker(nursery, vats)
+
+            with vat.bind(vats[1]):
+                inbox = await spawn(nursery, collector)
+            with vat.bind(vats[0]):
+                await spawn(nursery, ChattyActor(inbox, 5))
+
+            while len(notes) < 5:
+                await trio.sleep(0.01)
+            assert notes == [0, 1, 2, 3, 4]
+            assert broker.published[f"bubble.vat.{vats[1].vat_id}"] == 1
+
+            nursery.cancel_scope.cancel()
+
+
+async def test_nats_call_fails_over_when_vat_leaves(logger: BoundLogger):
+    vats = [Vat("http://example.com/", logger) for _ in range(2)]
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            await join_broker(nursery, vats)
+
+            with vat.bind(vats[1]):
+                counter = await spawn(nursery, CounterActor(0))
+            with vat.bind(vats[0]):
+                await call(counter, bubble(EX.Inc, EX))
+
+            # The hosting vat drops off the bus without saying goodbye.
+            directory = vats[0].transport.directory
+            assert directory.lookup(str(counter))
+            await vats[1].transport.client.close()
+
+            with vat.bind(vats[0]):
+                with raises(ValueError):
+                    await call(counter, bubble(EX.Get, EX))
+            assert directory.lookup(str(counter)) is None
+
+            nursery.cancel_scope.cancel()
+
+
 @asynccontextmanager
 @fixture
 async def client(temp_repo: Repository):
@@ -1,10 +1,20 @@
 import pytest
 
-from rdflib import URIRef, Literal
+from rdflib import RDFS, URIRef, Dataset, Literal, Namespace
 from rdflib.namespace import RDF
 
 from swash import here
-from swash.util import turtle, print_n3, get_single_subject
+from swash.rdfa import get_label
+from swash.util import (
+    scoped,
+    turtle,
+    prepare,
+    print_n3,
+    select_rows,
+    get_single_subject,
+)
+
+EX = Namespace("http://example.org/")
 
 
 @pytest.fixture
@@ -51,3 +61,36 @@ def test_get_single_subject(test_graph):
     )
     with pytest.raises(ValueError, match="Expected 1 subject, got 2"):
         get_single_subject(RDF.type, URIRef("http://example.org/TestType"))
+
+
+def test_scoped_reads_only_the_bound_graphs():
+    dataset = Dataset(default_union=True)
+    for name in ("a", "b", "c"):
+        graph = dataset.graph(EX[name])
+        graph.add((EX.thing, RDFS.label, Literal(name)))
+        graph.add((EX.thing, RDF.type, EX.Thing))
+
+    query = f"SELECT ?label WHERE {{ <{EX.thing}> <{RDFS.label}> ?label }}"
+    with here.graph.bind(dataset):
+        assert len(select_rows(query)) == 3
+        with here.graphs.bind(frozenset([EX.a, EX.b])):
+            labels = {row.label for row in select_rows(query)}
+            assert labels == {Literal("a"), Literal("b")}
+            # Held by both graphs, but given once.
+            assert len(scoped(dataset)) == 3
+            assert scoped(dataset) is scoped(dataset)
+        with here.graphs.bind(frozenset([EX.c])):
+            assert get_label(dataset, EX.thing) == Literal("c")
+            # A named graph is already scoped.
+            assert scoped(dataset.graph(EX.a)) == dataset.graph(EX.a)
+
+
+def test_select_rows_prepares_each_query_once(test_graph):
+    query = "SELECT ?s WHERE { ?s a <http://example.org/TestType> }"
+    before = prepare.cache_info()
+    for _ in range(3):
+        rows = select_rows(query)
+        assert [row.s for row in rows] == [EX.subject]
+    after = prepare.cache_info()
+    assert after.misses - before.misses == 1
+    assert after.hits - before.hits == 2
@@ -0,0 +1,62 @@
+from base64 import b64encode
+
+from rdflib import RDF, XSD, BNode, Graph, Literal, Namespace
+from rdflib.compare import isomorphic
+
+from bubble.mesh.base import parse_message
+from bubble.mesh.wire import (
+    is_binary,
+    encode_graph,
+    decode_dataset,
+)
+
+EX = Namespace("http://example.com/")
+
+
+def message() -> Graph:
+    g = Graph(identifier=EX.message)
+    word = BNode()
+    g.add((EX.message, RDF.type, EX.Transcript))
+    g.add((EX.message, EX.text, Literal("hello there")))
+    g.add((EX.message, EX.label, Literal("hej", lang="sv")))
+    g.add(
+        (EX.message, EX.confidence, Literal("0.98", datatype=XSD.decimal))
+    )
+    g.add((EX.message, EX.word, word))
+    g.add((word, EX.position, Literal(3)))
+    g.add(
+        (
+            EX.message,
+            EX.bytes,
+            Literal(
+                b64encode(b"\x00\x01 audio"), datatype=XSD.base64Binary
+            ),
+        )
+    )
+    # Not canonical base64, so it must travel as a typed literal.
+    g.add((EX.message, EX.odd, Literal("YQ", datatype=XSD.base64Binary)))
+    return g
+
+
+def test_binary_message_round_trip():
+    original = message()
+    data = encode_graph(original)
+    assert is_binary(data)
+    assert not is_binary(original.serialize(format="trig").encode())
+
+    dataset = decode_dataset(data)
+    decoded = dataset.graph(EX.message)
+    assert isomorphic(decoded, original)
+    odd = Literal("YQ", datatype=XSD.base64Binary)
+    assert (EX.message, EX.odd, odd) in decoded
+
+
+def test_parse_message_accepts_both_formats():
+    original = message()
+    for data in (
+        encode_graph(original),
+        original.serialize(format="trig").encode(),
+    ):
+        parsed = parse_message(data)
+        assert parsed.identifier == EX.message
+        assert isomorphic(parsed, original)